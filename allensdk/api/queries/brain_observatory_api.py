@@ -644,6 +644,32 @@ class BrainObservatoryApi(RmaTemplate):
 
         return query_string
 
+    def table_query_terms(self, filters):
+        """
+        Convert a list of cell metric filter dictionaries into PyTables
+        selection terms, so that the filters can be evaluated while reading
+        an HDF5 table (see pandas.HDFStore.select).  Every filtered field must
+        be a data column of the table.
+        """
+
+        def _value(v):
+            if isinstance(v, string_types):
+                return "'%s'" % (v)
+            else:
+                return str(v)
+
+        def _term(op, field, value):
+            if op == 'between':
+                return '({0} >= {1}) & ({0} <= {2})'.format(field, *map(_value, value))
+            elif op == 'in':
+                return '{0} == [{1}]'.format(field, ', '.join(map(_value, value)))
+            elif op in ('=', 'is'):
+                return '{0} == {1}'.format(field, _value(value))
+            else:
+                return '{0} {1} {2}'.format(field, op, _value(value))
+
+        return [_term(f['op'], f['field'], f['value']) for f in filters]
+
     def dataframe_query(self,
                         data,
                         filters,
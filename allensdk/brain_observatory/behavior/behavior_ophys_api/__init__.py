@@ -19,6 +19,9 @@ class BehaviorOphysApiBase:
     def get_dff_traces(self):
         raise NotImplementedError
 
+    def get_dff_array(self, cell_roi_ids=None, start_time=None, stop_time=None):
+        raise NotImplementedError
+
     def get_cell_specimen_table(self):
         raise NotImplementedError
 
@@ -49,6 +52,9 @@ class BehaviorOphysApiBase:
     def get_corrected_fluorescence_traces(self):
         raise NotImplementedError
 
+    def get_corrected_fluorescence_array(self, cell_roi_ids=None, start_time=None, stop_time=None):
+        raise NotImplementedError
+
     def get_motion_correction(self):
         raise NotImplementedError
 
@@ -212,6 +212,66 @@ class BehaviorOphysNwbApi(NwbApi, BehaviorOphysApiBase):
         df = cell_specimen_table[['cell_roi_id']].join(df, on='cell_roi_id')
         return df
 
+    def get_dff_array(self, cell_roi_ids=None, start_time=None, stop_time=None) -> xr.DataArray:
+        """ dF/F traces as a (cell_roi_id x time) array. Only the requested
+        rows and time window are read from the file.
+
+        Parameters
+        ----------
+        cell_roi_ids : array-like of int, optional
+            Rois to read, in the order they should be returned. Defaults to
+            the rois of the cell specimen table.
+        start_time : float, optional
+            Read timepoints at or after this time (s).
+        stop_time : float, optional
+            Read timepoints before this time (s).
+
+        Returns
+        -------
+        xr.DataArray
+            dimensions are cell_roi_id and time (ophys timestamps)
+        """
+        return self._get_roi_response_array('dff', cell_roi_ids, start_time, stop_time)
+
+    def get_corrected_fluorescence_array(self, cell_roi_ids=None, start_time=None, stop_time=None) -> xr.DataArray:
+        """ Corrected fluorescence traces as a (cell_roi_id x time) array. See
+        get_dff_array for parameters.
+        """
+        return self._get_roi_response_array('corrected_fluorescence', cell_roi_ids, start_time, stop_time)
+
+    def _get_roi_response_array(self, interface_name, cell_roi_ids=None, start_time=None, stop_time=None) -> xr.DataArray:
+        roi_response_series = self.nwbfile.modules['two_photon_imaging'].data_interfaces[interface_name].roi_response_series['traces']
+
+        if cell_roi_ids is None:
+            cell_roi_ids = self.get_cell_specimen_table()['cell_roi_id'].values
+        cell_roi_ids = np.atleast_1d(np.asarray(cell_roi_ids, dtype=int))
+
+        roi_rows = pd.Series(np.arange(len(roi_response_series.rois.table.id)),
+                             index=roi_response_series.rois.table.id[:])
+        rows = roi_rows.loc[cell_roi_ids].values
+
+        timestamps = roi_response_series.timestamps[:]
+        start = 0 if start_time is None else np.searchsorted(timestamps, start_time, side='left')
+        stop = len(timestamps) if stop_time is None else np.searchsorted(timestamps, stop_time, side='left')
+
+        # hdf5 selections must be increasing; read each row once and reorder in memory
+        unique_rows, order = np.unique(rows, return_inverse=True)
+        if len(unique_rows) and unique_rows[-1] - unique_rows[0] + 1 == len(unique_rows):
+            row_selection = slice(int(unique_rows[0]), int(unique_rows[-1]) + 1)
+        else:
+            row_selection = unique_rows.tolist()
+        traces = np.asarray(roi_response_series.data[row_selection, start:stop])[order]
+
+        return xr.DataArray(
+            data=traces,
+            dims=('cell_roi_id', 'time'),
+            coords={
+                'cell_roi_id': cell_roi_ids,
+                'time': timestamps[start:stop]
+            },
+            name=interface_name
+        )
+
     def get_motion_correction(self) -> pd.DataFrame:
 
         motion_correction_data = {}
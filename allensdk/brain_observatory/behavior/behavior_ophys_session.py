@@ -293,6 +293,50 @@ class BehaviorOphysSession(object):
             }
         ).squeeze(drop=True)
 
+    def get_dff_array(self, cell_specimen_ids=None, start_time=None, stop_time=None) -> xr.DataArray:
+        """ Obtains dF/F traces as a contiguous (cell x time) array, reading
+        only the requested cells and time window.
+
+        Parameters
+        ----------
+        cell_specimen_ids : array-like of int, optional
+            Traces for these cell specimens will be returned, in this order.
+            The default behavior is to return traces for all cell specimens.
+        start_time : float, optional
+            Include ophys timestamps at or after this time (s).
+        stop_time : float, optional
+            Include ophys timestamps before this time (s).
+
+        Returns
+        -------
+        result : xr.DataArray
+            dimensions are:
+                - cell_specimen_id : which cell's trace is this?
+                - time : ophys timestamp of each sample
+        """
+        return self._get_trace_array(self.api.get_dff_array, cell_specimen_ids, start_time, stop_time)
+
+    def get_corrected_fluorescence_array(self, cell_specimen_ids=None, start_time=None, stop_time=None) -> xr.DataArray:
+        """ Obtains corrected fluorescence traces as a contiguous
+        (cell x time) array. See get_dff_array for parameters.
+        """
+        return self._get_trace_array(self.api.get_corrected_fluorescence_array, cell_specimen_ids, start_time, stop_time)
+
+    def _get_trace_array(self, getter, cell_specimen_ids=None, start_time=None, stop_time=None):
+        if cell_specimen_ids is None:
+            cell_specimen_ids = self.cell_specimen_table.index.values
+        elif isinstance(cell_specimen_ids, int) or np.issubdtype(type(cell_specimen_ids), np.integer):
+            cell_specimen_ids = np.array([int(cell_specimen_ids)])
+        else:
+            cell_specimen_ids = np.array(cell_specimen_ids)
+
+        cell_roi_ids = self.cell_specimen_table.loc[cell_specimen_ids, "cell_roi_id"].values
+        result = getter(cell_roi_ids=cell_roi_ids, start_time=start_time, stop_time=stop_time)
+
+        result = result.rename({"cell_roi_id": "cell_specimen_id"})
+        result.coords["cell_specimen_id"] = cell_specimen_ids
+        return result
+
     @legacy('Consider using "dff_traces" instead.')
     def get_dff_traces(self, cell_specimen_ids=None):
 
@@ -298,11 +298,43 @@ def get_trial_image_names(trial, stimuli):
     }
 
 
-def get_trials(data, licks_df, rewards_df, stimulus_presentations_df, rebase):
+def get_trials(data, licks_df, rewards_df, stimulus_presentations_df, rebase,
+               vectorized=True):
+    '''
+    Build the trials table from the trial log of a behavior session.
+
+    Parameters
+    ----------
+    data: Mapping
+        foraging2 shape behavior data
+    licks_df: pd.DataFrame
+        lick times, in the `time` column
+    rewards_df: pd.DataFrame
+        rewards, indexed by `timestamps`
+    stimulus_presentations_df: pd.DataFrame
+        stimulus presentations, with `start_frame` and `start_time` columns
+    rebase: function
+        maps trial log times to session times. Must accept arrays when
+        `vectorized` is True.
+    vectorized: bool
+        if True, licks, rewards, change times and initial images are
+        assigned to all trials at once with binary searches. Otherwise each
+        trial is processed in turn.
+
+    Returns
+    -------
+    trials: pd.DataFrame
+        one row per trial, indexed by `trials_id`
+    '''
     assert rewards_df.index.name == 'timestamps'
     stimuli = data["items"]["behavior"]["stimuli"]
     trial_log = data["items"]["behavior"]["trial_log"]
 
+    if vectorized:
+        return _get_trials_vectorized(trial_log, stimuli, licks_df,
+                                      rewards_df, stimulus_presentations_df,
+                                      rebase)
+
     all_trial_data = [None] * len(trial_log)
     sync_lick_times = licks_df.time.values 
     rebased_reward_times = rewards_df.index.values
@@ -349,6 +381,205 @@ def get_trials(data, licks_df, rewards_df, stimulus_presentations_df, rebase):
     return trials
 
 
+def _flatten_trial_events(trial_log):
+    '''flatten the events of every trial into parallel arrays'''
+    trial_index, names, qualifiers, times, frames = [], [], [], [], []
+    for idx, trial in enumerate(trial_log):
+        for event in trial['events']:
+            trial_index.append(idx)
+            names.append(event[0])
+            qualifiers.append(event[1])
+            times.append(event[2])
+            frames.append(event[3])
+
+    return {
+        "trial_index": np.array(trial_index, dtype=int),
+        "name": np.array(names, dtype=object),
+        "qualifier": np.array(qualifiers, dtype=object),
+        "time": np.array(times, dtype=float),
+        "frame": np.array(frames, dtype=object),
+    }
+
+
+def _last_event_rows(events, name, n_trials):
+    '''row of the last (name, '') event of each trial, or -1 if absent'''
+    rows = np.flatnonzero((events["name"] == name) &
+                          (events["qualifier"] == ''))
+    last = np.full(n_trials, -1, dtype=int)
+    np.maximum.at(last, events["trial_index"][rows], rows)
+    return last
+
+
+def _window_indices(values, start_times, stop_times):
+    '''
+    for each [start, stop] window, the indices of the values inside the
+    window, in their original order
+    '''
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    lo = np.searchsorted(sorted_values, start_times, side='left')
+    hi = np.searchsorted(sorted_values, stop_times, side='right')
+    hi = np.where(np.isnan(start_times) | np.isnan(stop_times), lo,
+                  np.maximum(hi, lo))
+
+    if np.all(order == np.arange(len(values))):
+        return [np.arange(l, h) for l, h in zip(lo, hi)]
+    return [np.sort(order[l:h]) for l, h in zip(lo, hi)]
+
+
+def _first_presentation_times(stimulus_presentations_df, frames):
+    '''
+    start time of the first stimulus presentation (in table order) whose
+    start_frame is at or after each frame, or NaN if there is none
+    '''
+    frames = np.asarray(frames, dtype=float)
+    start_frames = stimulus_presentations_df['start_frame'].values.astype(float)
+    start_times = stimulus_presentations_df['start_time'].values
+    if len(start_frames) == 0:
+        return np.full(len(frames), np.nan)
+
+    # the first row at or after a frame is the first row at which the running
+    # maximum reaches it
+    reached = np.maximum.accumulate(
+        np.where(np.isnan(start_frames), -np.inf, start_frames))
+    pos = np.searchsorted(reached, frames, side='left')
+    found = pos < len(reached)
+
+    return np.where(found, start_times[np.minimum(pos, len(reached) - 1)],
+                    np.nan)
+
+
+def _initial_image_names(stimuli, start_frames):
+    '''vectorized resolve_initial_image, returning only the image names'''
+    set_frames, set_names = [], []
+    for stim_dict in stimuli.values():
+        for set_event in stim_dict["set_log"]:
+            set_frames.append(set_event[3])
+            set_names.append(set_event[1])
+
+    start_frames = np.asarray(start_frames, dtype=float)
+    set_frames = np.array(set_frames, dtype=float)
+    order = np.argsort(set_frames, kind='mergesort')
+    pos = np.searchsorted(set_frames[order], start_frames, side='right') - 1
+
+    # ties are resolved in favor of the last set event, as in
+    # resolve_initial_image
+    return [set_names[order[p]] if p >= 0 and not np.isnan(f) else ''
+            for p, f in zip(pos, start_frames)]
+
+
+def _get_trials_vectorized(trial_log, stimuli, licks_df, rewards_df,
+                           stimulus_presentations_df, rebase):
+    n_trials = len(trial_log)
+    events = _flatten_trial_events(trial_log)
+    rebased_times = np.asarray(rebase(events["time"]), dtype=float)
+
+    def event_rows(name, required):
+        rows = _last_event_rows(events, name, n_trials)
+        missing = (rows < 0) & required
+        if np.any(missing):
+            raise KeyError((name, ''))
+        return rows
+
+    everywhere = np.ones(n_trials, dtype=bool)
+    start_times = rebased_times[event_rows('trial_start', everywhere)]
+    stop_times = rebased_times[event_rows('trial_end', everywhere)]
+
+    trial_data = [trial_data_from_log(trial) for trial in trial_log]
+    flag = lambda key: np.array([td[key] for td in trial_data], dtype=bool)
+    hit, false_alarm = flag('hit'), flag('false_alarm')
+    go, catch, auto_rewarded = flag('go'), flag('catch'), flag('auto_rewarded')
+    assert not np.any(hit & false_alarm), "both `hit` and `false_alarm` cannot be True, they are mutually exclusive categories"
+    assert not np.any(go & catch), "both `go` and `catch` cannot be True, they are mutually exclusive categories"
+    assert not np.any(go & auto_rewarded), "both `go` and `auto_rewarded` cannot be True, they are mutually exclusive categories"
+
+    changed = go | auto_rewarded
+    sham = catch & ~changed
+
+    hit_rows = event_rows('hit', hit)
+    false_alarm_rows = event_rows('false_alarm', false_alarm & ~hit)
+    change_rows = np.where(changed, event_rows('stimulus_changed', changed),
+                           event_rows('sham_change', sham))
+
+    sync_lick_times = licks_df.time.values
+    lick_rows = _window_indices(sync_lick_times, start_times, stop_times)
+
+    rebased_reward_times = rewards_df.index.values
+    reward_rows = _window_indices(rebased_reward_times, start_times,
+                                  stop_times)
+
+    has_change = changed | sham
+    change_frames = [events["frame"][row] if has_change[idx] else float("nan")
+                     for idx, row in enumerate(change_rows)]
+    change_times = np.full(n_trials, np.nan)
+    change_times[has_change] = _first_presentation_times(
+        stimulus_presentations_df,
+        [frame for frame, c in zip(change_frames, has_change) if c])
+
+    initial_image_names = _initial_image_names(
+        stimuli, [trial["events"][0][3] for trial in trial_log])
+
+    all_trial_data = [None] * n_trials
+    for idx, trial in enumerate(trial_log):
+        lick_times = sync_lick_times[lick_rows[idx]]
+        if len(reward_rows[idx]) == 0:
+            reward_time = float('nan')
+        else:
+            reward_time = one(rebased_reward_times[reward_rows[idx]])
+
+        tr_data = {"trial": trial["index"],
+                   "lick_times": lick_times,
+                   "reward_time": reward_time}
+        tr_data.update(trial_data[idx])
+
+        if hit[idx]:
+            response_time = rebased_times[hit_rows[idx]]
+        elif false_alarm[idx]:
+            response_time = rebased_times[false_alarm_rows[idx]]
+        else:
+            response_time = float("nan")
+
+        if not has_change[idx]:
+            response_latency = None
+        elif len(lick_times) > 0:
+            response_latency = lick_times[0] - change_times[idx]
+        else:
+            response_latency = float("inf")
+
+        initial_image_name = initial_image_names[idx]
+        if len(trial["stimulus_changes"]) == 0:
+            change_image_name = initial_image_name
+        else:
+            (_, from_name), (_, to_name), _, _ = trial["stimulus_changes"][0]
+            assert from_name == initial_image_name
+            change_image_name = to_name
+
+        tr_data.update({
+            "start_time": start_times[idx],
+            "stop_time": stop_times[idx],
+            "trial_length": stop_times[idx] - start_times[idx],
+            "response_time": response_time,
+            "change_frame": change_frames[idx],
+            "change_time": change_times[idx] if has_change[idx] else float("nan"),
+            "response_latency": response_latency,
+            "initial_image_name": initial_image_name,
+            "change_image_name": change_image_name,
+        })
+
+        # ensure that only one trial condition is True (they are mutually exclusive)
+        condition_dict = {}
+        for key in ['hit','miss','false_alarm','correct_reject','auto_rewarded','aborted']:
+            condition_dict[key] = tr_data[key]
+        validate_trial_condition_exclusivity(idx,**condition_dict)
+
+        all_trial_data[idx] = tr_data
+
+    trials = pd.DataFrame(all_trial_data).set_index('trial')
+    trials.index = trials.index.rename('trials_id')
+
+    return trials
+
+
 def local_time(iso_timestamp, timezone=None):
     datetime = pd.to_datetime(iso_timestamp)
     if not datetime.tzinfo:
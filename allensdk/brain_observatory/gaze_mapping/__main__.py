@@ -222,8 +222,8 @@ def run_gaze_mapping(pupil_parameters: pd.DataFrame,
     new_pupil_on_monitor_cm = raw_pupil_on_monitor_cm.copy()
     new_pupil_on_monitor_deg = raw_pupil_on_monitor_deg.copy()
 
-    new_pupil_areas = post_process_areas(new_pupil_areas.values)
-    new_eye_areas = post_process_areas(new_eye_areas.values)
+    new_pupil_areas, new_eye_areas = post_process_areas(
+        np.stack([new_pupil_areas.values, new_eye_areas.values], axis=1)).T
     _, filtered_pos_indices = post_process_cr(cr_parameters[["center_x",
                                                              "center_y",
                                                              "phi",
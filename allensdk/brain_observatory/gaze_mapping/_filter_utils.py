@@ -1,28 +1,57 @@
 import logging
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 
 
 def medfilt_custom(x, kernel_size=3):
     '''This median filter returns 'nan' whenever any value in the kernal width
-    is 'nan' and the median otherwise'''
+    is 'nan' and the median otherwise.
+
+    Windows covering the full kernel are gathered as a strided view and
+    reduced with a single call to np.median, which propagates 'nan'. The few
+    windows at the edges keep the original (truncated) slicing. A 2-D input
+    of shape (T, n) is filtered column by column along the first axis.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        (T,) or (T, n) array of samples.
+    kernel_size : int
+        Width of the filter window.
+
+    Returns
+    -------
+    numpy.ndarray
+        Median filtered array with the same shape as x.
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        return medfilt_custom(x[:, np.newaxis], kernel_size)[:, 0]
+
     T = x.shape[0]
     delta = kernel_size // 2
+    width = 2 * delta + 1
 
     x_med = np.zeros(x.shape)
-    window = x[0:delta + 1]
-    if np.any(np.isnan(window)):
-        x_med[0] = np.nan
-    else:
-        x_med[0] = np.median(window)
-
-    # print window
-    for t in range(1, T):
-        window = x[t - delta:t + delta + 1]
-        # print window
-        if np.any(np.isnan(window)):
+
+    n_full = T - 2 * delta
+    if n_full > 0:
+        x = np.ascontiguousarray(x)
+        windows = as_strided(
+            x,
+            shape=(n_full, width, x.shape[1]),
+            strides=(x.strides[0], x.strides[0], x.strides[1]),
+            writeable=False)
+        x_med[delta:T - delta] = np.median(windows, axis=1)
+
+    edges = set(range(min(delta, T))) | set(range(max(T - delta, 0), T))
+    for t in sorted(edges):
+        start = 0 if t == 0 else t - delta
+        window = x[start:t + delta + 1]
+        if window.shape[0] == 0:
             x_med[t] = np.nan
         else:
-            x_med[t] = np.median(window)
+            x_med[t] = np.median(window, axis=0)
 
     return x_med
 
@@ -82,8 +111,8 @@ def post_process_cr(cr_params):
     y_center[area > threshold] = np.nan
 
     # median filter
-    x_center_med = medfilt_custom(x_center, kernel_size=3)
-    y_center_med = medfilt_custom(y_center, kernel_size=3)
+    x_center_med, y_center_med = medfilt_custom(
+        np.stack([x_center, y_center], axis=1), kernel_size=3).T
 
     x_mask_finite = np.where(np.isfinite(x_center_med))[0]
     y_mask_finite = np.where(np.isfinite(y_center_med))[0]
@@ -117,7 +146,8 @@ def post_process_areas(areas: np.ndarray, percent_thresh: int = 99):
     Parameters
     ----------
     areas: np.ndarray
-        (N x 1) Arra of ellipse areas for either eye or pupil
+        (N x 1) Arra of ellipse areas for either eye or pupil, or (N x M)
+        array of M area traces, each thresholded separately
     percent_thresh: int
         Percentile to threshold at. Default is 99
 
@@ -126,7 +156,9 @@ def post_process_areas(areas: np.ndarray, percent_thresh: int = 99):
     numpy.ndarray
         Eye/pupil areas with outliers replaced with nan
     '''
-    threshold = np.percentile(areas[np.isfinite(areas)], percent_thresh)
-    outlier_indices = areas > threshold
+    finite_areas = np.where(np.isfinite(areas), areas, np.nan)
+    threshold = np.nanpercentile(finite_areas, percent_thresh, axis=0)
+    with np.errstate(invalid='ignore'):
+        outlier_indices = areas > threshold
     areas[outlier_indices] = np.nan
     return areas
@@ -39,7 +39,7 @@ import h5py
 import numpy as np
 import pandas as pd
 import scipy.ndimage
-from .receptive_field_analysis.receptive_field import compute_receptive_field_with_postprocessing
+from .receptive_field_analysis.receptive_field import compute_receptive_fields_with_postprocessing
 from .receptive_field_analysis.visualization import plot_receptive_field_data
 
 from . import circle_plots as cplots
@@ -61,6 +61,10 @@ class LocallySparseNoise(StimulusAnalysis):
     stimulus: string
        Name of locally sparse noise stimulus.  See brain_observatory.stimulus_info.
 
+    processes: int
+       Number of worker processes used to compute receptive fields.  None uses
+       all cores.  Defaults to 1, which computes them serially.
+
     nrows: int
        Number of rows in the stimulus template
 
@@ -73,8 +77,9 @@ class LocallySparseNoise(StimulusAnalysis):
     LSN_GREY = 127
     LSN_OFF_SCREEN = 64
 
-    def __init__(self, data_set, stimulus=None, **kwargs):
+    def __init__(self, data_set, stimulus=None, processes=1, **kwargs):
         super(LocallySparseNoise, self).__init__(data_set, **kwargs)
+        self.processes = processes
         if stimulus is None:
             self.stimulus = stimulus_info.LOCALLY_SPARSE_NOISE
         else:
@@ -274,12 +279,8 @@ class LocallySparseNoise(StimulusAnalysis):
         ''' Calculates receptive fields for each cell
         '''
 
-        csid_rf = {}
-        for cell_index in range(self.data_set.number_of_cells):
-            csid_rf[str(cell_index)] = compute_receptive_field_with_postprocessing(
-                self.data_set, cell_index, self.stimulus, alpha=.05, number_of_shuffles=10000)
-
-        return csid_rf
+        return compute_receptive_fields_with_postprocessing(
+            self.data_set, self.stimulus, processes=self.processes, alpha=.05, number_of_shuffles=10000)
 
 
     def plot_receptive_field_analysis_data(self, cell_index, **kwargs):
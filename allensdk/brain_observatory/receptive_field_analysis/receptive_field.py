@@ -36,6 +36,7 @@
 from .eventdetection import detect_events
 from statsmodels.sandbox.stats.multicomp import multipletests
 import numpy as np
+import multiprocessing as mp
 from .utilities import get_A, get_A_blur, get_shuffle_matrix, get_components, dict_generator
 from .postprocessing import run_postprocessing
 import h5py
@@ -52,12 +53,9 @@ def events_to_pvalues_no_fdr_correction(data, event_vector, A, number_of_shuffle
 
     # Build list of p-values:
     response_triggered_stimulus_vector = A.dot(event_vector)/number_of_events
-    p_value_list = []
-    for pi in range(2*number_of_pixels):
-        curr_p_value = 1-(shuffle_data[pi, :] < response_triggered_stimulus_vector[pi]).sum()*1./number_of_shuffles
-        p_value_list.append(curr_p_value)
+    p_values = 1-(shuffle_data[:2*number_of_pixels, :] < response_triggered_stimulus_vector[:2*number_of_pixels, np.newaxis]).sum(axis=1)*1./number_of_shuffles
 
-    return np.array(p_value_list)
+    return p_values
 
 def compute_receptive_field(data, cell_index, stimulus, **kwargs):
 
@@ -127,6 +125,58 @@ def compute_receptive_field_with_postprocessing(data, cell_index, stimulus, **kw
 
     return rf
 
+_worker_data = None
+
+def _init_receptive_field_worker(data):
+    # Each worker keeps one copy of the data set, so that the memoized
+    # stimulus matrices are computed once per worker rather than once per cell
+    global _worker_data
+    _worker_data = data
+
+def _compute_receptive_field_worker(args):
+    cell_index, stimulus, kwargs = args
+    return cell_index, compute_receptive_field_with_postprocessing(_worker_data, cell_index, stimulus, **kwargs)
+
+def compute_receptive_fields_with_postprocessing(data, stimulus, cell_indices=None, processes=None, **kwargs):
+    '''
+    Compute receptive fields for many cells of an experiment.
+
+    Parameters
+    ----------
+    data: BrainObservatoryNwbDataSet
+    stimulus: string
+        locally sparse noise stimulus name
+    cell_indices: list of int
+        cells to compute; all cells by default
+    processes: int
+        number of worker processes.  None uses all cores, 1 computes serially
+        in this process.
+    kwargs:
+        passed to compute_receptive_field
+
+    Returns
+    -------
+    dict
+        receptive field dictionaries, keyed by cell index as a string
+    '''
+
+    if cell_indices is None:
+        cell_indices = range(data.number_of_cells)
+
+    if processes == 1:
+        return dict((str(cell_index), compute_receptive_field_with_postprocessing(data, cell_index, stimulus, **kwargs))
+                    for cell_index in cell_indices)
+
+    pool = mp.Pool(processes, initializer=_init_receptive_field_worker, initargs=(data,))
+    try:
+        results = pool.map(_compute_receptive_field_worker,
+                           [(cell_index, stimulus, kwargs) for cell_index in cell_indices])
+    finally:
+        pool.close()
+        pool.join()
+
+    return dict((str(cell_index), rf) for cell_index, rf in results)
+
 def get_attribute_dict(rf):
 
     attribute_dict = {}
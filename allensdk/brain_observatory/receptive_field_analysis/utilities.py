@@ -36,6 +36,7 @@
 from scipy.ndimage.filters import gaussian_filter
 import numpy as np
 import scipy.interpolate as spinterp
+import scipy.sparse as sps
 from .tools import dict_generator
 from allensdk.api.cache import memoize
 import os
@@ -119,22 +120,39 @@ def get_A_blur(data, stimulus):
 
     return A
 
-def get_shuffle_matrix(data, event_vector, A, number_of_shuffles=5000, response_detection_error_std_dev=.1):
+def get_shuffle_indicator_matrix(number_of_events, number_of_frames, number_of_shuffles=5000, response_detection_error_std_dev=.1):
+    '''
+    Sparse (frames x shuffles) matrix with a 1 at each frame drawn into each
+    shuffle, and the number of frames drawn into each shuffle.  The random
+    draws are the same, in the same order, as the per-shuffle loop used to make.
+    '''
 
-    number_of_events = event_vector.sum()
-    number_of_pixels = A.shape[0] // 2
-    shuffle_data = np.zeros((2*number_of_pixels, number_of_shuffles))
-    evr = range(len(event_vector))
+    sizes = np.empty(number_of_shuffles, dtype=int)
+    rows = []
     for ii in range(number_of_shuffles):
 
         size = number_of_events + int(np.round(response_detection_error_std_dev*number_of_events*np.random.randn()))
-        shuffled_event_inds = np.random.choice(evr, size=size, replace=False)
+        rows.append(np.random.choice(number_of_frames, size=size, replace=False))
+        sizes[ii] = size
+
+    rows = np.concatenate(rows) if number_of_shuffles > 0 else np.zeros(0, dtype=int)
+    cols = np.repeat(np.arange(number_of_shuffles), sizes)
+    indicator = sps.csc_matrix((np.ones(len(rows)), (rows, cols)), shape=(number_of_frames, number_of_shuffles))
+
+    return indicator, sizes
+
+def get_shuffle_matrix(data, event_vector, A, number_of_shuffles=5000, response_detection_error_std_dev=.1):
+
+    number_of_events = event_vector.sum()
+    indicator, sizes = get_shuffle_indicator_matrix(number_of_events, len(event_vector),
+                                                    number_of_shuffles=number_of_shuffles,
+                                                    response_detection_error_std_dev=response_detection_error_std_dev)
 
-        b_tmp = np.zeros(len(event_vector), dtype=np.bool)
-        b_tmp[shuffled_event_inds] = True
-        shuffle_data[:, ii] = A[:,b_tmp].sum(axis=1)/float(size)
+    # (A . indicator) computed as (indicator^T . A^T)^T, so that the sparse matrix drives the product
+    shuffle_sums = indicator.T.dot(A.T).T
 
-    return shuffle_data
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return shuffle_sums / sizes.astype(float)
 
 def get_sparse_noise_epoch_mask_list(st, number_of_acquisition_frames, threshold=7):
 
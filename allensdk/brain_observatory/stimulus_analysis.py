@@ -84,6 +84,7 @@ class StimulusAnalysis(object):
         self._stim_table = StimulusAnalysis._PRELOAD
         self._response = StimulusAnalysis._PRELOAD
         self._sweep_response = StimulusAnalysis._PRELOAD
+        self._sweep_response_tensor = StimulusAnalysis._PRELOAD
         self._mean_sweep_response = StimulusAnalysis._PRELOAD
         self._pval = StimulusAnalysis._PRELOAD
         self._peak = StimulusAnalysis._PRELOAD
@@ -107,6 +108,13 @@ class StimulusAnalysis(object):
 
         return self._sweep_response
 
+    @property
+    def sweep_response_tensor(self):
+        if self._sweep_response_tensor is StimulusAnalysis._PRELOAD:
+            self._sweep_response_tensor = self.get_sweep_response_tensor()
+
+        return self._sweep_response_tensor
+
     @property
     def mean_sweep_response(self):
         if self._mean_sweep_response is StimulusAnalysis._PRELOAD:
@@ -507,6 +515,57 @@ class StimulusAnalysis(object):
 
         return binned_dx_sp, binned_cells_sp, binned_dx_vis, binned_cells_vis, peak_run
 
+    def get_sweep_windows(self):
+        """ Calculates the acquisition frames around each sweep in the stimulus table, from interlength frames
+        before the start of the sweep to interlength frames after its end.
+
+        Returns
+        -------
+        indices: np.ndarray
+            (n_sweeps, window) array of acquisition frame indices, clipped to the trace
+
+        valid: np.ndarray
+            (n_sweeps, window) boolean array, False for frames outside of the trace
+        """
+        n_frames = len(self.dxcm)
+        window = self.sweeplength + 2 * self.interlength
+        starts = self.stim_table['start'].values.astype(int) - self.interlength
+
+        indices = starts[:, np.newaxis] + np.arange(window)
+        valid = (indices >= 0) & (indices < n_frames)
+
+        return np.clip(indices, 0, n_frames - 1), valid
+
+    def get_sweep_response_tensor(self):
+        """ Calculates the response to each sweep in the stimulus table for each cell as a single array.
+        Cell traces are expressed as percent change from their mean over the interlength frames before
+        the sweep.  The last channel is the running speed, to match the columns of sweep_response.
+        Frames outside of the trace are nan.
+
+        Returns
+        -------
+        np.ndarray
+            (n_sweeps, n_cells + 1, window) array of responses
+        """
+        indices, valid = self.get_sweep_windows()
+        n_sweeps, window = indices.shape
+
+        # gather cell-major, so that the traces can be taken without an intermediate copy
+        channels = np.empty((self.numbercells + 1, n_sweeps, window))
+        np.take(np.asarray(self.celltraces, dtype=np.float64), indices, axis=1, out=channels[:self.numbercells])
+        channels[self.numbercells] = np.asarray(self.dxcm)[indices]
+        tensor = channels.transpose(1, 0, 2)
+
+        if not valid.all():
+            channels[:, ~valid] = np.nan
+
+        pre = valid[:, np.newaxis, :self.interlength]
+        cells = tensor[:, :self.numbercells, :]
+        baseline = np.where(pre, cells[:, :, :self.interlength], 0).sum(axis=2) / pre.sum(axis=2)
+        cells[...] = 100 * ((cells / baseline[:, :, np.newaxis]) - 1)
+
+        return tensor
+
     def get_sweep_response(self):
         """ Calculates the response to each sweep in the stimulus table for each cell and the mean response.
         The return is a 3-tuple of:
@@ -521,35 +580,33 @@ class StimulusAnalysis(object):
         -------
         3-tuple: sweep_response, mean_sweep_response, pval
         """
-        def do_mean(x):
-            # +1])
-            return np.mean(x[self.interlength:self.interlength + self.sweeplength + self.extralength])
-
-        def do_p_value(x):
-            (_, p) = st.f_oneway(x[:self.interlength], x[
-                self.interlength:self.interlength + self.sweeplength + self.extralength])
-            return p
-
         StimulusAnalysis._log.info('Calculating responses for each sweep')
-        sweep_response = pd.DataFrame(index=self.stim_table.index.values, 
-                                      columns=list(map(str, range(self.numbercells + 1))))
 
-        sweep_response.rename(
-            columns={str(self.numbercells): 'dx'}, inplace=True)
+        tensor = self.sweep_response_tensor
+        _, valid = self.get_sweep_windows()
 
-        for index, row in self.stim_table.iterrows():
-            start = int(row['start'] - self.interlength)
-            end = int(row['start'] + self.sweeplength + self.interlength)
+        columns = list(map(str, range(self.numbercells))) + ['dx']
+        index = self.stim_table.index.values
 
-            for nc in range(self.numbercells):
-                temp = self.celltraces[int(nc), start:end]
-                sweep_response[str(nc)][index] = 100 * \
-                    ((temp / np.mean(temp[:self.interlength])) - 1)
-            sweep_response['dx'][index] = self.dxcm[start:end]
+        response_end = self.interlength + self.sweeplength + self.extralength
+        mean_sweep_response = pd.DataFrame(
+            masked_mean(tensor[:, :, self.interlength:response_end],
+                        valid[:, np.newaxis, self.interlength:response_end]),
+            index=index, columns=columns)
 
-        mean_sweep_response = sweep_response.applymap(do_mean)
+        pval = pd.DataFrame(
+            two_group_anova_pvalues(tensor[:, :, :self.interlength],
+                                    tensor[:, :, self.interlength:response_end],
+                                    valid[:, np.newaxis, :self.interlength],
+                                    valid[:, np.newaxis, self.interlength:response_end]),
+            index=index, columns=columns)
+
+        # traces that run past the end of the experiment are truncated, as they would be by slicing
+        sweeps = [tensor[i] if valid[i].all() else tensor[i][:, valid[i]] for i in range(len(tensor))]
+        sweep_response = pd.DataFrame({ column: [sweep[i] for sweep in sweeps]
+                                        for i, column in enumerate(columns) },
+                                      index=index, columns=columns, dtype=object)
 
-        pval = sweep_response.applymap(do_p_value)
         return sweep_response, mean_sweep_response, pval
 
     def plot_representational_similarity(self, repsim, stimulus=False):
@@ -595,6 +652,53 @@ class StimulusAnalysis(object):
             raise Exception("Could not find row for csid(%s) idx(%s)" % (str(csid), str(idx)))
     
     
+def masked_mean(values, valid):
+    """ Mean over the last axis of values, counting only entries where valid is True.
+    nan values at valid entries propagate.
+    """
+    valid = np.broadcast_to(valid, values.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(valid, values, 0).sum(axis=-1) / valid.sum(axis=-1)
+
+
+def two_group_anova_pvalues(group1, group2, valid1=True, valid2=True):
+    """ One-way ANOVA p values comparing two groups of samples along the last axis,
+    computed in closed form for all leading axes at once.  Equivalent to calling
+    scipy.stats.f_oneway on each pair of samples.
+
+    Parameters
+    ----------
+    group1, group2: np.ndarray
+        samples, with matching leading axes
+
+    valid1, valid2: np.ndarray of bool, optional
+        masks broadcastable to the groups; only valid samples are included
+
+    Returns
+    -------
+    np.ndarray
+        p values, with the shape of the leading axes
+    """
+    valid1 = np.broadcast_to(valid1, group1.shape)
+    valid2 = np.broadcast_to(valid2, group2.shape)
+
+    n1 = valid1.sum(axis=-1)
+    n2 = valid2.sum(axis=-1)
+    mean1 = masked_mean(group1, valid1)
+    mean2 = masked_mean(group2, valid2)
+    grand_mean = (n1 * mean1 + n2 * mean2) / (n1 + n2)
+
+    ss_between = n1 * (mean1 - grand_mean) ** 2 + n2 * (mean2 - grand_mean) ** 2
+    ss_within = (np.where(valid1, group1 - mean1[..., np.newaxis], 0) ** 2).sum(axis=-1) + \
+        (np.where(valid2, group2 - mean2[..., np.newaxis], 0) ** 2).sum(axis=-1)
+    df_within = n1 + n2 - 2
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f = ss_between / (ss_within / df_within)
+
+    return st.f.sf(f, 1, df_within)
+
+
 def nonraising_ks_2samp(data1, data2, **kwargs):
     """ scipy.stats.ks_2samp now raises a ValueError if one of the input arrays 
     is of length 0. Previously it signaled this case by returning nans. This 
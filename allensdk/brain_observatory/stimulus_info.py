@@ -33,12 +33,14 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 #
+import os
+import hashlib
+import logging
 import six
 import numpy as np
 import scipy.ndimage.interpolation as spndi
+import scipy.sparse as sps
 from PIL import Image
-from allensdk.api.cache import memoize
-import itertools
 
 # some handles for stimulus types
 DRIFTING_GRATINGS = 'drifting_gratings'
@@ -229,6 +231,89 @@ class BinaryIntervalSearchTree(object):
         assert (return_val[0] <= fi) and (fi <= return_val[1])
         return return_val
 
+class IntervalIndex(object):
+
+    @staticmethod
+    def from_df(input_df):
+        starts = input_df['start'].values.astype(np.float64)
+        ends = input_df['end'].values.astype(np.float64)
+
+        # -.01 prevents endpoint-overlapping intervals; assigns ties to intervals that start at requested index
+        ends = np.where(starts == ends, ends, ends - .01)
+
+        return IntervalIndex(starts, ends)
+
+    def __init__(self, starts, ends):
+        """Create an index to search for points within a list of intervals, with the same semantics as
+        BinaryIntervalSearchTree, but answering many queries at once.  Assumes that the intervals are
+        non-overlapping.  If two intervals share an endpoint, the left-side wins the tie.  A point shared by a
+        zero-length interval and the interval starting there resolves to whichever one the tree reaches first.
+
+        :param starts: array of interval starts
+        :param ends: array of interval ends (inclusive)
+
+        Example:
+        index = IntervalIndex([0, 1], [.5, 2])
+        print(index.search([1.5, .7]))
+        """
+
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+
+        # Positions into the original interval list, in order of interval start
+        self.order = np.argsort(starts, kind='mergesort')
+        self.starts = starts[self.order]
+        self.ends = ends[self.order]
+
+        # Inverse of order: the sorted position of each interval in the original list
+        self.sorted_positions = np.empty_like(self.order)
+        self.sorted_positions[self.order] = np.arange(len(self.order))
+
+        # Check that the intervals are non-overlapping (except potentially at the end point)
+        assert np.all(self.ends[:-1] <= self.starts[1:])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def search_sorted(self, points):
+        """Return the sorted position of the interval containing each point, or -1 if there is none."""
+
+        points = np.asarray(points, dtype=np.float64)
+        pos = np.full(points.shape, -1, dtype=np.intp)
+
+        if len(self) == 0:
+            return pos
+
+        # Walk every point down BinaryIntervalSearchTree's layout at once, so that ties between intervals
+        # sharing a point are broken the same way.  Each node covers sorted positions [lo, hi) and tests
+        # the last interval of its left half.
+        lo = np.zeros(points.shape, dtype=np.intp)
+        hi = np.full(points.shape, len(self), dtype=np.intp)
+        active = np.ones(points.shape, dtype=bool)
+
+        while active.any():
+            half = (hi - lo) // 2
+            leaf = half == 0
+            pivot = np.where(leaf, lo, lo + half - 1)
+
+            found = active & (self.starts[pivot] <= points) & (points <= self.ends[pivot])
+            pos[found] = pivot[found]
+            active &= ~found & ~leaf
+
+            left = points < self.ends[pivot]
+            hi = np.where(active & left, lo + half, hi)
+            lo = np.where(active & ~left, lo + half, lo)
+
+        return pos
+
+    def search(self, points):
+        """Return the position, in the original interval list, of the interval containing each point, or -1 if
+        there is none."""
+
+        pos = self.search_sorted(points)
+        return np.where(pos >= 0, self.order[pos], -1)
+
+
 class StimulusSearch(object):
 
     def __init__(self, nwb_dataset):
@@ -236,37 +321,78 @@ class StimulusSearch(object):
         self.nwb_data = nwb_dataset
         self.epoch_df = nwb_dataset.get_stimulus_epoch_table()
         self.master_df = nwb_dataset.get_stimulus_table('master')
-        self.epoch_bst = BinaryIntervalSearchTree.from_df(self.epoch_df)
-        self.master_bst = BinaryIntervalSearchTree.from_df(self.master_df)
+        self.epoch_index = IntervalIndex.from_df(self.epoch_df)
+        self.master_index = IntervalIndex.from_df(self.master_df)
 
-    @memoize
-    def search(self, fi):
+        self._epoch_run_starts = self._contiguous_run_starts(self.epoch_index)
 
-        try:
+    @staticmethod
+    def _contiguous_run_starts(index):
+        """For each interval (in sorted order), the first frame of the run of contiguous frames covered by
+        this and the preceding intervals."""
+
+        if len(index) == 0:
+            return index.starts
+
+        last_frames = np.floor(index.ends)
+        breaks = index.starts[1:] > np.maximum.accumulate(last_frames)[:-1] + 1
+        run_ids = np.concatenate(([0], np.cumsum(breaks)))
+        run_firsts = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+
+        return index.starts[run_firsts][run_ids]
 
-            # Look in fine-grain tree:
-            search_result = self.master_bst.search(fi)
-            return search_result
-        except KeyError:
+    def search_frames(self, frame_indices):
+        """Find the row of the master stimulus table describing each acquisition frame.
+
+        A frame that is not within a master stimulus interval, but is within a stimulus epoch, is assigned
+        to the most recent interval whose frames are reached without leaving the stimulus epochs.
+
+        Parameters
+        ----------
+        frame_indices: array-like of int
+            acquisition frame indices
+
+        Returns
+        -------
+        np.ndarray
+            row positions into master_df, or -1 for frames that have no stimulus interval
+        """
 
-            # Current frame not found in a fine-grain interval;
-            #   see if it is unregistered to a coarse-grain epoch:
-            try:
+        frames = np.asarray(frame_indices)
+        rows = self.master_index.search(frames)
 
-                # THis will thow KeyError if not in coarse-grain epoch
-                self.epoch_bst.search(fi)
+        missing = rows < 0
+        if missing.any() and len(self.master_index) > 0:
+            rows[missing] = self._search_previous(frames[missing])
 
-                # Frame is in a coarse-grain  epoch, but not a fine grain interval;
-                #   look backwards to find most recent find nearest matching interval
-                if fi < self.epoch_df.iloc[0]['start']:
-                    return None
-                else:
-                    return self.search(fi-1)
+        return rows
 
-            except KeyError:
+    def _search_previous(self, frames):
+        epoch_pos = self.epoch_index.search_sorted(frames)
+        in_epoch = epoch_pos >= 0
 
-                # Frame is unregistered at the coarse level; return None
-                return None
+        # Nearest frame before each query that falls in a master interval
+        previous = frames - 1
+        master_pos = np.searchsorted(self.master_index.starts, previous, side='right') - 1
+        has_previous = master_pos >= 0
+        master_pos = np.maximum(master_pos, 0)
+        nearest = np.minimum(previous, np.floor(self.master_index.ends[master_pos]))
+
+        # Every frame between that one and the query must be within a stimulus epoch
+        run_start = self._epoch_run_starts[np.maximum(epoch_pos, 0)]
+        found = in_epoch & has_previous & (nearest + 1 >= run_start) & \
+            (nearest + 1 >= self.epoch_df.iloc[0]['start'])
+
+        return np.where(found, self.master_index.search(nearest), -1)
+
+    def search(self, fi):
+
+        row = self.search_frames([fi])[0]
+        if row < 0:
+            return None
+
+        pos = self.master_index.sorted_positions[row]
+        return (self.master_index.starts[pos], self.master_index.ends[pos], self.master_df.iloc[row].to_dict())
 
 def rotate(X, Y, theta):
     x = np.array([X, Y])
@@ -634,30 +760,71 @@ class Monitor(object):
         return map_stimulus(source_stimulus_coordinate, source_stimulus_type, target_stimulus_type, monitor_shape)
 
 class ExperimentGeometry(object):
+    '''
+    Geometry of the stimulus display relative to the eye.  If cache_dir is
+    given, the warp coordinates are saved there, keyed by the geometry, and
+    reused by later instances with the same geometry.
+    '''
 
-    def __init__(self, distance, mon_height_cm, mon_width_cm, mon_res, eyepoint):
+    def __init__(self, distance, mon_height_cm, mon_width_cm, mon_res, eyepoint, cache_dir=None):
 
         self.distance = distance
         self.mon_height_cm = mon_height_cm
         self.mon_width_cm = mon_width_cm
         self.mon_res = mon_res
         self.eyepoint = eyepoint
+        self.cache_dir = cache_dir
 
         self._warp_coordinates = None
+        self._warp_matrix = None
+
+    @property
+    def cache_key(self):
+        params = (float(self.distance), float(self.mon_height_cm), float(self.mon_width_cm),
+                  tuple(int(r) for r in self.mon_res), tuple(float(e) for e in self.eyepoint))
+        return hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]
 
     @property
     def warp_coordinates(self):
         if self._warp_coordinates is None:
-            self._warp_coordinates = self.generate_warp_coordinates()
+            if self.cache_dir is None:
+                self._warp_coordinates = self.generate_warp_coordinates()
+            else:
+                self._warp_coordinates = self._cached_warp_coordinates()
 
         return self._warp_coordinates
 
+    def _cached_warp_coordinates(self):
+        path = os.path.join(self.cache_dir, 'warp_coordinates_%s.npy' % self.cache_key)
+
+        if os.path.exists(path):
+            return np.load(path)
+
+        warp_coordinates = self.generate_warp_coordinates()
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            np.save(path, warp_coordinates)
+        except (IOError, OSError) as e:
+            logging.warning("could not cache warp coordinates to %s: %s", path, e)
+
+        return warp_coordinates
+
+    @property
+    def warp_matrix(self):
+        ''' Sparse matrix of bilinear interpolation weights that maps a
+        flattened display image to its flattened warped image. '''
+        if self._warp_matrix is None:
+            self._warp_matrix = bilinear_warp_matrix(self.warp_coordinates,
+                                                     (self.mon_res[1], self.mon_res[0]))
+        return self._warp_matrix
+
     def generate_warp_coordinates(self):
 
         display_shape=self.mon_res
         x = np.array(range(display_shape[0])) - display_shape[0] / 2
         y = np.array(range(display_shape[1])) - display_shape[1] / 2
-        display_coords = np.array(list(itertools.product(y, x)))
+        display_coords = _grid_coordinates(y, x)
 
         warp_coorinates = warp_stimulus_coords(display_coords,
                                                distance=self.distance,
@@ -677,14 +844,14 @@ class BrainObservatoryMonitor(Monitor):
     https://www.cnet.com/products/asus-pa248q/specs/
     '''
 
-    def __init__(self, experiment_geometry=None):
+    def __init__(self, experiment_geometry=None, cache_dir=None):
 
         height, width = MONITOR_DIMENSIONS
 
         super(BrainObservatoryMonitor, self).__init__(height, width, 61.214, 'cm')
 
         if experiment_geometry is None:
-            self.experiment_geometry = ExperimentGeometry(distance=float(MONITOR_DISTANCE), mon_height_cm=self.height, mon_width_cm=self.width, mon_res=(self.n_pixels_c, self.n_pixels_r), eyepoint=(0.5, 0.5))
+            self.experiment_geometry = ExperimentGeometry(distance=float(MONITOR_DISTANCE), mon_height_cm=self.height, mon_width_cm=self.width, mon_res=(self.n_pixels_c, self.n_pixels_r), eyepoint=(0.5, 0.5), cache_dir=cache_dir)
         else:
             self.experiment_geometry = experiment_geometry
 
@@ -706,6 +873,38 @@ class BrainObservatoryMonitor(Monitor):
 
         return spndi.map_coordinates(img, self.experiment_geometry.warp_coordinates.T).reshape((self.n_pixels_r, self.n_pixels_c))
 
+    def warp_movie(self, frames, chunk_size=64):
+        ''' Warp a stack of display-sized frames with one sparse matrix
+        product per chunk of frames.  Unlike warp_image, which uses cubic
+        spline interpolation, this uses bilinear interpolation so that the
+        interpolation weights can be precomputed.
+
+        Parameters
+        ----------
+        frames: np.ndarray
+            (n_frames, n_pixels_r, n_pixels_c) array of frames
+        chunk_size: int
+            number of frames to warp at once
+
+        Returns
+        -------
+        np.ndarray
+            (n_frames, n_pixels_r, n_pixels_c) array of warped frames
+        '''
+
+        assert frames.shape[1:] == (self.n_pixels_r, self.n_pixels_c)
+        assert self.spatial_unit == 'cm'
+
+        warp_matrix = self.experiment_geometry.warp_matrix
+        warped = np.empty(frames.shape, dtype=np.float64)
+
+        for start in range(0, len(frames), chunk_size):
+            chunk = frames[start:start + chunk_size]
+            flat = chunk.reshape(len(chunk), -1).T
+            warped[start:start + len(chunk)] = warp_matrix.dot(flat).T.reshape(chunk.shape)
+
+        return warped
+
     def grating_to_screen(self, phase, spatial_frequency, orientation, **kwargs):
 
         return super(BrainObservatoryMonitor, self).grating_to_screen(phase, spatial_frequency, orientation,
@@ -756,7 +955,7 @@ def warp_stimulus_coords(vertices,
     distance = float(distance)
     mon_res_x, mon_res_y = float(mon_res[0]), float(mon_res[1])
 
-    vertices = vertices.astype(np.float)
+    vertices = vertices.astype(np.float64)
 
     # from pixels (-1920/2 -> 1920/2) to stimulus space (-0.5->0.5)
     vertices[:, 0] = vertices[:, 0] / mon_res_x
@@ -812,19 +1011,12 @@ def make_display_mask(display_shape=(1920, 1200)):
     ''' Build a display-shaped mask that indicates which pixels are on screen after warping the stimulus. '''
     x = np.array(range(display_shape[0])) - display_shape[0] / 2
     y = np.array(range(display_shape[1])) - display_shape[1] / 2
-    display_coords = np.array(list(itertools.product(x, y)))
+    display_coords = _grid_coordinates(x, y)
 
     warped_coords = warp_stimulus_coords(display_coords).astype(int)
 
-    off_warped_coords = np.array([warped_coords[:, 0] + display_shape[0] / 2,
-                                  warped_coords[:, 1] + display_shape[1] / 2])
-
-    used_coords = set()
-    for i in range(off_warped_coords.shape[1]):
-        used_coords.add((off_warped_coords[0, i], off_warped_coords[1, i]))
-
-    used_coords = (np.array([x for (x, y) in used_coords]).astype(int),
-                   np.array([y for (x, y) in used_coords]).astype(int))
+    used_coords = ((warped_coords[:, 0] + display_shape[0] / 2).astype(int),
+                   (warped_coords[:, 1] + display_shape[1] / 2).astype(int))
 
     mask = np.zeros(display_shape)
 
@@ -833,6 +1025,53 @@ def make_display_mask(display_shape=(1920, 1200)):
     return mask
 
 
+def _grid_coordinates(a, b):
+    ''' All (a, b) pairs, in the order of itertools.product(a, b). '''
+    aa, bb = np.meshgrid(a, b, indexing='ij')
+    return np.column_stack((aa.ravel(), bb.ravel()))
+
+
+def bilinear_warp_matrix(coordinates, shape):
+    ''' Build a sparse matrix that samples a flattened image of the given
+    shape at (row, column) coordinates with bilinear interpolation.  Points
+    outside the image are treated as zero, as in
+    scipy.ndimage.map_coordinates(img, coordinates.T, order=1, mode='constant').
+
+    Parameters
+    ----------
+    coordinates: np.ndarray
+        (n_points, 2) array of (row, column) coordinates
+    shape: tuple
+        (n_rows, n_columns) of the sampled image
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        (n_points, n_rows * n_columns) interpolation weights
+    '''
+
+    n_rows, n_cols = shape
+    r0 = np.floor(coordinates[:, 0])
+    c0 = np.floor(coordinates[:, 1])
+    fr = coordinates[:, 0] - r0
+    fc = coordinates[:, 1] - c0
+    r0 = r0.astype(np.int64)
+    c0 = c0.astype(np.int64)
+
+    points = np.arange(len(coordinates))
+    rows, cols, weights = [], [], []
+    for dr, dc, w in ((0, 0, (1 - fr) * (1 - fc)), (0, 1, (1 - fr) * fc),
+                      (1, 0, fr * (1 - fc)), (1, 1, fr * fc)):
+        r, c = r0 + dr, c0 + dc
+        inside = (r >= 0) & (r < n_rows) & (c >= 0) & (c < n_cols) & (w != 0)
+        rows.append(points[inside])
+        cols.append(r[inside] * n_cols + c[inside])
+        weights.append(w[inside])
+
+    return sps.csr_matrix((np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(len(coordinates), n_rows * n_cols))
+
+
 def mask_stimulus_template(template_display_coords, template_shape, display_mask=None, threshold=1.0):
     ''' Build a mask for a stimulus template of a given shape and display coordinates that indicates
     which part of the template is on screen after warping.
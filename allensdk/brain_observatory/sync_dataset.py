@@ -15,6 +15,7 @@ h5py   http://www.h5py.org/
 
 """
 import collections
+import os
 
 import h5py as h5
 import numpy as np
@@ -63,6 +64,155 @@ def get_bit(uint_array, bit):
     return np.bitwise_and(uint_array, 2 ** bit).astype(bool).astype(np.uint8)
 
 
+def correct_rollovers(times, rollover=4294967296):
+    """
+    Adds the counter rollover offset to an array of event times.  Every
+        decrease in the counter is treated as a single rollover.
+
+    Parameters
+    ----------
+    times : (numpy.ndarray)
+        Raw counter values.
+    rollover : (int)
+        Counter value at which the hardware counter wraps.
+
+    """
+    times = np.asarray(times).astype(np.int64)
+    intervals = np.ediff1d(times, to_begin=0)
+    offsets = np.cumsum(intervals < 0, axis=0, dtype=np.int64) * rollover
+    return times + offsets.reshape(times.shape)
+
+
+class EdgeIndex(object):
+    """
+    Per-bit index of the transitions in a sync dataset.  Edges for each bit
+        are stored contiguously (CSR layout), so requesting the events of a
+        single line costs O(edges) instead of a scan over every event.
+
+    Parameters
+    ----------
+    offsets : (numpy.ndarray)
+        (n_bits + 1,) start of each bit's edges in `times` and `rising`.
+    times : (numpy.ndarray)
+        Counter value (samples) of each edge, grouped by bit.
+    rising : (numpy.ndarray)
+        Boolean, True for rising edges and False for falling edges.
+
+    """
+    VERSION = 1
+
+    def __init__(self, offsets, times, rising):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.times = np.asarray(times)
+        self.rising = np.asarray(rising, dtype=bool)
+
+    @property
+    def n_bits(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_events(cls, bits, times, n_bits=32):
+        """
+        Builds an index from the IO state and counter value of every event.
+
+        Parameters
+        ----------
+        bits : (numpy.ndarray)
+            IO state of each event (last column of the data array).
+        times : (numpy.ndarray)
+            Counter value of each event, already corrected for rollovers.
+        n_bits : (int)
+            Number of bits to index.
+
+        """
+        bits = np.asarray(bits)
+        if bits.dtype.kind != 'u' or bits.dtype.itemsize * 8 < n_bits:
+            bits = bits.astype(np.uint64)
+        times = np.asarray(times).ravel()
+        changed = np.bitwise_xor(bits[1:], bits[:-1])
+
+        # only scan the bits that change at least once
+        active = int(np.bitwise_or.reduce(changed)) if len(changed) else 0
+
+        offsets = np.zeros(n_bits + 1, dtype=np.int64)
+        edge_times = [times[:0]]
+        edge_rising = [np.zeros(0, dtype=bool)]
+        for bit in range(n_bits):
+            if not (active >> bit) & 1:
+                offsets[bit + 1] = offsets[bit]
+                continue
+            mask = bits.dtype.type(1 << bit)
+            rows = np.flatnonzero(changed & mask) + 1
+            edge_times.append(times[rows])
+            edge_rising.append((bits[rows] & mask).astype(bool))
+            offsets[bit + 1] = offsets[bit] + len(rows)
+
+        return cls(offsets,
+                   np.concatenate(edge_times),
+                   np.concatenate(edge_rising))
+
+    def _slice(self, bit):
+        if not 0 <= bit < self.n_bits:
+            raise IndexError("Bit %i is not indexed." % bit)
+        return slice(self.offsets[bit], self.offsets[bit + 1])
+
+    def events(self, bit):
+        """
+        Returns the counter values of all transitions on a bit.
+        """
+        return self.times[self._slice(bit)]
+
+    def rising_edges(self, bit):
+        """
+        Returns the counter values of the rising edges on a bit.
+        """
+        sl = self._slice(bit)
+        return self.times[sl][self.rising[sl]]
+
+    def falling_edges(self, bit):
+        """
+        Returns the counter values of the falling edges on a bit.
+        """
+        sl = self._slice(bit)
+        return self.times[sl][~self.rising[sl]]
+
+    def save(self, path, source_path=None):
+        """
+        Writes the index to an npz file.  If `source_path` is given, its size
+            and modification time are stored so that stale caches can be
+            detected by `load`.
+        """
+        np.savez(path,
+                 version=self.VERSION,
+                 source_stat=_file_signature(source_path),
+                 offsets=self.offsets,
+                 times=self.times,
+                 rising=self.rising)
+
+    @classmethod
+    def load(cls, path, source_path=None):
+        """
+        Reads an index written by `save`.  Returns None if the file does not
+            exist or does not match `source_path`.
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as cache:
+            if int(cache['version']) != cls.VERSION:
+                return None
+            if source_path is not None and not np.array_equal(
+                    cache['source_stat'], _file_signature(source_path)):
+                return None
+            return cls(cache['offsets'], cache['times'], cache['rising'])
+
+
+def _file_signature(path):
+    if path is None:
+        return np.zeros(2, dtype=np.int64)
+    stat = os.stat(path)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
 class Dataset(object):
     """
     A sync dataset.  Contains methods for loading
@@ -72,6 +222,9 @@ class Dataset(object):
     ----------
     path : str
         Path to HDF5 file.
+    edge_cache : bool or str
+        Persist the per-bit edge index next to the HDF5 file (True) or at
+        the given path, and reuse it on later loads.
 
     Examples
     --------
@@ -92,8 +245,14 @@ class Dataset(object):
                          "eyetracking")  # previous line label for eye tracking (prior to ~ Oct. 2018)
     BEHAVIOR_TRACKING_KEYS = ("cam1_exposure",)  # clocks behavior tracking frame pulses (port 0, line 8)
 
-    def __init__(self, path):
-        self.dfile = self.load(path)
+    dfile = None
+    edge_index = None
+    _times = None
+    _edge_cache_path = None
+    _source_path = None
+
+    def __init__(self, path, edge_cache=False):
+        self.dfile = self.load(path, edge_cache=edge_cache)
 
     def _process_times(self):
         """
@@ -101,32 +260,75 @@ class Dataset(object):
             This is only relevant for event-based sampling.
 
         """
-        times = self.get_all_events()[:, 0:1].astype(np.int64)
+        return correct_rollovers(self.get_all_events()[:, 0:1])
 
-        intervals = np.ediff1d(times, to_begin=0)
-        rollovers = np.where(intervals < 0)[0]
-
-        for i in rollovers:
-            times[i:] += 4294967296
+    @property
+    def times(self):
+        if self._times is None:
+            self._times = self._process_times()
+        return self._times
 
-        return times
+    @times.setter
+    def times(self, value):
+        self._times = value
 
-    def load(self, path):
+    def load(self, path, edge_cache=False):
         """
-        Loads an hdf5 sync dataset.
+        Loads an hdf5 sync dataset.  Event data are read lazily, on the first
+            request that needs them.
 
         Parameters
         ----------
         path : str
             Path to hdf5 file.
+        edge_cache : bool or str
+            Where to persist the edge index.  True uses `<path>.edges.npz`,
+            False disables the cache.
 
         """
         self.dfile = h5.File(path, 'r')  # MG edit 3/15 removed 'r' because some sync files were unable to load
         self.meta_data = eval(self.dfile['meta'][()])
         self.line_labels = self.meta_data['line_labels']
-        self.times = self._process_times()
+        self.times = None
+        self.edge_index = None
+
+        if edge_cache is True:
+            edge_cache = path + '.edges.npz'
+        self._edge_cache_path = edge_cache or None
+        if self._edge_cache_path is not None:
+            self.edge_index = EdgeIndex.load(self._edge_cache_path, path)
+        self._source_path = path
+
         return self.dfile
 
+    def get_edge_index(self):
+        """
+        Returns the per-bit edge index, building it (and writing the cache,
+            if enabled) on first use.  Returns None for datasets that are not
+            backed by a file.
+
+        """
+        if self.edge_index is None and self.dfile is not None:
+            self.edge_index = EdgeIndex.from_events(
+                self.get_all_bits(), self.get_all_times('samples'))
+            if self._edge_cache_path is not None:
+                try:
+                    self.edge_index.save(self._edge_cache_path,
+                                         self._source_path)
+                except (IOError, OSError) as e:
+                    logger.warning("Unable to write edge cache %s: %s",
+                                   self._edge_cache_path, e)
+        return self.edge_index
+
+    def _edge_units(self, times, units):
+        units = units.lower()
+        if units == 'samples':
+            return times
+        elif units in ['seconds', 'sec', 'secs']:
+            return times / self.sample_freq
+        else:
+            raise ValueError("Only 'samples' or 'seconds' are valid units.")
+
     @property
     def sample_freq(self):
         try:
@@ -233,6 +435,9 @@ class Dataset(object):
             Bit for which to return events.
 
         """
+        index = self.get_edge_index()
+        if index is not None:
+            return self._edge_units(index.events(bit), units)
         changes = self.get_bit_changes(bit)
         return self.get_all_times(units)[np.where(changes != 0)]
 
@@ -291,6 +496,9 @@ class Dataset(object):
 
         """
         bit = self._line_to_bit(line)
+        index = self.get_edge_index()
+        if index is not None:
+            return self._edge_units(index.rising_edges(bit), units)
         changes = self.get_bit_changes(bit)
         return self.get_all_times(units)[np.where(changes == 1)]
 
@@ -330,6 +538,9 @@ class Dataset(object):
 
         """
         bit = self._line_to_bit(line)
+        index = self.get_edge_index()
+        if index is not None:
+            return self._edge_units(index.falling_edges(bit), units)
         changes = self.get_bit_changes(bit)
         return self.get_all_times(units)[np.where(changes == 255)]
 
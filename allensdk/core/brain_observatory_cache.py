@@ -34,6 +34,7 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 import os
+import json
 import six
 import numpy as np
 import pandas as pd
@@ -43,6 +44,7 @@ from pathlib import Path
 from allensdk.api.cache import Cache, get_default_manifest_file
 from allensdk.api.queries.brain_observatory_api import BrainObservatoryApi
 from allensdk.config.manifest_builder import ManifestBuilder
+from allensdk.config.manifest import Manifest
 from .brain_observatory_nwb_data_set import BrainObservatoryNwbDataSet
 import allensdk.brain_observatory.stimulus_info as stim_info
 
@@ -106,6 +108,8 @@ class BrainObservatoryCache(Cache):
     EYE_GAZE_DATA_KEY = 'EYE_GAZE_DATA'
     MANIFEST_VERSION = '1.3'
 
+    CELL_SPECIMENS_TABLE = 'cell_specimens'
+
     def __init__(self, cache=True, manifest_file=None, base_uri=None, api=None):
 
         if manifest_file is None:
@@ -454,7 +458,141 @@ class BrainObservatoryCache(Cache):
 
         return cell_specimens
 
-      
+    def get_cell_specimens_table(self,
+                                 file_name=None,
+                                 ids=None,
+                                 experiment_container_ids=None,
+                                 include_failed=False,
+                                 simple=True,
+                                 filters=None,
+                                 columns=None):
+        """ Return cell specimens that have certain properties as a DataFrame.
+
+        The first call converts the cell specimens JSON file into an HDF5 table
+        next to it (e.g. cell_specimens.h5).  Subsequent calls evaluate `ids`,
+        `experiment_container_ids`, `include_failed` and `filters` while reading
+        the table and only read the requested columns, so repeated queries do
+        not load every cell metric into memory.
+
+        Parameters
+        ----------
+        file_name: string
+            File name of the cell specimens JSON file.  If file_name is None,
+            the file_name will be pulled out of the manifest.  If caching is
+            disabled, the metrics are downloaded and filtered in memory.
+
+        ids: list
+            List of cell specimen ids.
+
+        experiment_container_ids: list
+            List of experiment container ids.
+
+        include_failed: bool
+            Whether to include cells from failed experiment containers
+
+        simple: boolean
+            Whether or not to drop the thumbnail columns.
+
+        filters: list of dicts
+            List of filter dictionaries.  See get_cell_specimens.
+
+        columns: list
+            Cell metric columns to return (default all).
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        _assert_not_string(columns, "columns")
+
+        file_name = self.get_cache_path(file_name, self.CELL_SPECIMENS_KEY)
+
+        if simple:
+            mappings = self._get_stimulus_mappings()
+            thumbnails = set(m['item'] for m in mappings
+                             if m['item_type'] == 'T' and m['level'] == 'R')
+        else:
+            thumbnails = set()
+
+        if file_name is None:
+            cell_specimens = self.get_cell_specimens(ids=ids,
+                                                     experiment_container_ids=experiment_container_ids,
+                                                     include_failed=include_failed,
+                                                     simple=simple,
+                                                     filters=filters)
+            table = pd.DataFrame(cell_specimens)
+            return table if columns is None else table[columns]
+
+        table_file_name = os.path.splitext(file_name)[0] + '.h5'
+        if not os.path.exists(table_file_name) or \
+                (os.path.exists(file_name) and
+                 os.path.getmtime(file_name) > os.path.getmtime(table_file_name)):
+            self._write_cell_specimens_table(file_name, table_file_name)
+
+        terms = []
+        with pd.HDFStore(table_file_name, mode='r') as store:
+            storer = store.get_storer(self.CELL_SPECIMENS_TABLE)
+            all_columns = list(storer.attrs.all_columns)
+            bool_columns = list(storer.attrs.bool_columns)
+            json_columns = list(getattr(storer.attrs, 'json_columns', []))
+
+            if not include_failed and 'failed_experiment_container' in all_columns:
+                terms.append('failed_experiment_container != True')
+
+            if ids is not None:
+                terms.append('cell_specimen_id == %s' % list(ids))
+
+            if experiment_container_ids is not None:
+                terms.append('experiment_container_id == %s' % list(experiment_container_ids))
+
+            if filters:
+                terms.extend(self.api.table_query_terms(filters))
+
+            if columns is None:
+                columns = [c for c in all_columns if c not in thumbnails]
+
+            if (ids is not None and len(ids) == 0) or \
+                    (experiment_container_ids is not None and len(experiment_container_ids) == 0):
+                table = store.select(self.CELL_SPECIMENS_TABLE, stop=0, columns=columns)
+            else:
+                table = store.select(self.CELL_SPECIMENS_TABLE,
+                                     where=terms or None,
+                                     columns=columns)
+
+        for c in bool_columns:
+            if c in table.columns:
+                table[c] = table[c].map({1.0: True, 0.0: False}).astype(object)
+                table.loc[table[c].isnull(), c] = None
+
+        for c in json_columns:
+            if c in table.columns:
+                table[c] = table[c].map(lambda v: json.loads(v) if isinstance(v, six.string_types) else None)
+
+        return table.reset_index(drop=True)
+
+    def _write_cell_specimens_table(self, file_name, table_file_name):
+        """ Convert the cell specimens JSON file to an HDF5 table with every
+        column queryable. """
+
+        cell_specimens = self.api.get_cell_metrics(path=file_name,
+                                                   strategy='lazy',
+                                                   pre= lambda x: [y for y in x],
+                                                   **Cache.cache_json())
+
+        table, bool_columns, json_columns = _records_to_table(cell_specimens)
+
+        Manifest.safe_make_parent_dirs(table_file_name)
+        with pd.HDFStore(table_file_name, mode='w') as store:
+            store.put(self.CELL_SPECIMENS_TABLE, table,
+                      format='table', data_columns=True, index=False)
+            store.create_table_index(self.CELL_SPECIMENS_TABLE,
+                                     columns=[c for c in ('cell_specimen_id', 'experiment_container_id')
+                                              if c in table.columns])
+            storer = store.get_storer(self.CELL_SPECIMENS_TABLE)
+            storer.attrs.all_columns = list(table.columns)
+            storer.attrs.bool_columns = bool_columns
+            storer.attrs.json_columns = json_columns
+
     def get_nwb_filepath(self, ophys_experiment_id=None):
         cache_nwb_filepath = self.get_cache_path(None, self.EXPERIMENT_DATA_KEY, ophys_experiment_id)
         if os.path.exists(cache_nwb_filepath):
@@ -659,6 +797,44 @@ class BrainObservatoryCache(Cache):
         mb.write_json_file(file_name)
 
 
+def _records_to_table(records):
+    """ Build a DataFrame from a list of records that can be written as a
+    PyTables table.  Boolean columns with missing values are stored as floats
+    (1, 0, nan) and their names returned so they can be restored; other mixed
+    object columns (eg. lists) are stored as JSON strings and their names
+    returned so they can be decoded.
+
+    Returns
+    -------
+    table: pandas.DataFrame
+
+    bool_columns: list
+
+    json_columns: list
+    """
+
+    table = pd.DataFrame(records)
+    bool_columns = []
+    json_columns = []
+
+    for c in table.columns:
+        if table[c].dtype != object:
+            continue
+
+        values = table[c][table[c].notnull()]
+        if values.map(lambda v: isinstance(v, (bool, np.bool_))).all():
+            if len(values) == len(table):
+                table[c] = table[c].astype(bool)
+            else:
+                table[c] = table[c].map({True: 1.0, False: 0.0}).astype(float)
+                bool_columns.append(c)
+        elif not values.map(lambda v: isinstance(v, six.string_types)).all():
+            table[c] = table[c].map(lambda v: None if v is None else json.dumps(v))
+            json_columns.append(c)
+
+    return table, bool_columns, json_columns
+
+
 def _assert_not_string(arg, name):
     if isinstance(arg, six.string_types):
         raise TypeError(
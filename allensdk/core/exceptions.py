@@ -24,3 +24,10 @@ class DataFrameIndexError(LookupError):
 
 class MissingDataError(ValueError):
     pass
+
+
+class StaleIndexError(RuntimeError):
+    """Raised when a cached lookup table no longer agrees with the data it
+    was built from.
+    """
+    pass
@@ -1,3 +1,10 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+
 class LazyProperty(object):
     
     def __init__(self, api_method, wrappers=tuple(), *args, **kwargs):
@@ -8,19 +15,67 @@ class LazyProperty(object):
         self.kwargs = kwargs
         self.value = None
 
+        # load bookkeeping, filled in by load()
+        self.loaded = False
+        self.load_time = None
+        self.nbytes = None
+        self._lock = threading.Lock()
+
     def __get__(self, obj, objtype=None):
         if obj is None:
             return self
 
-        if self.value is None:
-            self.value = self.calculate()
-        return self.value
+        return self.load()
 
     def __set__(self, obj, value):
         raise AttributeError("Can't set LazyLoadable attribute")
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def load(self):
+        """ Calculate the value on first call, recording how long that took
+        and roughly how much memory the result occupies. Safe to call from
+        several threads at once.
+        """
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    start = time.perf_counter()
+                    self.value = self.calculate()
+                    self.load_time = time.perf_counter() - start
+                    self.nbytes = estimate_nbytes(self.value)
+                    self.loaded = True
+        return self.value
+
     def calculate(self):
         result = self.api_method(*self.args, **self.kwargs)
         for wrapper in self.wrappers:
             result = wrapper(result)
         return result
+
+
+def estimate_nbytes(value):
+    """ Approximate in-memory size of a loaded value, in bytes. Arrays and
+    pandas objects report their buffer sizes (object columns are counted
+    shallowly); containers are summed over their contents.
+    """
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if hasattr(value, 'memory_usage'):
+        try:
+            usage = value.memory_usage(index=True)
+            return int(np.sum(usage))
+        except TypeError:
+            pass
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
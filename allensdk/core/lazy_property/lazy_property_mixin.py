@@ -1,29 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from .lazy_property import LazyProperty
 
 
 class LazyPropertyMixin(object):
+    """ Allows LazyProperty objects to be assigned as instance attributes.
+
+    A LazyProperty assigned to an attribute is held in a registry rather
+    than in the instance dictionary, so the first access to that attribute
+    falls through to __getattr__, which loads the value and stores it as a
+    plain instance attribute. Later accesses (and accesses to every other
+    attribute) are ordinary attribute lookups. An AttributeError raised
+    while loading is re-raised as a RuntimeError.
+    """
 
     @property
     def LazyProperty(self):
         return LazyProperty
 
-    def __getattribute__(self, name):
+    def __getattr__(self, name):
+        # only reached when normal lookup fails, ie. for lazy properties
+        #   that haven't been loaded yet
+        lazy_properties = self.__dict__.get('_lazy_properties', {})
+        if name in lazy_properties:
+            # an AttributeError escaping from here would be taken for a
+            #   missing attribute (and masked by any @property wrapping this
+            #   one), so report loading failures as a RuntimeError
+            try:
+                value = lazy_properties[name].load()
+            except AttributeError as err:
+                raise RuntimeError("failed to load lazy property '{}': {}".format(
+                    name, err)) from err
+            self.__dict__[name] = value
+            return value
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
 
-        lazy_class = super(LazyPropertyMixin, self).__getattribute__('LazyProperty')
-        curr_attr = super(LazyPropertyMixin, self).__getattribute__(name)
-        if isinstance(curr_attr, lazy_class):
-            return curr_attr.__get__(curr_attr)
+    def __setattr__(self, name, value):
+        lazy_properties = self.__dict__.setdefault('_lazy_properties', {})
+        if name in lazy_properties:
+            lazy_properties[name].__set__(self, value)
+        elif isinstance(value, LazyProperty):
+            lazy_properties[name] = value
         else:
-            return super(LazyPropertyMixin, self).__getattribute__(name)
+            super(LazyPropertyMixin, self).__setattr__(name, value)
 
+    @property
+    def lazy_load_stats(self):
+        """ Load time (seconds) and approximate size (bytes) of each lazy
+        property loaded so far.
 
-    def __setattr__(self, name, value):
-        if not hasattr(self, name):
-            super(LazyPropertyMixin, self).__setattr__(name, value)
-        else:
-            curr_attr = super(LazyPropertyMixin, self).__getattribute__(name)
-            lazy_class = super(LazyPropertyMixin, self).__getattribute__('LazyProperty')
-            if isinstance(curr_attr, lazy_class):
-                curr_attr.__set__(curr_attr, value)
-            else:
-                super(LazyPropertyMixin, self).__setattr__(name, value)
\ No newline at end of file
+        Returns
+        -------
+        dict :
+            Maps property names to dicts with keys 'load_time' and 'nbytes'.
+        """
+        return {
+            name: {'load_time': prop.load_time, 'nbytes': prop.nbytes}
+            for name, prop in self.__dict__.get('_lazy_properties', {}).items()
+            if prop.loaded
+        }
+
+    def prefetch(self, names=None, max_workers=None):
+        """ Load lazy properties concurrently in a thread pool. This is opt-in:
+        it overlaps reads when the underlying api releases the GIL while
+        waiting on IO.
+
+        Parameters
+        ----------
+        names : list of str, optional
+            Lazy properties to load. Defaults to all of them. Properties
+            that are already loaded are skipped.
+        max_workers : int, optional
+            Passed to concurrent.futures.ThreadPoolExecutor.
+
+        Returns
+        -------
+        dict :
+            lazy_load_stats, after loading
+        """
+        lazy_properties = self.__dict__.get('_lazy_properties', {})
+        if names is None:
+            names = list(lazy_properties)
+
+        unknown = [name for name in names if name not in lazy_properties]
+        if unknown:
+            raise ValueError("not lazy properties: {}".format(unknown))
+
+        pending = [name for name in names if name not in self.__dict__]
+        if pending:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(getattr, self, name) for name in pending]
+                for future in futures:
+                    future.result()
+
+        return self.lazy_load_stats
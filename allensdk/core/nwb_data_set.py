@@ -33,13 +33,71 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 #
+from contextlib import contextmanager
 import h5py
 import numpy as np
 
 
+class SweepArray(object):
+    """ A stimulus or response array that is read on demand.  Slicing
+    reads only the requested samples, from the HDF5 file or a memory map,
+    and applies the unit conversion to them.  Use np.asarray to read the
+    whole array.
+    """
+
+    def __init__(self, data, conversion=None):
+        self.data = data
+        self.conversion = conversion
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, key):
+        values = self.data[key]
+        if self.conversion is not None:
+            values = values * self.conversion
+        return values
+
+    def __array__(self, dtype=None):
+        values = np.asarray(self[()])
+        return values if dtype is None else values.astype(dtype)
+
+
+def memmap_dataset(dataset):
+    """ Memory map a contiguous, uncompressed HDF5 dataset.
+
+    Returns
+    -------
+    np.memmap or None
+        None if the dataset is chunked, compressed, not numeric,
+        or has no storage allocated.
+    """
+    if dataset.chunks is not None or dataset.dtype.kind not in 'biuf':
+        return None
+
+    offset = dataset.id.get_offset()
+    if offset is None:
+        return None
+
+    return np.memmap(dataset.file.filename, mode='r', dtype=dataset.dtype,
+                     shape=dataset.shape, offset=offset)
+
+
 class NwbDataSet(object):
     """ A very simple interface for exracting electrophysiology data
     from an NWB file.
+
+    Every method opens and closes the file on its own.  To read many sweeps
+    without reopening the file each time, use the data set as a context
+    manager (or call `open` and `close`).  While it is open, the file's
+    pipeline version and each sweep's conversion metadata are cached::
+
+        with NwbDataSet(file_name) as data_set:
+            sweeps = data_set.get_sweeps([10, 11, 12])
     """
     SPIKE_TIMES = "spike_times"
     DEPRECATED_SPIKE_TIMES = "aibs_spike_times"
@@ -58,7 +116,54 @@ class NwbDataSet(object):
         else:
             self.spike_time_key = spike_time_key
 
-    def get_sweep(self, sweep_number):
+        self._file = None
+        self._version = None
+        self._sweep_info = {}
+
+    def open(self, mode='r'):
+        """ Keep one handle to the NWB file open until `close` is called.
+
+        Parameters
+        ----------
+        mode: string
+           h5py file mode.  Use 'r+' if the data set will be modified
+           while open.
+        """
+        if self._file is None:
+            self._file = h5py.File(self.file_name, mode)
+        return self
+
+    def close(self):
+        """ Close the handle opened by `open` and drop cached metadata. """
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._version = None
+        self._sweep_info = {}
+
+    @property
+    def is_open(self):
+        return self._file is not None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def _h5_file(self, mode='r'):
+        """ Use the open file handle if there is one, otherwise open the
+        file for the duration of the block. """
+        if self._file is None:
+            with h5py.File(self.file_name, mode) as f:
+                yield f
+        elif mode == 'r' or self._file.mode == 'r+':
+            yield self._file
+        else:
+            raise IOError("%s is open read-only" % self.file_name)
+
+    def get_sweep(self, sweep_number, lazy=False, mmap=False):
         """ Retrieve the stimulus, response, index_range, and sampling rate
         for a particular sweep.  This method hides the NWB file's distinction
         between a "Sweep" and an "Experiment".  An experiment is a subset of
@@ -75,6 +180,14 @@ class NwbDataSet(object):
         ----------
         sweep_number: int
 
+        lazy: boolean
+            Return stimulus and response as SweepArrays that read from the
+            file when sliced.  Requires the data set to be open.
+
+        mmap: boolean
+            Return stimulus and response as SweepArrays backed by memory
+            maps of the file where the data layout allows it.
+
         Returns
         -------
         dict
@@ -83,74 +196,147 @@ class NwbDataSet(object):
             the first element indicates the end of the test pulse and the
             second index is the end of valid response data.
         """
-        with h5py.File(self.file_name, 'r') as f:
+        return self.get_sweeps([sweep_number], lazy=lazy, mmap=mmap)[sweep_number]
 
-            swp = f['epochs']['Sweep_%d' % sweep_number]
+    def get_sweeps(self, sweep_numbers=None, lazy=False, mmap=False):
+        """ Retrieve many sweeps with a single pass over the file.
+        See `get_sweep` for a description of each sweep.
 
-            # fetch data from file and convert to correct SI unit
-            # this operation depends on file version. early versions of
-            #   the file have incorrect conversion information embedded
-            #   in the nwb file and data was stored in the appropriate
-            #   SI unit. For those files, return uncorrected data.
-            #   For newer files (1.1 and later), apply conversion value.
-            major, minor = self.get_pipeline_version()
-            if (major == 1 and minor > 0) or major > 1:
-                # stimulus
-                stimulus_dataset = swp['stimulus']['timeseries']['data']
-                conversion = float(stimulus_dataset.attrs["conversion"])
-                stimulus = stimulus_dataset.value * conversion
-                # acquisition
-                response_dataset = swp['response']['timeseries']['data']
-                conversion = float(response_dataset.attrs["conversion"])
-                response = response_dataset.value * conversion
-            else:   # old file version
-                stimulus_dataset = swp['stimulus']['timeseries']['data']
-                stimulus = stimulus_dataset.value
-                response = swp['response']['timeseries']['data'].value
-
-            if 'unit' in stimulus_dataset.attrs:
-                unit = stimulus_dataset.attrs["unit"].decode('UTF-8')
-
-                unit_str = None
-                if unit.startswith('A'):
-                    unit_str = "Amps"
-                elif unit.startswith('V'):
-                    unit_str = "Volts"
-                assert unit_str is not None, Exception(
-                    "Stimulus time series unit not recognized")
-            else:
-                unit = None
-                unit_str = 'Unknown'
+        Parameters
+        ----------
+        sweep_numbers: list
+            Sweeps to read (default all sweeps)
 
-            swp_idx_start = swp['stimulus']['idx_start'].value
-            swp_length = swp['stimulus']['count'].value
+        lazy: boolean
+            Return stimulus and response as SweepArrays that read from the
+            file when sliced.  Requires the data set to be open.
 
-            swp_idx_stop = swp_idx_start + swp_length - 1
-            sweep_index_range = (swp_idx_start, swp_idx_stop)
+        mmap: boolean
+            Return stimulus and response as SweepArrays backed by memory
+            maps of the file.  Data that cannot be mapped is read lazily
+            if the data set is open, otherwise it is read in full.
 
-            # if the sweep has an experiment, extract the experiment's index
-            # range
-            try:
-                exp = f['epochs']['Experiment_%d' % sweep_number]
-                exp_idx_start = exp['stimulus']['idx_start'].value
-                exp_length = exp['stimulus']['count'].value
-                exp_idx_stop = exp_idx_start + exp_length - 1
-                experiment_index_range = (exp_idx_start, exp_idx_stop)
-            except KeyError:
-                # this sweep has no experiment.  return the index range of the
-                # entire sweep.
-                experiment_index_range = sweep_index_range
+        Returns
+        -------
+        dict
+            Sweep dictionaries keyed by sweep number.
+        """
+        if lazy and not self.is_open:
+            raise ValueError("lazy sweep arrays require an open data set")
+
+        with self._h5_file() as f:
+            if sweep_numbers is None:
+                sweep_numbers = self._sweep_numbers(f, 'Sweep_')
 
-            assert sweep_index_range[0] == 0, Exception(
-                "index range of the full sweep does not start at 0.")
+            sweeps = {}
+            for sweep_number in sweep_numbers:
+                sweeps[sweep_number] = self._read_sweep(f, sweep_number, lazy, mmap)
 
-            return {
-                'stimulus': stimulus,
-                'response': response,
-                'stimulus_unit' : unit_str,
-                'index_range': experiment_index_range,
-                'sampling_rate': 1.0 * swp['stimulus']['timeseries']['starting_time'].attrs['rate']
-            }
+            return sweeps
+
+    def _read_sweep(self, f, sweep_number, lazy, mmap):
+        info = self._get_sweep_info(f, sweep_number)
+        swp = f['epochs']['Sweep_%d' % sweep_number]
+
+        stimulus_dataset = swp['stimulus']['timeseries']['data']
+        response_dataset = swp['response']['timeseries']['data']
+
+        return {
+            'stimulus': self._read_data(stimulus_dataset, info['stimulus_conversion'], lazy, mmap),
+            'response': self._read_data(response_dataset, info['response_conversion'], lazy, mmap),
+            'stimulus_unit': info['stimulus_unit'],
+            'index_range': info['index_range'],
+            'sampling_rate': info['sampling_rate']
+        }
+
+    def _read_data(self, dataset, conversion, lazy, mmap):
+        if mmap:
+            data = memmap_dataset(dataset)
+            if data is not None:
+                return SweepArray(data, conversion)
+
+        if lazy or (mmap and self.is_open):
+            return SweepArray(dataset, conversion)
+
+        values = dataset[()]
+        if conversion is not None:
+            values = values * conversion
+        return values
+
+    def _get_sweep_info(self, f, sweep_number):
+        """ Read the conversion factors, units, index range and sampling
+        rate of a sweep.  Cached while the data set is open. """
+        if sweep_number in self._sweep_info:
+            return self._sweep_info[sweep_number]
+
+        swp = f['epochs']['Sweep_%d' % sweep_number]
+        stimulus_dataset = swp['stimulus']['timeseries']['data']
+        response_dataset = swp['response']['timeseries']['data']
+
+        # fetch data from file and convert to correct SI unit
+        # this operation depends on file version. early versions of
+        #   the file have incorrect conversion information embedded
+        #   in the nwb file and data was stored in the appropriate
+        #   SI unit. For those files, return uncorrected data.
+        #   For newer files (1.1 and later), apply conversion value.
+        major, minor = self._get_pipeline_version(f)
+        if (major == 1 and minor > 0) or major > 1:
+            stimulus_conversion = float(stimulus_dataset.attrs["conversion"])
+            response_conversion = float(response_dataset.attrs["conversion"])
+        else:   # old file version
+            stimulus_conversion = None
+            response_conversion = None
+
+        if 'unit' in stimulus_dataset.attrs:
+            unit = stimulus_dataset.attrs["unit"]
+            if isinstance(unit, bytes):
+                unit = unit.decode('UTF-8')
+
+            unit_str = None
+            if unit.startswith('A'):
+                unit_str = "Amps"
+            elif unit.startswith('V'):
+                unit_str = "Volts"
+            assert unit_str is not None, Exception(
+                "Stimulus time series unit not recognized")
+        else:
+            unit = None
+            unit_str = 'Unknown'
+
+        swp_idx_start = swp['stimulus']['idx_start'][()]
+        swp_length = swp['stimulus']['count'][()]
+
+        swp_idx_stop = swp_idx_start + swp_length - 1
+        sweep_index_range = (swp_idx_start, swp_idx_stop)
+
+        # if the sweep has an experiment, extract the experiment's index
+        # range
+        try:
+            exp = f['epochs']['Experiment_%d' % sweep_number]
+            exp_idx_start = exp['stimulus']['idx_start'][()]
+            exp_length = exp['stimulus']['count'][()]
+            exp_idx_stop = exp_idx_start + exp_length - 1
+            experiment_index_range = (exp_idx_start, exp_idx_stop)
+        except KeyError:
+            # this sweep has no experiment.  return the index range of the
+            # entire sweep.
+            experiment_index_range = sweep_index_range
+
+        assert sweep_index_range[0] == 0, Exception(
+            "index range of the full sweep does not start at 0.")
+
+        info = {
+            'stimulus_conversion': stimulus_conversion,
+            'response_conversion': response_conversion,
+            'stimulus_unit': unit_str,
+            'index_range': experiment_index_range,
+            'sampling_rate': 1.0 * swp['stimulus']['timeseries']['starting_time'].attrs['rate']
+        }
+
+        if self.is_open:
+            self._sweep_info[sweep_number] = info
+
+        return info
 
     def set_sweep(self, sweep_number, stimulus, response):
         """ Overwrite the stimulus or response of an NWB file.
@@ -169,16 +355,16 @@ class NwbDataSet(object):
             Overwrite the response with this array.  If None, response is unchanged.
         """
 
-        with h5py.File(self.file_name, 'r+') as f:
+        with self._h5_file('r+') as f:
             swp = f['epochs']['Sweep_%d' % sweep_number]
 
             # this is the length of the entire sweep data, including test pulse and
             # whatever might be in front of it
             # TODO: remove deprecated 'idx_stop'
             if 'idx_stop' in swp['stimulus']:
-                sweep_length = swp['stimulus']['idx_stop'].value + 1
+                sweep_length = swp['stimulus']['idx_stop'][()] + 1
             else:
-                sweep_length = swp['stimulus']['count'].value
+                sweep_length = swp['stimulus']['count'][()]
 
             if stimulus is not None:
                 # if the data is shorter than the sweep, pad it with zeros
@@ -206,17 +392,30 @@ class NwbDataSet(object):
             int tuple: (major, minor)
         """
         try:
-            with h5py.File(self.file_name, 'r') as f:
-                if 'generated_by' in f["general"]:
-                    info = f["general/generated_by"]
-                    # generated_by stores array of keys and values
-                    # keys are even numbered, corresponding values are in
-                    #   odd indices
-                    for i in range(len(info)):
-                        val = info[i]
-                        if info[i] == 'version':
-                            version = info[i+1]
-                            break
+            with self._h5_file() as f:
+                return self._get_pipeline_version(f)
+        except:
+            return 0, 0
+
+    def _get_pipeline_version(self, f):
+        if self._version is not None:
+            return self._version
+
+        try:
+            if 'generated_by' in f["general"]:
+                info = f["general/generated_by"]
+                # generated_by stores array of keys and values
+                # keys are even numbered, corresponding values are in
+                #   odd indices
+                for i in range(len(info)):
+                    val = info[i]
+                    if isinstance(val, bytes):
+                        val = val.decode('UTF-8')
+                    if val == 'version':
+                        version = info[i+1]
+                        if isinstance(version, bytes):
+                            version = version.decode('UTF-8')
+                        break
             toks = version.split('.')
             if len(toks) >= 2:
                 major = int(toks[0])
@@ -224,6 +423,10 @@ class NwbDataSet(object):
         except:
             minor = 0
             major = 0
+
+        if self.is_open:
+            self._version = (major, minor)
+
         return major, minor
 
     def get_spike_times(self, sweep_number, key=None):
@@ -245,14 +448,14 @@ class NwbDataSet(object):
         if key is None:
             key = self.spike_time_key
 
-        with h5py.File(self.file_name, 'r') as f:
+        with self._h5_file() as f:
             sweep_name = "Sweep_%d" % sweep_number
             datasets = ["analysis/%s/Sweep_%d" % (key, sweep_number),
                         "analysis/%s/Sweep_%d" % (self.DEPRECATED_SPIKE_TIMES, sweep_number)]
 
             for ds in datasets:
                 if ds in f:
-                    return f[ds].value
+                    return f[ds][()]
             return []
 
     def set_spike_times(self, sweep_number, spike_times, key=None):
@@ -272,7 +475,7 @@ class NwbDataSet(object):
         if key is None:
             key = self.spike_time_key
 
-        with h5py.File(self.file_name, 'r+') as f:
+        with self._h5_file('r+') as f:
             # make sure expected directory structure is in place
             if "analysis" not in f.keys():
                 f.create_group("analysis")
@@ -301,18 +504,19 @@ class NwbDataSet(object):
     def get_sweep_numbers(self):
         """ Get all of the sweep numbers in the file, including test sweeps. """
 
-        with h5py.File(self.file_name, 'r') as f:
-            sweeps = [int(e.split('_')[1])
-                      for e in f['epochs'].keys() if e.startswith('Sweep_')]
-            return sweeps
+        with self._h5_file() as f:
+            return self._sweep_numbers(f, 'Sweep_')
 
     def get_experiment_sweep_numbers(self):
         """ Get all of the sweep numbers for experiment epochs in the file, not including test sweeps. """
 
-        with h5py.File(self.file_name, 'r') as f:
-            sweeps = [int(e.split('_')[1])
-                      for e in f['epochs'].keys() if e.startswith('Experiment_')]
-            return sweeps
+        with self._h5_file() as f:
+            return self._sweep_numbers(f, 'Experiment_')
+
+    @staticmethod
+    def _sweep_numbers(f, prefix):
+        return [int(e.split('_')[1])
+                for e in f['epochs'].keys() if e.startswith(prefix)]
 
     def fill_sweep_responses(self, fill_value=0.0, sweep_numbers=None, extend_experiment=False):
         """ Fill sweep response arrays with a single value.
@@ -330,9 +534,9 @@ class NwbDataSet(object):
 
         """
 
-        with h5py.File(self.file_name, 'a') as f:
+        with self._h5_file('a') as f:
             if sweep_numbers is None:
-                sweep_numbers = self.get_sweep_numbers()
+                sweep_numbers = self._sweep_numbers(f, 'Sweep_')
 
             for sweep_number in sweep_numbers:
                 epoch = "Sweep_%d" % sweep_number
@@ -343,7 +547,7 @@ class NwbDataSet(object):
                 if extend_experiment:
                     epoch = "Experiment_%d" % sweep_number
                     if epoch in f['epochs']:
-                        idx_start = f['epochs'][epoch]['stimulus']['idx_start'].value
+                        idx_start = f['epochs'][epoch]['stimulus']['idx_start'][()]
                         count = f['epochs'][epoch]['stimulus']['timeseries']['data'].shape[0]
 
                         del f['epochs'][epoch]['stimulus']['count']
@@ -367,7 +571,7 @@ class NwbDataSet(object):
             'gain', 'initial_access_resistance', 'seal' elements.  These specific
             fields are ones encoded in the original AIBS in vitro .nwb files.
         """
-        with h5py.File(self.file_name, 'r') as f:
+        with self._h5_file() as f:
 
             sweep_metadata = {}
 
@@ -383,7 +587,7 @@ class NwbDataSet(object):
                 for field in metadata_fields:
                     # check if sweep contains the specific metadata field
                     if field in stim_details.keys():
-                        sweep_metadata[field] = stim_details[field].value
+                        sweep_metadata[field] = stim_details[field][()]
 
             except KeyError:
                 sweep_metadata = {}
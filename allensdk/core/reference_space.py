@@ -324,12 +324,14 @@ class ReferenceSpace(object):
         
         '''
         
-        if cmap is None:
-            cmap = self.structure_tree.get_colormap()
-            cmap[0] = [0, 0, 0]
-        
         position = int(np.around(position / self.resolution[axis]))
         image = np.squeeze(self.annotation.take([position], axis=axis))
+
+        if cmap is None:
+            labeled = image != 0
+            rgb = np.zeros(image.shape + (3,), dtype=np.uint8)
+            rgb[labeled] = self.structure_tree.colors_from_ids(image[labeled])
+            return rgb
             
         return np.reshape([cmap[point] for point in image.flat], 
                       list(image.shape) + [3]).astype(np.uint8)
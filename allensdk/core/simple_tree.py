@@ -38,9 +38,14 @@ import operator as op
 from collections import defaultdict
 from six import iteritems
 
+from allensdk.core.exceptions import StaleIndexError
+
 from allensdk.deprecated import deprecated
 
 
+_MISSING = object()
+
+
 class SimpleTree( object ):
     def __init__(self, nodes, 
                  node_id_cb, 
@@ -84,6 +89,64 @@ class SimpleTree( object ):
         self.node_id_cb = node_id_cb
         self.parent_id_cb = parent_id_cb
 
+        self._cache = {}
+
+
+    def invalidate_caches(self):
+        '''Discard all cached lookup tables. Call this after modifying node 
+        dictionaries in place - lookups by property will be rebuilt on next 
+        use.
+        
+        nodes_by_property notices when an indexed node's value has changed 
+        and rebuilds that index itself, but a value newly given to a node is 
+        not found until the caches are invalidated. Other cached tables 
+        (including those of subclasses) are never checked.
+        
+        '''
+
+        self._cache.clear()
+
+
+    def _cached(self, key, builder):
+        '''Obtain a cached value, building it on first access.
+        
+        Parameters
+        ----------
+        key : hashable
+            Identifies the cached value.
+        builder : function | () => value
+            Called to compute the value if it is not cached.
+            
+        '''
+
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = builder()
+            self._cache[key] = value
+            return value
+
+
+    def property_index(self, key):
+        '''Obtain a cached look-up table from a node property to nodes.
+        
+        Parameters
+        ----------
+        key : hashable
+            The property used for lookup. Should be unique across nodes.
+            
+        Returns
+        -------
+        dict : 
+            Maps values of the property to node dictionaries. This dictionary 
+            is shared by subsequent calls and should not be modified.
+            
+        '''
+
+        return self._cached(('property_index', key), 
+                            lambda: self.value_map(lambda x: x[key], 
+                                                   lambda y: y))
+
 
     def filter_nodes(self, criterion):
         '''Obtain a list of nodes filtered by some criterion
@@ -161,13 +224,37 @@ class SimpleTree( object ):
         if to_fn is None:
             to_fn = lambda x: x
 
-        if not callable( key ):
-            from_fn = lambda x: x[key]
-        else:
-            from_fn = key
+        if callable( key ):
+            value_map = self.value_map( key, to_fn )
+            return [ value_map[vv] for vv in values ]
+
+        try:
+            found = self._lookup_property(key, values)
+        except StaleIndexError:
+            # the index predates in-place edits to the nodes
+            self._cache.pop(('property_index', key), None)
+            found = self._lookup_property(key, values)
+
+        return [ to_fn(node) for node in found ]
+
+
+    def _lookup_property(self, key, values):
+        '''Look up nodes by property, checking that each indexed node still 
+        carries the requested value. Raises KeyError for values missing from 
+        the index and StaleIndexError for indexed nodes whose value has since 
+        changed.
+        '''
+
+        index = self.property_index(key)
+
+        found = []
+        for vv in values:
+            node = index[vv]
+            if node.get(key, _MISSING) != vv:
+                raise StaleIndexError('stale property index for {0}'.format(key))
+            found.append(node)
 
-        value_map = self.value_map( from_fn, to_fn )
-        return [ value_map[vv] for vv in values ]
+        return found
 
 
     def node_ids(self):
@@ -74,6 +74,14 @@ class StructureTree( SimpleTree ):
             'structure_set_ids' : list of int
                 Unique identifiers of structure sets to which this structure 
                 belongs.
+                
+        Notes
+        -----
+        Lookup tables derived from the nodes - the colormap, name, acronym 
+        and ancestor maps, the structure set index, and the tables behind 
+        map_structure_ids, ancestor_ids_at_level and descends_from_mask - 
+        are built once and cached. If you modify node dictionaries in place, 
+        call invalidate_caches() before using any of them.
         
         '''
         
@@ -156,8 +164,33 @@ class StructureTree( SimpleTree ):
             
         '''
         
-        overlap = lambda x: (set(structure_set_ids) & set(x['structure_set_ids']))
-        return self.filter_nodes(overlap)
+        index = self._structure_set_index()
+        positions = [index[ssid] for ssid in set(structure_set_ids) 
+                     if ssid in index]
+        if not positions:
+            return []
+
+        nodes = self._cached('node_list', self.nodes)
+        return [nodes[ii] for ii in np.unique(np.concatenate(positions))]
+
+
+    def get_structures_by_graph_order(self, graph_orders):
+        '''Obtain a list of brain structures from their positions in the 
+        flattened structure graph.
+        
+        Parameters
+        ----------
+        graph_orders : list of int
+            Get structures corresponding to these graph orders.
+            
+        Returns
+        -------
+        list of dict : 
+            Each item describes a structure.
+            
+        '''
+
+        return self.nodes_by_property('graph_order', graph_orders)
         
         
     def get_colormap(self):
@@ -170,8 +203,9 @@ class StructureTree( SimpleTree ):
         
         '''
     
-        return self.value_map(lambda x: x['id'], 
-                              lambda y: y['rgb_triplet'])
+        return dict(self._cached('colormap', 
+                                 lambda: self.value_map(lambda x: x['id'], 
+                                                        lambda y: y['rgb_triplet'])))
 
                               
                               
@@ -185,8 +219,9 @@ class StructureTree( SimpleTree ):
         
         '''
     
-        return self.value_map(lambda x: x['id'], 
-                              lambda y: y['name'])
+        return dict(self._cached('name_map', 
+                                 lambda: self.value_map(lambda x: x['id'], 
+                                                        lambda y: y['name'])))
         
         
     def get_id_acronym_map(self):
@@ -199,8 +234,9 @@ class StructureTree( SimpleTree ):
         
         '''
         
-        return self.value_map(lambda x: x['acronym'], 
-                              lambda y: y['id'])
+        return dict(self._cached('id_acronym_map', 
+                                 lambda: self.value_map(lambda x: x['acronym'], 
+                                                        lambda y: y['id'])))
         
         
     def get_ancestor_id_map(self):
@@ -214,8 +250,10 @@ class StructureTree( SimpleTree ):
         
         '''
 
-        return self.value_map(lambda x: x['id'], 
-                              lambda y: self.ancestor_ids([y['id']])[0])
+        ancestor_map = self._cached('ancestor_id_map', 
+                                    lambda: self.value_map(lambda x: x['id'], 
+                                                           lambda y: self.ancestor_ids([y['id']])[0]))
+        return {stid: list(ancestors) for stid, ancestors in iteritems(ancestor_map)}
         
         
     def structure_descends_from(self, child_id, parent_id):
@@ -250,8 +288,7 @@ class StructureTree( SimpleTree ):
         
         '''
         
-        return set(functools.reduce(op.add, map(lambda x: x['structure_set_ids'], 
-                                                self.nodes())))
+        return set(self._structure_set_index())
         
         
     def has_overlaps(self, structure_ids):
@@ -277,6 +314,261 @@ class StructureTree( SimpleTree ):
         return (set(ancestor_ids) & set(structure_ids))
         
 
+
+    def _structure_set_index(self):
+        '''Cached map from structure set ids to arrays of node positions 
+        (in the order of self.nodes()) of the member structures.
+        '''
+
+        def build():
+            index = {}
+            for ii, node in enumerate(self.nodes()):
+                for ssid in node['structure_set_ids']:
+                    index.setdefault(ssid, []).append(ii)
+            return {ssid: np.array(pos, dtype=int) 
+                    for ssid, pos in iteritems(index)}
+
+        return self._cached('structure_set_index', build)
+
+
+    def _id_lookup(self):
+        '''Cached sorted structure ids, along with the position of each 
+        sorted id in self.nodes().
+        '''
+
+        def build():
+            ids = np.array(self.node_ids(), dtype=np.int64)
+            order = np.argsort(ids, kind='mergesort')
+            return ids[order], order
+
+        return self._cached('id_lookup', build)
+
+
+    def _structure_positions(self, structure_ids):
+        '''Find the positions in self.nodes() of an array of structure ids.
+
+        Returns
+        -------
+        positions : np.ndarray of int
+            Same shape as structure_ids. Entries for unknown ids are 
+            arbitrary.
+        found : np.ndarray of bool
+            Same shape as structure_ids. False where the id is not in the 
+            tree.
+
+        '''
+
+        structure_ids = np.asarray(structure_ids)
+        sorted_ids, order = self._id_lookup()
+
+        if sorted_ids.size == 0:
+            return (np.zeros(structure_ids.shape, dtype=int), 
+                    np.zeros(structure_ids.shape, dtype=bool))
+
+        sorted_positions = np.searchsorted(sorted_ids, structure_ids)
+        np.clip(sorted_positions, 0, sorted_ids.size - 1, out=sorted_positions)
+        found = sorted_ids[sorted_positions] == structure_ids
+
+        return order[sorted_positions], found
+
+
+    def _field_table(self, field):
+        '''Cached array holding one node property per node, in the order of 
+        self.nodes().
+        '''
+
+        def build():
+            values = [node[field] for node in self.nodes()]
+            try:
+                return np.asarray(values)
+            except ValueError:
+                # ragged, list-valued properties
+                table = np.empty(len(values), dtype=object)
+                for ii, value in enumerate(values):
+                    table[ii] = value
+                return table
+
+        return self._cached(('field_table', field), build)
+
+
+    def _ancestor_table(self):
+        '''Cached array of structure id paths, padded with -1. Row i 
+        holds the path of the ith node in self.nodes().
+        '''
+
+        def build():
+            paths = [node['structure_id_path'] for node in self.nodes()]
+            depth = max([len(path) for path in paths] + [0])
+
+            table = np.full((len(paths), depth), -1, dtype=np.int64)
+            for ii, path in enumerate(paths):
+                table[ii, :len(path)] = path
+            return table
+
+        return self._cached('ancestor_table', build)
+
+
+    def map_structure_ids(self, structure_ids, field, fill_value=None):
+        '''Look up a structure property for each element of an array of 
+        structure ids.
+        
+        Parameters
+        ----------
+        structure_ids : array-like of int
+            Look up properties for these structures. May have any shape 
+            (e.g. an annotation volume).
+        field : str
+            Which structure property to obtain, e.g. 'acronym'.
+        fill_value : optional
+            Used for ids that are not in the tree. If not provided, unknown 
+            ids raise a KeyError.
+            
+        Returns
+        -------
+        np.ndarray : 
+            Same shape as structure_ids, with trailing dimensions for 
+            vector-valued properties (such as 'rgb_triplet').
+            
+        '''
+
+        table = self._field_table(field)
+        positions, found = self._structure_positions(structure_ids)
+        values = table.take(positions, axis=0)
+
+        if found.all():
+            return values
+
+        if fill_value is None:
+            missing = np.unique(np.asarray(structure_ids)[~found])
+            raise KeyError('structure ids not in tree: {0}'.format(missing.tolist()))
+
+        found = found.reshape(found.shape + (1,) * (values.ndim - found.ndim))
+        return np.where(found, values, fill_value)
+
+
+    def acronyms_from_ids(self, structure_ids, fill_value=None):
+        '''Obtain an array of structure acronyms from an array of structure 
+        ids. See map_structure_ids.
+        '''
+
+        return self.map_structure_ids(structure_ids, 'acronym', fill_value)
+
+
+    def names_from_ids(self, structure_ids, fill_value=None):
+        '''Obtain an array of structure names from an array of structure 
+        ids. See map_structure_ids.
+        '''
+
+        return self.map_structure_ids(structure_ids, 'name', fill_value)
+
+
+    def colors_from_ids(self, structure_ids, fill_value=None):
+        '''Obtain an array of RGB colors from an array of structure ids. 
+        
+        Parameters
+        ----------
+        structure_ids : array-like of int
+            Look up colors for these structures.
+        fill_value : int or list of int, optional
+            Color used for ids that are not in the tree. If not provided, 
+            unknown ids raise a KeyError.
+            
+        Returns
+        -------
+        np.ndarray of uint8 : 
+            Shape is that of structure_ids, plus a trailing axis of length 3.
+        
+        '''
+
+        colors = self.map_structure_ids(structure_ids, 'rgb_triplet', fill_value)
+        return colors.astype(np.uint8)
+
+
+    def ids_from_acronyms(self, acronyms):
+        '''Obtain an array of structure ids from an array of acronyms.
+        
+        Parameters
+        ----------
+        acronyms : array-like of str
+            May have any shape.
+            
+        Returns
+        -------
+        np.ndarray of int : 
+            Same shape as acronyms.
+        
+        '''
+
+        acronyms = np.asarray(acronyms)
+        unique, inverse = np.unique(acronyms, return_inverse=True)
+
+        id_map = self._cached('id_acronym_map', 
+                              lambda: self.value_map(lambda x: x['acronym'], 
+                                                     lambda y: y['id']))
+        unique_ids = np.array([id_map[acronym] for acronym in unique.tolist()], 
+                              dtype=np.int64)
+
+        return unique_ids[inverse].reshape(acronyms.shape)
+
+
+    def ancestor_ids_at_level(self, structure_ids, level, fill_value=-1):
+        '''For each of an array of structure ids, find the id of its 
+        ancestor at a given depth in the structure graph.
+        
+        Parameters
+        ----------
+        structure_ids : array-like of int
+            Find ancestors of these structures. May have any shape.
+        level : int
+            Depth of the ancestor, counted along each structure's 
+            structure_id_path. 0 is the root.
+        fill_value : int, optional
+            Used for structures shallower than level and for ids that are not 
+            in the tree. Default is -1.
+            
+        Returns
+        -------
+        np.ndarray of int : 
+            Same shape as structure_ids.
+        
+        '''
+
+        table = self._ancestor_table()
+        positions, found = self._structure_positions(structure_ids)
+
+        if level < 0 or level >= table.shape[1]:
+            return np.full(positions.shape, fill_value, dtype=np.int64)
+
+        ancestors = table[:, level].take(positions)
+        return np.where(found & (ancestors != -1), ancestors, fill_value)
+
+
+    def descends_from_mask(self, structure_ids, parent_id):
+        '''Tests, for each of an array of structure ids, whether that 
+        structure is (or descends from) a given structure.
+        
+        Parameters
+        ----------
+        structure_ids : array-like of int
+            Test these structures. May have any shape. Ids that are not in 
+            the tree are marked False.
+        parent_id : int
+            Id of the putative ancestor.
+            
+        Returns
+        -------
+        np.ndarray of bool : 
+            Same shape as structure_ids.
+        
+        '''
+
+        table = self._ancestor_table()
+        positions, found = self._structure_positions(structure_ids)
+
+        descends = (table == parent_id).any(axis=1)
+        return descends.take(positions) & found
+
+
     def export_label_description(self, alphas=None, exclude_label_vis=None, exclude_mesh_vis=None, label_key='acronym'):
         '''Produces an itksnap label_description table from this structure tree
 
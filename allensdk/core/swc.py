@@ -36,7 +36,11 @@
 import csv
 import copy
 import math
-import six
+import warnings
+import numpy as np
+import scipy.sparse as sps
+from scipy.spatial import cKDTree
+from scipy.sparse.csgraph import connected_components
 
 # Morphology nodes have the following fields. SWC fields are numeric.
 NODE_ID = 'id'
@@ -64,6 +68,44 @@ _TID = NODE_TREE_ID
 
 
 ########################################################################
+def read_swc_columns(file_name):
+    """
+    Read in an SWC file as a set of numpy columns, without building
+    per-node objects.
+
+    Parameters
+    ----------
+    file_name: string
+        SWC file name.
+
+    Returns
+    -------
+    dict
+        Arrays keyed by SWC column name (NODE_ID, NODE_TYPE, NODE_X,
+        NODE_Y, NODE_Z, NODE_R, NODE_PN). ID, type and parent columns
+        are integer, the rest are float.
+    """
+    try:
+        with warnings.catch_warnings():
+            # an SWC file holding only comments is an empty morphology
+            warnings.simplefilter("ignore", UserWarning)
+            data = np.loadtxt(file_name, comments='#',
+                              usecols=range(len(SWC_COLUMNS)), ndmin=2)
+    except ValueError as e:
+        err = "File not recognized as valid SWC file.\n"
+        err += "Problem parsing file: %s\n" % str(e)
+        raise IOError(err)
+
+    data = data.reshape(-1, len(SWC_COLUMNS))
+    columns = {}
+    for i, name in enumerate(SWC_COLUMNS):
+        if name in (NODE_ID, NODE_TYPE, NODE_PN):
+            columns[name] = data[:, i].astype(int)
+        else:
+            columns[name] = data[:, i]
+    return columns
+
+
 def read_swc(file_name, columns="NOT_USED", numeric_columns="NOT_USED"):
     """
     Read in an SWC file and return a Morphology object.
@@ -78,41 +120,426 @@ def read_swc(file_name, columns="NOT_USED", numeric_columns="NOT_USED"):
     Morphology
         A Morphology instance.
     """
-    compartments = []
-    line_num = 1
-    try:
-        with open(file_name, "r") as f:
-            for line in f:
-                # remove comments
-                if line.lstrip().startswith('#'):
-                    continue
-                # read values. expected SWC format is:
-                #   ID, type, x, y, z, rad, parent
-                # x, y, z and rad are floats. the others are ints
-                toks = line.split(' ')
-                vals = Compartment({
-                    NODE_ID: int(toks[0]),
-                    NODE_TYPE: int(toks[1]),
-                    NODE_X: float(toks[2]),
-                    NODE_Y: float(toks[3]),
-                    NODE_Z: float(toks[4]),
-                    NODE_R: float(toks[5]),
-                    NODE_PN: int(toks[6].rstrip())
-                })
-                # store this compartment
-                compartments.append(vals)
-                # increment line number (used for error reporting only)
-                line_num += 1
-    except ValueError:
-        err = "File not recognized as valid SWC file.\n"
-        err += "Problem parsing line %d\n" % line_num
-        if line is not None:
-            err += "Content: '%s'\n" % line
-        raise IOError(err)
+    data = read_swc_columns(file_name)
+    values = [data[name].tolist() for name in SWC_COLUMNS]
+    compartments = [Compartment(zip(SWC_COLUMNS, row))
+                    for row in zip(*values)]
 
     return Morphology(compartment_list=compartments)
 
 
+def read_swc_arrays(file_name):
+    """
+    Read in an SWC file and return a MorphologyArrays object.
+
+    Parameters
+    ----------
+    file_name: string
+        SWC file name.
+
+    Returns
+    -------
+    MorphologyArrays
+        A MorphologyArrays instance.
+    """
+    data = read_swc_columns(file_name)
+    xyz = np.column_stack([data[NODE_X], data[NODE_Y], data[NODE_Z]])
+    return MorphologyArrays(data[NODE_ID], data[NODE_TYPE], xyz,
+                            data[NODE_R], data[NODE_PN])
+
+
+########################################################################
+# array implementations of the tree operations. these work on parent
+#   and type columns and are shared by Morphology and MorphologyArrays
+
+def _remap_ids(ids, values):
+    """
+    Map each entry of values to the position of the node having that
+    ID. Values that don't name a node (including negative values) map
+    to -1. If an ID is repeated, the last node having it wins.
+    """
+    ids = np.asarray(ids, dtype=int)
+    values = np.asarray(values, dtype=int)
+    if len(ids) == 0:
+        return -np.ones(len(values), dtype=int)
+    order = np.argsort(ids, kind='mergesort')
+    sorted_ids = ids[order]
+    pos = np.searchsorted(sorted_ids, values, side='right') - 1
+    pos = np.clip(pos, 0, len(ids) - 1)
+    found = (sorted_ids[pos] == values) & (values >= 0)
+    return np.where(found, order[pos], -1)
+
+
+def _child_index(parents):
+    """
+    Build a CSR child index from a positional parent array. The children
+    of node i are child_idx[child_ptr[i]:child_ptr[i+1]], in node order.
+    """
+    parents = np.asarray(parents, dtype=int)
+    n = len(parents)
+    has_parent = parents >= 0
+    children = np.flatnonzero(has_parent)
+    child_parents = parents[has_parent]
+    order = np.argsort(child_parents, kind='mergesort')
+    counts = np.bincount(child_parents, minlength=n)
+    child_ptr = np.concatenate([[0], np.cumsum(counts)]).astype(int)
+    return child_ptr, children[order]
+
+
+def _tree_labels(parents, types):
+    """
+    Label each node with the number of the tree it resides in. Trees
+    are numbered in order of their first node, except that the tree
+    holding the first soma node is swapped in to be tree 0.
+    """
+    parents = np.asarray(parents, dtype=int)
+    n = len(parents)
+    if n == 0:
+        return np.zeros(0, dtype=int), 0
+    has_parent = parents >= 0
+    graph = sps.csr_matrix((np.ones(has_parent.sum()),
+                            (np.flatnonzero(has_parent),
+                             parents[has_parent])),
+                           shape=(n, n))
+    num_trees, labels = connected_components(graph, directed=True,
+                                             connection='weak')
+    # connected_components numbering is arbitrary. renumber by
+    #   first appearance
+    _, first = np.unique(labels, return_index=True)
+    rank = np.empty(num_trees, dtype=int)
+    rank[np.argsort(first)] = np.arange(num_trees)
+    labels = rank[labels]
+    soma = np.flatnonzero(np.asarray(types) == Morphology.SOMA)
+    if len(soma) > 0:
+        soma_tree = labels[soma[0]]
+        if soma_tree > 0:
+            swap = np.arange(num_trees)
+            swap[0], swap[soma_tree] = soma_tree, 0
+            labels = swap[labels]
+    return labels, num_trees
+
+
+def _copy_node(obj):
+    """ Shallow copy of a node. Equivalent to copy.copy for dictionaries
+    (including Compartment), without its per-call overhead. """
+    if isinstance(obj, dict):
+        seg = dict.__new__(type(obj))
+        dict.update(seg, obj)
+        return seg
+    return copy.copy(obj)
+
+
+def _affine_scale(aff):
+    """ Isotropic scale factor of an affine transform: the cube root of
+    the determinant of its rotation/scaling part. """
+    det0 = aff[0] * (aff[4] * aff[8] - aff[5] * aff[7])
+    det1 = aff[1] * (aff[3] * aff[8] - aff[5] * aff[6])
+    det2 = aff[2] * (aff[3] * aff[7] - aff[4] * aff[6])
+    det = det0 + det1 + det2
+    return math.pow(abs(det), 1.0 / 3.0)
+
+
+def _apply_affine_columns(aff, x, y, z):
+    """ Transform coordinate columns, keeping the operation order of
+    the per-node arithmetic so results are unchanged. """
+    tx = x * aff[0] + y * aff[1] + z * aff[2] + aff[9]
+    ty = x * aff[3] + y * aff[4] + z * aff[5] + aff[10]
+    tz = x * aff[6] + y * aff[7] + z * aff[8] + aff[11]
+    return tx, ty, tz
+
+
+def _sparsify_parents(parents, types, modulo, soma=None):
+    """
+    Choose nodes to keep when sparsifying a morphology and find the new
+    parent of each kept node.
+
+    Roots, the soma, branch points, leaves and the first children of
+    the soma root are always kept; of the remaining nodes, those whose
+    position is a multiple of modulo are kept.
+
+    Returns
+    -------
+    keep: boolean array
+    new_parents: array of positional parent IDs (entries for dropped
+        nodes are meaningless)
+    """
+    parents = np.asarray(parents, dtype=int)
+    types = np.asarray(types)
+    n = len(parents)
+    child_ptr, _ = _child_index(parents)
+    num_children = np.diff(child_ptr)
+    keep = ((parents < 0) |
+            (num_children != 1) |
+            (types == Morphology.SOMA) |
+            (np.arange(n) % modulo == 0))
+    if soma is not None:
+        keep |= parents == soma
+    # walk each parent pointer up past dropped ancestors. runs of dropped
+    #   nodes are shorter than modulo, so this takes few passes
+    new_parents = parents.copy()
+    dropped = new_parents >= 0
+    dropped[dropped] = ~keep[new_parents[dropped]]
+    while dropped.any():
+        new_parents[dropped] = parents[new_parents[dropped]]
+        dropped[dropped] = new_parents[dropped] >= 0
+        dropped[dropped] = ~keep[new_parents[dropped]]
+    return keep, new_parents
+
+
+########################################################################
+class NodeSpatialIndex(object):
+    """
+    KD-tree index over morphology node locations, supporting batched
+    radius and nearest-neighbor queries that can be restricted to a
+    single node type. A separate tree is built for each node type on
+    first use.
+
+    Parameters
+    ----------
+    xyz: Nx3 array of floats
+        node coordinates, in node ID order
+
+    types: array of ints
+        node types
+    """
+
+    def __init__(self, xyz, types):
+        self.xyz = np.array(xyz, dtype=float).reshape(-1, 3)
+        self.types = np.array(types, dtype=int)
+        self._trees = {}
+
+    def _tree(self, node_type):
+        """ Return the KD-tree over nodes of the specified type (all nodes
+        if node_type is None) and the IDs of the nodes it holds """
+        if node_type not in self._trees:
+            if node_type is None:
+                ids = np.arange(len(self.xyz))
+            else:
+                ids = np.flatnonzero(self.types == node_type)
+            tree = cKDTree(self.xyz[ids]) if len(ids) > 0 else None
+            self._trees[node_type] = (tree, ids)
+        return self._trees[node_type]
+
+    def query_radius(self, points, dist, node_type=None):
+        """ Find the nodes located within 'dist' of each point.
+
+        Parameters
+        ----------
+        points: Mx3 array of floats
+            The x,y,z coordinates to search around
+
+        dist: float
+            The search radius
+
+        node_type: enum (optional)
+            Restrict the search to nodes of this type
+
+        Returns
+        -------
+        A list holding, for each point, an array of the matching node
+        IDs in ascending order
+        """
+        points = np.array(points, dtype=float).reshape(-1, 3)
+        tree, ids = self._tree(node_type)
+        if tree is None or dist < 0:
+            return [np.zeros(0, dtype=int) for _ in range(len(points))]
+        # the tree is only used to gather candidates; widen its radius a
+        #   little so nodes on the boundary are decided by the same
+        #   distance test as a linear scan
+        candidates = tree.query_ball_point(points, dist * (1 + 1e-9) + 1e-9)
+        found = []
+        for point, local in zip(points, candidates):
+            node_ids = ids[np.sort(np.array(local, dtype=int))]
+            d = self.xyz[node_ids] - point
+            within = np.sqrt(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] +
+                             d[:, 2] * d[:, 2]) <= dist
+            found.append(node_ids[within])
+        return found
+
+    def query_nearest(self, points, k=1, node_type=None):
+        """ Find the k nodes nearest to each point.
+
+        Parameters
+        ----------
+        points: Mx3 array of floats
+            The x,y,z coordinates to search from
+
+        k: int
+            Number of neighbors to return for each point
+
+        node_type: enum (optional)
+            Restrict the search to nodes of this type
+
+        Returns
+        -------
+        distances: Mxk array of floats
+            Distances to the neighbors, nearest first. Padded with inf
+            where fewer than k nodes are available.
+
+        node_ids: Mxk array of ints
+            IDs of the neighbors. Padded with -1.
+        """
+        points = np.array(points, dtype=float).reshape(-1, 3)
+        tree, ids = self._tree(node_type)
+        if tree is None:
+            return (np.full((len(points), k), np.inf),
+                    -np.ones((len(points), k), dtype=int))
+        distances, local = tree.query(points, k=k)
+        distances = np.reshape(distances, (len(points), k))
+        local = np.reshape(local, (len(points), k))
+        missing = local >= len(ids)
+        node_ids = np.where(missing, -1, ids[np.minimum(local, len(ids) - 1)])
+        return distances, node_ids
+
+
+########################################################################
+class MorphologyArrays(object):
+    """
+    Structure-of-arrays counterpart of Morphology. Node data is held in
+    numpy columns rather than one dictionary per node, which makes
+    loading and normalizing large numbers of reconstructions fast.
+
+    As with Morphology, node IDs are positional: node i has ID i, and
+    parent IDs refer to positions.  Use to_morphology() to get the
+    dictionary-based API.
+
+    Parameters
+    ----------
+    ids: array of ints
+        original node IDs
+
+    types: array of ints
+        node types
+
+    xyz: Nx3 array of floats
+        node coordinates
+
+    radius: array of floats
+        node radii
+
+    parents: array of ints
+        original ID of each node's parent, or -1 for roots.
+    """
+
+    def __init__(self, ids, types, xyz, radius, parents):
+        ids = np.asarray(ids, dtype=int)
+        self.types = np.array(types, dtype=int)
+        self.xyz = np.array(xyz, dtype=float).reshape(-1, 3)
+        self.radius = np.array(radius, dtype=float)
+        self.parents = _remap_ids(ids, parents)
+        if not (len(ids) == len(self.types) == len(self.xyz) ==
+                len(self.radius) == len(self.parents)):
+            raise ValueError("Morphology columns differ in length")
+        self._index()
+
+    def _index(self):
+        """ build the child index and tree labels """
+        self._spatial_index = None
+        self.child_ptr, self.child_idx = _child_index(self.parents)
+        self.tree_ids, self.num_trees = _tree_labels(self.parents,
+                                                     self.types)
+        soma = np.flatnonzero((self.types == Morphology.SOMA) &
+                              (self.parents < 0))
+        if len(soma) > 1:
+            raise ValueError("Multiple somas detected in SWC file")
+        self.soma = int(soma[0]) if len(soma) > 0 else None
+
+    @classmethod
+    def from_compartments(cls, compartments):
+        """ Build from a list of SWC-like dictionaries, such as
+        Morphology.compartment_list """
+        compartments = [c for c in compartments if c is not None]
+        columns = {name: [c[name] for c in compartments]
+                   for name in SWC_COLUMNS}
+        xyz = np.column_stack([columns[NODE_X], columns[NODE_Y],
+                               columns[NODE_Z]])
+        return cls(columns[NODE_ID], columns[NODE_TYPE], xyz,
+                   columns[NODE_R], columns[NODE_PN])
+
+    @property
+    def num_nodes(self):
+        """ Return the number of nodes in the morphology. """
+        return len(self.parents)
+
+    @property
+    def ids(self):
+        """ Return the (positional) node IDs. """
+        return np.arange(self.num_nodes)
+
+    @property
+    def spatial_index(self):
+        """ NodeSpatialIndex over node locations, built on first use """
+        if self._spatial_index is None:
+            self._spatial_index = NodeSpatialIndex(self.xyz, self.types)
+        return self._spatial_index
+
+    def children_of(self, n):
+        """ Return the IDs of the children of node n """
+        return self.child_idx[self.child_ptr[n]:self.child_ptr[n + 1]]
+
+    def tree(self, n):
+        """ Return the IDs of the nodes in tree n, or None if the tree
+        doesn't exist """
+        if n < 0 or n >= self.num_trees:
+            return None
+        return np.flatnonzero(self.tree_ids == n)
+
+    def select(self, mask):
+        """ Return a new MorphologyArrays holding only the nodes where
+        mask is True. Nodes whose parent was dropped become roots. """
+        mask = np.asarray(mask, dtype=bool)
+        parents = np.where(self.parents >= 0, self.parents, 0)
+        parents = np.where((self.parents >= 0) & mask[parents],
+                           self.parents, -1)
+        return MorphologyArrays(self.ids[mask], self.types[mask],
+                                self.xyz[mask], self.radius[mask],
+                                parents[mask])
+
+    def strip_type(self, node_type):
+        """ Return a copy with all nodes of the specified type removed """
+        return self.select(self.types != node_type)
+
+    def strip_all_other_types(self, node_type, keep_soma=True):
+        """ Return a copy holding only nodes of the specified type, and
+        the soma if keep_soma is True """
+        mask = self.types == node_type
+        if keep_soma:
+            mask |= self.types == Morphology.SOMA
+        return self.select(mask)
+
+    def sparsify(self, modulo):
+        """ Return a copy with all but 1 out of every modulo non-leaf,
+        non-root nodes removed. See Morphology.sparsify. """
+        keep, new_parents = _sparsify_parents(self.parents, self.types,
+                                              modulo, self.soma)
+        return MorphologyArrays(self.ids[keep], self.types[keep],
+                                self.xyz[keep], self.radius[keep],
+                                new_parents[keep])
+
+    def apply_affine(self, aff, scale=None):
+        """ Apply an affine transform to all nodes in place. See
+        Morphology.apply_affine for the format of aff. """
+        if scale is None:
+            scale = _affine_scale(aff)
+        tx, ty, tz = _apply_affine_columns(aff, self.xyz[:, 0],
+                                           self.xyz[:, 1], self.xyz[:, 2])
+        self.xyz = np.column_stack([tx, ty, tz])
+        self.radius = self.radius * scale
+        self._spatial_index = None
+
+    def to_compartments(self):
+        """ Return a list of Compartment dictionaries """
+        values = [self.ids.tolist(), self.types.tolist(),
+                  self.xyz[:, 0].tolist(), self.xyz[:, 1].tolist(),
+                  self.xyz[:, 2].tolist(), self.radius.tolist(),
+                  self.parents.tolist()]
+        return [Compartment(zip(SWC_COLUMNS, row)) for row in zip(*values)]
+
+    def to_morphology(self):
+        """ Return an equivalent Morphology object """
+        return Morphology(compartment_list=self.to_compartments())
+
+
 ########################################################################
 ########################################################################
 class Compartment(dict):
@@ -175,6 +602,10 @@ class Morphology(object):
         self._compartment_list = []
         self._compartment_index = {}
 
+        # spatial index of node locations. built on demand and
+        #   discarded whenever the morphology changes
+        self._spatial_index = None
+
         ##############################################
         # define tree list here for clarity, even though it's reset below
         #   when nodes are assigned
@@ -255,7 +686,7 @@ class Morphology(object):
         """
         self._compartment_list = []
         for obj in compartment_list:
-            seg = copy.copy(obj)
+            seg = _copy_node(obj)
             seg[NODE_TREE_ID] = -1
             seg[NODE_CHILDREN] = []
             self._compartment_list.append(seg)
@@ -399,6 +830,23 @@ class Morphology(object):
         parent_seg[NODE_CHILDREN].append(child_seg[NODE_ID])
         child_seg[NODE_PN] = parent_seg[NODE_ID]
 
+    @property
+    def spatial_index(self):
+        """ Return a NodeSpatialIndex over compartment locations. The
+        index is built on first use and rebuilt after the morphology is
+        restructured or transformed. If node locations or types are
+        changed directly, call invalidate_spatial_index(). """
+        if self._spatial_index is None:
+            xyz = [(c[NODE_X], c[NODE_Y], c[NODE_Z])
+                   for c in self.compartment_list]
+            types = [c[NODE_TYPE] for c in self.compartment_list]
+            self._spatial_index = NodeSpatialIndex(xyz, types)
+        return self._spatial_index
+
+    def invalidate_spatial_index(self):
+        """ Discard the spatial index so it is rebuilt on next use """
+        self._spatial_index = None
+
     # returns a list of nodes located within dist of x,y,z
     def find(self, x, y, z, dist, node_type=None):
         """ Returns a list of Morphology Objects located within 'dist'
@@ -421,15 +869,57 @@ class Morphology(object):
         -------
         A list of all Morphology Objects matching the search criteria
         """
-        found = []
-        for seg in self.compartment_list:
-            dx = seg[NODE_X] - x
-            dy = seg[NODE_Y] - y
-            dz = seg[NODE_Z] - z
-            if math.sqrt(dx * dx + dy * dy + dz * dz) <= dist:
-                if node_type is None or seg[NODE_TYPE] == node_type:
-                    found.append(seg)
-        return found
+        return self.find_all([(x, y, z)], dist, node_type)[0]
+
+    def find_all(self, points, dist, node_type=None):
+        """ Batched version of find(). Returns, for each point, a list of
+        Morphology Objects located within 'dist' of it.
+
+        Parameters
+        ----------
+        points: Nx3 array of floats
+            The x,y,z coordinates from which to search around
+
+        dist: float
+            The search radius
+
+        node_type: enum (optional)
+            One of the following constants: SOMA, AXON, DENDRITE,
+            BASAL_DENDRITE or APICAL_DENDRITE
+
+        Returns
+        -------
+        A list of lists of Morphology Objects
+        """
+        found = self.spatial_index.query_radius(points, dist, node_type)
+        return [[self._compartment_list[i] for i in ids.tolist()]
+                for ids in found]
+
+    def find_nearest(self, points, k=1, node_type=None):
+        """ Find the k compartments nearest to each of a set of points.
+
+        Parameters
+        ----------
+        points: Nx3 array of floats
+            The x,y,z coordinates to search from
+
+        k: int
+            Number of neighbors to return for each point
+
+        node_type: enum (optional)
+            One of the following constants: SOMA, AXON, DENDRITE,
+            BASAL_DENDRITE or APICAL_DENDRITE
+
+        Returns
+        -------
+        distances: Nxk array of floats
+            Distances to the neighbors, nearest first. Padded with inf
+            where fewer than k compartments are available.
+
+        ids: Nxk array of ints
+            IDs of the neighbors. Padded with -1.
+        """
+        return self.spatial_index.query_nearest(points, k, node_type)
 
     def compartment_list_by_type(self, compartment_type):
         """ Return an list of all compartments having the specified
@@ -461,6 +951,15 @@ class Morphology(object):
         """
         return {c[NODE_ID]: c for c in self._compartment_list if c[NODE_TYPE] == compartment_type}
 
+    def to_arrays(self):
+        """ Return the structure-of-arrays form of this morphology.
+
+        Returns
+        -------
+        MorphologyArrays
+        """
+        return MorphologyArrays.from_compartments(self.compartment_list)
+
     def save(self, file_name):
         """ Write this morphology out to an SWC file
 
@@ -501,49 +1000,17 @@ class Morphology(object):
         Morphology
             A new morphology instance
         """
-        compartments = self.compartment_index
-        root = self.root
-        keep = {}
-        # figure out which compartments to toss
-        ct = 0
-        for i, c in six.iteritems(compartments):
-            pid = c[NODE_PN]
-            cid = c[NODE_ID]
-            ctype = c[NODE_TYPE]
-            # keep the root, soma, junctions, and the first child of the root
-            # (for visualization)
-            if pid < 0 or len(c[NODE_CHILDREN]) != 1 or pid == root[NODE_ID] or ctype == Morphology.SOMA:
-                keep[cid] = True
-            else:
-                keep[cid] = (ct % modulo) == 0
-            ct += 1
-
-        # hook children up to their new parents
-        for i, c in six.iteritems(compartments):
-            comp_id = c[NODE_ID]
-            if keep[comp_id] is False:
-                parent_id = c[NODE_PN]
-                while keep[parent_id] is False:
-                    parent_id = compartments[parent_id][NODE_PN]
-                for child_id in c[NODE_CHILDREN]:
-                    compartments[child_id][NODE_PN] = parent_id
-
-        # filter out the orphans
-        sparsified_compartments = {k: v for k,
-                                   v in six.iteritems(compartments) if keep[k]}
-        if compress_ids:
-            ids = sorted(sparsified_compartments.keys(), key=lambda x: int(x))
-            id_hash = {fid: str(i + 1) for i, fid in enumerate(ids)}
-            id_hash[-1] = -1
-            # build the final compartment index
-            out_compartments = {}
-            for cid, compartment in six.iteritems(sparsified_compartments):
-                compartment[NODE_ID] = id_hash[cid]
-                compartment[NODE_PN] = id_hash[compartment[NODE_PN]]
-                out_compartments[compartment[NODE_ID]] = compartment
-            return Morphology(compartment_index=out_compartments)
-        else:
-            return Morphology(compartment_index=sparsified_compartments)
+        parents = [c[NODE_PN] for c in self.compartment_list]
+        types = [c[NODE_TYPE] for c in self.compartment_list]
+        soma = self.soma[NODE_ID] if self.soma is not None else None
+        keep, new_parents = _sparsify_parents(parents, types, modulo, soma)
+        # IDs are reassigned on construction so are always continuous
+        sparsified_compartments = []
+        for i in np.flatnonzero(keep):
+            compartment = _copy_node(self.compartment_list[i])
+            compartment[NODE_PN] = int(new_parents[i])
+            sparsified_compartments.append(compartment)
+        return Morphology(compartment_list=sparsified_compartments)
 
     ####################################################################
     ####################################################################
@@ -556,59 +1023,27 @@ class Morphology(object):
         parent-child indices are recalculated as is compartment table
         construct a map between new and old IDs
         """
-        remap = {}
-        # everything defaults to root. this way if a parent was deleted
-        #   the child will become a new root
-        for i in range(len(self.compartment_list)):
-            remap[i] = -1
-        # map old old node numbers to new ones. reset n to the new ID
-        #   and put node in new list
-        new_id = 0
-        tmp_list = []
-        for seg in self.compartment_list:
-            if seg is not None:
-                remap[seg[NODE_ID]] = new_id
-                seg[NODE_ID] = new_id
-                tmp_list.append(seg)
-                new_id += 1
-        # use map to reset parent values. copy objs to new list
-        for seg in tmp_list:
-            if seg[NODE_PN] >= 0:
-                seg[NODE_PN] = remap[seg[NODE_PN]]
-        # replace compartment list with newly created node list
-        self._compartment_list = tmp_list
-        # reconstruct parent/child relationship links
-        # forget old relations
-        for seg in self.compartment_list:
-            seg[NODE_CHILDREN] = []
-        # add each object to its parents child list
-        for seg in self.compartment_list:
-            par_num = seg[NODE_PN]
-            if par_num >= 0:
-                self.compartment_list[par_num][
-                    NODE_CHILDREN].append(seg[NODE_ID])
+        self._compartment_list = [
+            seg for seg in self._compartment_list if seg is not None]
+        old_ids = [seg[NODE_ID] for seg in self._compartment_list]
+        # map old parent IDs to new ones. if a parent was deleted the
+        #   child becomes a new root
+        parents = _remap_ids(old_ids,
+                             [seg[NODE_PN] for seg in self._compartment_list])
+        child_ptr, child_idx = _child_index(parents)
+        child_ptr = child_ptr.tolist()
+        child_idx = child_idx.tolist()
+        for i, (seg, par) in enumerate(zip(self._compartment_list,
+                                           parents.tolist())):
+            seg[NODE_ID] = i
+            seg[NODE_PN] = par
+            seg[NODE_CHILDREN] = child_idx[child_ptr[i]:child_ptr[i + 1]]
         # update tree lists
-        self._separate_trees()
-        ############################
-        # Rebuild internal index and links between parents and children
+        self._separate_trees(parents)
+        # Rebuild internal index
         self._compartment_index = {
             c[NODE_ID]: c for c in self.compartment_list}
-        # compartment list is complete and sequential so don't need index
-        #   to resolve relationships
-        # for each node, reset children array
-        # for each node, add self to parent's child list
-        for seg in self._compartment_list:
-            seg[NODE_CHILDREN] = []
-        for seg in self._compartment_list:
-            if seg[NODE_PN] >= 0:
-                self._compartment_list[seg[NODE_PN]][
-                    NODE_CHILDREN].append(seg[NODE_ID])
-        # verify that each node ID is the same as its position in the
-        #   compartment list
-        for i in range(len(self.compartment_list)):
-            if i != self.node(i)[NODE_ID]:
-                raise RuntimeError(
-                    "Internal error detected -- compartment list not properly formed")
+        self._spatial_index = None
 
     def append(self, node_list):
         """ Add additional nodes to this Morphology. Those nodes must
@@ -694,28 +1129,11 @@ class Morphology(object):
             True (default) if soma nodes should remain in the
             morpyhology, and False if the soma should also be stripped
         """
-        flagged_for_removal = {}
-        # scan nodes and see which ones should be removed. keep a record
-        #   of them
-        for seg in self.compartment_list:
-            if seg[NODE_TYPE] == node_type:
-                remove = False
-            elif seg[NODE_TYPE] == 1 and keep_soma:
-                remove = False
-            else:
-                remove = True
-            if remove:
-                flagged_for_removal[seg[NODE_ID]] = True
-        # remove selected nodes andreset parent links
-        for i in range(len(self.compartment_list)):
-            seg = self.compartment_list[i]
-            if seg[NODE_ID] in flagged_for_removal:
-                # eliminate node
-                self.compartment_list[i] = None
-            elif seg[NODE_PN] in flagged_for_removal:
-                # parent was eliminated. make this a new root
-                seg[NODE_PN] = -1
-        self._reconstruct()
+        types = np.array([seg[NODE_TYPE] for seg in self.compartment_list])
+        remove = types != node_type
+        if keep_soma:
+            remove &= types != Morphology.SOMA
+        self._remove_nodes(remove)
 
     # strip out the specified SWC type
     def strip_type(self, node_type):
@@ -731,22 +1149,23 @@ class Morphology(object):
             Use one of the following constants: SOMA, AXON, DENDRITE,
             BASAL_DENDRITE, or APICAL_DENDRITE
         """
-        flagged_for_removal = {}
-        for seg in self.compartment_list:
-            if seg[NODE_TYPE] == node_type:
-                remove = True
-            else:
-                remove = False
-            if remove:
-                flagged_for_removal[seg[NODE_ID]] = True
-        for i in range(len(self.compartment_list)):
-            seg = self.compartment_list[i]
-            if seg[NODE_ID] in flagged_for_removal:
-                # eliminate node
-                self.compartment_list[i] = None
-            elif seg[NODE_PN] in flagged_for_removal:
-                # parent was eliminated. make this a new root
-                seg[NODE_PN] = -1
+        types = np.array([seg[NODE_TYPE] for seg in self.compartment_list])
+        self._remove_nodes(types == node_type)
+
+    def _remove_nodes(self, remove):
+        """
+        internal function. removes the nodes flagged in the boolean
+        array 'remove', making roots of the children of removed nodes
+        """
+        parents = np.array([seg[NODE_PN] for seg in self.compartment_list],
+                           dtype=int)
+        orphaned = parents >= 0
+        orphaned[orphaned] = remove[parents[orphaned]]
+        for i in np.flatnonzero(orphaned & ~remove):
+            # parent was eliminated. make this a new root
+            self.compartment_list[i][NODE_PN] = -1
+        self._compartment_list = [
+            seg for seg, r in zip(self.compartment_list, remove) if not r]
         self._reconstruct()
 
     # strip out the specified SWC type
@@ -770,6 +1189,7 @@ class Morphology(object):
         for seg in self.compartment_list:
             if seg[NODE_TYPE] == old_type:
                 seg[NODE_TYPE] = new_type
+        self._spatial_index = None
 
     def apply_affine(self, aff, scale=None):
         """ Apply an affine transform to all compartments in this
@@ -805,99 +1225,38 @@ class Morphology(object):
         #   scale using the determinant
         #
         if scale is None:
-            # calculate the determinant
-            det0 = aff[0] * (aff[4] * aff[8] - aff[5] * aff[7])
-            det1 = aff[1] * (aff[3] * aff[8] - aff[5] * aff[6])
-            det2 = aff[2] * (aff[3] * aff[7] - aff[4] * aff[6])
-            det = det0 + det1 + det2
-            # determinant is change of volume that occurred during transform
-            # assume equal scaling along all axes. take 3rd root to get
-            #   scale factor
-            det_scale = math.pow(abs(det), 1.0 / 3.0)
-            # measure scale along each axis
-            # keep this code here in case
-            #scale_x = abs(aff[0] + aff[3] + aff[6])
-            #scale_y = abs(aff[1] + aff[4] + aff[7])
-            #scale_z = abs(aff[2] + aff[5] + aff[8])
-            #avg_scale = (scale_x + scale_y + scale_z) / 3.0;
-            #
-            # use determinant for scaling for now as it's most simple
-            scale = det_scale
-        for seg in self.compartment_list:
-            x = seg[NODE_X] * aff[0] + seg[NODE_Y] * \
-                aff[1] + seg[NODE_Z] * aff[2] + aff[9]
-            y = seg[NODE_X] * aff[3] + seg[NODE_Y] * \
-                aff[4] + seg[NODE_Z] * aff[5] + aff[10]
-            z = seg[NODE_X] * aff[6] + seg[NODE_Y] * \
-                aff[7] + seg[NODE_Z] * aff[8] + aff[11]
-            seg[NODE_X] = x
-            seg[NODE_Y] = y
-            seg[NODE_Z] = z
+            # assume equal scaling along all axes and use the cube root
+            #   of the determinant (the change of volume that occurred
+            #   during the transform) as the scale factor.
+            # scale could instead be measured independently along each
+            #   axis, eg abs(aff[0] + aff[3] + aff[6]) for x, but use
+            #   the determinant for now as it's most simple
+            scale = _affine_scale(aff)
+        x = np.array([seg[NODE_X] for seg in self.compartment_list])
+        y = np.array([seg[NODE_Y] for seg in self.compartment_list])
+        z = np.array([seg[NODE_Z] for seg in self.compartment_list])
+        x, y, z = _apply_affine_columns(aff, x, y, z)
+        for seg, tx, ty, tz in zip(self.compartment_list,
+                                   x.tolist(), y.tolist(), z.tolist()):
+            seg[NODE_X] = tx
+            seg[NODE_Y] = ty
+            seg[NODE_Z] = tz
             seg[NODE_R] *= scale
+        self._spatial_index = None
 
-    def _separate_trees(self):
+    def _separate_trees(self, parents=None):
         """
-        construct list of independent trees (each tree has a root of -1)
+        construct list of independent trees (each tree has a root of -1).
+        The tree holding the soma, if present, is the first tree.
         """
-        trees = []
-        # reset each node's tree ID to indicate that it's not assigned
-        for seg in self.compartment_list:
-            seg[NODE_TREE_ID] = -1
-        # construct trees for each node
-        # if a node is adjacent an existing tree, merge to it
-        # if a node is adjacent multiple trees, merge all
-        for seg in self.compartment_list:
-            # see what trees this node is adjacent to
-            local_trees = []
-            if seg[NODE_PN] >= 0 and self.compartment_list[seg[NODE_PN]][NODE_TREE_ID] >= 0:
-                local_trees.append(self.compartment_list[
-                                   seg[NODE_PN]][NODE_TREE_ID])
-            for child_id in seg[NODE_CHILDREN]:
-                child = self.compartment_list[child_id]
-                if child[NODE_TREE_ID] >= 0:
-                    local_trees.append(child[NODE_TREE_ID])
-            # figure out which tree to put node into
-            # if there are muliple possibilities, merge all of them
-            if len(local_trees) == 0:
-                tree_num = len(trees)  # create new tree
-            elif len(local_trees) == 1:
-                tree_num = local_trees[0]   # use existing tree
-            elif len(local_trees) > 1:
-                # this node is an intersection of multiple trees
-                # merge all trees into the first one found
-                tree_num = local_trees[0]
-                for j in range(1, len(local_trees)):
-                    dead_tree = local_trees[j]
-                    trees[dead_tree] = []
-                    for node in self.compartment_list:
-                        if node[NODE_TREE_ID] == dead_tree:
-                            node[NODE_TREE_ID] = tree_num
-            # merge node into tree
-            # ensure there's space
-            while len(trees) <= tree_num:
-                trees.append([])
-            trees[tree_num].append(seg)
+        if parents is None:
+            parents = [seg[NODE_PN] for seg in self.compartment_list]
+        types = [seg[NODE_TYPE] for seg in self.compartment_list]
+        labels, num_trees = _tree_labels(parents, types)
+        self._tree_list = [[] for _ in range(num_trees)]
+        for seg, tree_num in zip(self.compartment_list, labels.tolist()):
+            self._tree_list[tree_num].append(seg)
             seg[NODE_TREE_ID] = tree_num
-        # consolidate tree lists into class's tree list object
-        self._tree_list = []
-        for tree in trees:
-            if len(tree) > 0:
-                self._tree_list.append(tree)
-        # make soma's tree be the first tree, if soma present
-        # this should be the case if the file is properly ordered, but
-        #   don't assume that
-        soma_tree = -1
-        for seg in self.compartment_list:
-            if seg[NODE_TYPE] == 1:
-                soma_tree = seg[NODE_TREE_ID]
-                break
-        if soma_tree > 0:
-            # swap soma tree for first tree in list
-            tmp = self._tree_list[soma_tree]
-            self._tree_list[soma_tree] = self._tree_list[0]
-            self._tree_list[0] = tmp
-        # reset node tree_id to correct tree number
-        self._reset_tree_ids()
 
     def _reset_tree_ids(self):
         """
@@ -38,6 +38,7 @@ from pandas import DataFrame
 import warnings
 import logging
 from collections import Counter
+from concurrent.futures import wait, FIRST_COMPLETED
 
 from . import ephys_features as ft
 import six
@@ -106,8 +107,12 @@ class EphysSweepFeatureExtractor:
         dvdt = ft.calculate_dvdt(v, t, self.filter)
 
         # Basic features of spikes
+        # dV/dt is filtered over the detection window, so it can only be
+        # shared when the window is the whole sweep
+        window_dvdt = dvdt if self.start is None and self.end is None else None
         putative_spikes = ft.detect_putative_spikes(v, t, self.start, self.end,
-                                                    self.filter, self.dv_cutoff)
+                                                    self.filter, self.dv_cutoff,
+                                                    dvdt=window_dvdt)
         peaks = ft.find_peak_indexes(v, t, putative_spikes, self.end)
         putative_spikes, peaks = ft.filter_putative_spikes(v, t, putative_spikes, peaks,
                                                            self.min_height, self.min_peak, 
@@ -646,6 +651,8 @@ class EphysSweepSetFeatureExtractor:
         baseline_detect_thresh : dV/dt threshold for evaluating flatness of baseline region (optional, default 0.3)
         """
 
+        self._pending = None
+
         if t_set is not None and v_set is not None:
             self._set_sweeps(t_set, v_set, i_set, start, end, filter, dv_cutoff, max_interval,
                              min_height, min_peak, thresh_frac, baseline_interval,
@@ -710,10 +717,34 @@ class EphysSweepSetFeatureExtractor:
         """Get list of EphysSweepFeatureExtractor objects."""
         return self._sweeps
 
-    def process_spikes(self):
-        """Analyze spike features for all sweeps."""
-        for sweep in self._sweeps:
-            sweep.process_spikes()
+    def process_spikes(self, executor=None):
+        """Analyze spike features for all sweeps.
+
+        Parameters
+        ----------
+        executor : concurrent.futures.Executor to process sweeps concurrently (optional).
+            With a process pool the processed sweeps are copies of the originals.
+        """
+        if executor is not None:
+            self.submit_spikes(executor)
+
+        if self._pending is None:
+            for sweep in self._sweeps:
+                sweep.process_spikes()
+        else:
+            pending, self._pending = self._pending, None
+            self._sweeps = [future.result() for future in pending]
+
+    def submit_spikes(self, executor):
+        """Start analyzing spike features for all sweeps with an executor.
+        The next call to `process_spikes` waits for and collects the results.
+
+        Returns
+        -------
+        futures : list of futures of the processed sweeps
+        """
+        self._pending = [executor.submit(_process_sweep_spikes, sweep) for sweep in self._sweeps]
+        return self._pending
 
     def sweep_features(self, key, allow_missing=False):
         """Get nparray of sweep-level feature (`key`) for all sweeps
@@ -769,8 +800,12 @@ class EphysCellFeatureExtractor:
         self._subthreshold_membrane_property_ext = None
 
 
-    def process(self, keys=None):
-        """Processes features. Can take a specific key (or set of keys) to do a subset of processing."""
+    def process(self, keys=None, executor=None):
+        """Processes features. Can take a specific key (or set of keys) to do a subset of processing.
+
+        If a concurrent.futures.Executor is given, the sweeps of all requested stimulus types are
+        processed concurrently and each type's cell-level analysis runs as soon as its sweeps are done.
+        """
 
         dispatch = {
             "ramps": self._analyze_ramps,
@@ -785,8 +820,42 @@ class EphysCellFeatureExtractor:
         if type(keys) is not list:
             keys = list(keys)
 
-        for k in [j for j in keys if j in dispatch]:
-            dispatch[k]()
+        keys = [j for j in keys if j in dispatch]
+
+        if executor is None:
+            for k in keys:
+                dispatch[k]()
+            return
+
+        # long square spikes are only processed once, see _analyze_long_squares_spiking
+        long_squares_ext = None if self._spiking_long_squares_ext else self._long_squares_ext
+        sweep_sets = {
+            "ramps": self._ramps_ext,
+            "short_squares": self._short_squares_ext,
+            "long_squares": long_squares_ext,
+            "long_squares_spiking": long_squares_ext,
+        }
+
+        futures = {}
+        submitted = {}
+        for k in keys:
+            ext = sweep_sets[k]
+            if ext is None:
+                futures[k] = []
+                continue
+            if id(ext) not in submitted:
+                submitted[id(ext)] = ext.submit_spikes(executor)
+            futures[k] = submitted[id(ext)]
+
+        while keys:
+            ready = [k for k in keys if all(f.done() for f in futures[k])]
+            if not ready:
+                wait([f for k in keys for f in futures[k]], return_when=FIRST_COMPLETED)
+                continue
+
+            for k in ready:
+                keys.remove(k)
+                dispatch[k]()
 
     def _analyze_ramps(self):
         ext = self._ramps_ext
@@ -960,6 +1029,11 @@ class EphysCellFeatureExtractor:
         return out
 
 
+def _process_sweep_spikes(sweep):
+    sweep.process_spikes()
+    return sweep
+
+
 def input_resistance(ext):
     """Estimate input resistance in MOhms, assuming all sweeps in passed extractor
     are hyperpolarizing responses."""
@@ -40,7 +40,7 @@ import scipy.signal as signal
 from scipy.optimize import curve_fit
 from functools import partial
 
-def detect_putative_spikes(v, t, start=None, end=None, filter=10., dv_cutoff=20.):
+def detect_putative_spikes(v, t, start=None, end=None, filter=10., dv_cutoff=20., dvdt=None):
     """Perform initial detection of spikes and return their indexes.
 
     Parameters
@@ -51,7 +51,7 @@ def detect_putative_spikes(v, t, start=None, end=None, filter=10., dv_cutoff=20.
     end : end of time window for spike detection (optional)
     filter : cutoff frequency for 4-pole low-pass Bessel filter in kHz (optional, default 10)
     dv_cutoff : minimum dV/dt to qualify as a spike in V/s (optional, default 20)
-    dvdt : pre-calculated time-derivative of voltage (optional)
+    dvdt : pre-calculated time-derivative of voltage within the start/end window (optional)
 
     Returns
     -------
@@ -78,7 +78,8 @@ def detect_putative_spikes(v, t, start=None, end=None, filter=10., dv_cutoff=20.
     v_window = v[start_index:end_index + 1]
     t_window = t[start_index:end_index + 1]
 
-    dvdt = calculate_dvdt(v_window, t_window, filter)
+    if dvdt is None:
+        dvdt = calculate_dvdt(v_window, t_window, filter)
 
     # Find positive-going crossings of dV/dt cutoff level
     putative_spikes = np.flatnonzero(np.diff(np.greater_equal(dvdt, dv_cutoff).astype(int)) == 1)
@@ -88,11 +89,11 @@ def detect_putative_spikes(v, t, start=None, end=None, filter=10., dv_cutoff=20.
         return np.array(putative_spikes) + start_index
 
     # Only keep spike times if dV/dt has dropped all the way to zero between putative spikes
-    putative_spikes = [putative_spikes[0]] + [s for i, s in enumerate(putative_spikes[1:])
-        if np.any(dvdt[putative_spikes[i]:s] < 0)]
+    keep = np.append(True, _segment_any(dvdt < 0, putative_spikes[:-1], putative_spikes[1:]))
+    putative_spikes = putative_spikes[keep]
 
     # Set back to original index space (not just window)
-    return np.array(putative_spikes) + start_index
+    return putative_spikes + start_index
 
 
 def find_peak_indexes(v, t, spike_indexes, end=None):
@@ -110,11 +111,8 @@ def find_peak_indexes(v, t, spike_indexes, end=None):
         end = t[-1]
     end_index = find_time_index(t, end)
 
-    spks_and_end = np.append(spike_indexes, end_index)
-    peak_indexes = [np.argmax(v[spk:next]) + spk for spk, next in
-                    zip(spks_and_end[:-1], spks_and_end[1:])]
-
-    return np.array(peak_indexes)
+    spks_and_end = np.append(spike_indexes, end_index).astype(int)
+    return _segment_argmax(v, spks_and_end[:-1], spks_and_end[1:])
 
 
 def filter_putative_spikes(v, t, spike_indexes, peak_indexes, min_height=2.,
@@ -147,11 +145,9 @@ def filter_putative_spikes(v, t, spike_indexes, peak_indexes, min_height=2.,
     if dvdt is None:
         dvdt = calculate_dvdt(v, t, filter)
 
-    diff_mask = [np.any(dvdt[peak_ind:spike_ind] < 0)
-                 for peak_ind, spike_ind
-                 in zip(peak_indexes[:-1], spike_indexes[1:])]
-    peak_indexes = peak_indexes[np.array(diff_mask + [True])]
-    spike_indexes = spike_indexes[np.array([True] + diff_mask)]
+    diff_mask = _segment_any(dvdt < 0, peak_indexes[:-1], spike_indexes[1:])
+    peak_indexes = peak_indexes[np.append(diff_mask, True)]
+    spike_indexes = spike_indexes[np.append(True, diff_mask)]
 
     peak_level_mask = v[peak_indexes] >= min_peak
     spike_indexes = spike_indexes[peak_level_mask]
@@ -185,10 +181,7 @@ def find_upstroke_indexes(v, t, spike_indexes, peak_indexes, filter=10., dvdt=No
     if dvdt is None:
         dvdt = calculate_dvdt(v, t, filter)
 
-    upstroke_indexes = [np.argmax(dvdt[spike:peak]) + spike for spike, peak in
-                        zip(spike_indexes, peak_indexes)]
-
-    return np.array(upstroke_indexes)
+    return _segment_argmax(dvdt, spike_indexes, peak_indexes)
 
 
 def refine_threshold_indexes(v, t, upstroke_indexes, thresh_frac=0.05, filter=10., dvdt=None):
@@ -217,18 +210,17 @@ def refine_threshold_indexes(v, t, upstroke_indexes, thresh_frac=0.05, filter=10
     avg_upstroke = dvdt[upstroke_indexes].mean()
     target = avg_upstroke * thresh_frac
 
-    upstrokes_and_start = np.append(np.array([0]), upstroke_indexes)
-    threshold_indexes = []
-    for upstk, upstk_prev in zip(upstrokes_and_start[1:], upstrokes_and_start[:-1]):
-        potential_indexes = np.flatnonzero(dvdt[upstk:upstk_prev:-1] <= target)
-        if not potential_indexes.size:
-            # couldn't find a matching value for threshold,
-            # so just going to the start of the search interval
-            threshold_indexes.append(upstk_prev)
-        else:
-            threshold_indexes.append(upstk - potential_indexes[0])
+    # search backwards from each upstroke to the previous one for the
+    # last point at or below the target
+    upstk_prev = np.append(0, upstroke_indexes[:-1])
+    below_target = np.flatnonzero(dvdt <= target)
+    last = np.searchsorted(below_target, upstroke_indexes, side="right") - 1
+    candidates = below_target[np.maximum(last, 0)] if below_target.size else upstk_prev
+    found = (last >= 0) & (candidates > upstk_prev)
 
-    return np.array(threshold_indexes)
+    # couldn't find a matching value for threshold,
+    # so just going to the start of the search interval
+    return np.where(found, candidates, upstk_prev)
 
 
 def check_thresholds_and_peaks(v, t, spike_indexes, peak_indexes, upstroke_indexes, end=None,
@@ -365,8 +357,7 @@ def find_trough_indexes(v, t, spike_indexes, peak_indexes, clipped=None, end=Non
     end_index = find_time_index(t, end)
 
     trough_indexes = np.zeros_like(spike_indexes, dtype=float)
-    trough_indexes[:-1] = [v[peak:spk].argmin() + peak for peak, spk
-                           in zip(peak_indexes[:-1], spike_indexes[1:])]
+    trough_indexes[:-1] = _segment_argmin(v, peak_indexes[:-1], spike_indexes[1:])
 
     if clipped[-1]:
         # If last spike is cut off by the end of the window, trough is undefined
@@ -418,9 +409,7 @@ def find_downstroke_indexes(v, t, peak_indexes, trough_indexes, clipped=None, fi
     valid_trough_indexes = trough_indexes[~clipped].astype(int)
 
     downstroke_indexes = np.zeros_like(peak_indexes) * np.nan
-    downstroke_index_values = [np.argmin(dvdt[peak:trough]) + peak for peak, trough
-                         in zip(valid_peak_indexes, valid_trough_indexes)]
-    downstroke_indexes[~clipped] = downstroke_index_values
+    downstroke_indexes[~clipped] = _segment_argmin(dvdt, valid_peak_indexes, valid_trough_indexes)
 
     return downstroke_indexes
 
@@ -537,75 +526,68 @@ def analyze_trough_details(v, t, spike_indexes, peak_indexes, clipped=None, end=
 
     dvdt_hvy = calculate_dvdt(v, t, heavy_filter)
 
-    # Writing as for loop - see if I can vectorize any later
-    fast_trough_indexes = []
-    adp_indexes = []
-    slow_trough_indexes = []
-    isi_types = []
-
-    update_clipped = []
-    for peak, next_spk in zip(valid_peak_indexes, np.append(valid_spike_indexes[1:], end_index)):
-        downstroke = dvdt[peak:next_spk].argmin() + peak
-        target = term_frac * dvdt[downstroke]
-
-        terminated_points = np.flatnonzero(dvdt[downstroke:next_spk] >= target)
-        if terminated_points.size:
-            terminated = terminated_points[0] + downstroke
-            update_clipped.append(False)
-        else:
-            logging.debug("Could not identify fast trough - marking spike as clipped")
-            isi_types.append(np.nan)
-            fast_trough_indexes.append(np.nan)
-            adp_indexes.append(np.nan)
-            slow_trough_indexes.append(np.nan)
-            update_clipped.append(True)
-            continue
-
-        # Could there be an ADP?
-        adp_index = np.nan
-        dv_over_thresh = np.flatnonzero(dvdt_hvy[terminated:next_spk] >= adp_thresh)
-        if dv_over_thresh.size:
-            cross = dv_over_thresh[0] + terminated
-
-            # only want to look for ADP before things get pretty flat
-            # otherwise, could just pick up random transients long after the spike
-            if t[cross] - t[terminated] < flat_interval:
-                # Going back up fast, but could just be going into another spike
-                # so need to check for a reversal (zero-crossing) in dV/dt
-                zero_return_vals = np.flatnonzero(dvdt_hvy[cross:next_spk] <= 0)
-                if zero_return_vals.size:
-                    putative_adp_index = zero_return_vals[0] + cross
-                    min_index = v[putative_adp_index:next_spk].argmin() + putative_adp_index
-                    if (v[putative_adp_index] - v[min_index] >= tol and
-                            v[putative_adp_index] - v[terminated] <= adp_max_delta_v and
-                            t[putative_adp_index] - t[terminated] <= adp_max_delta_t):
-                        adp_index = putative_adp_index
-                        slow_phase_min_index = min_index
-                        isi_type = "detour"
-
-        if np.isnan(adp_index):
-            v_term = v[terminated]
-            min_index = v[terminated:next_spk].argmin() + terminated
-            if v_term - v[min_index] >= tol:
-                # dropped further after end of spike -> detour reset
-                isi_type = "detour"
-                slow_phase_min_index = min_index
-            else:
-                isi_type = "direct"
-
-        isi_types.append(isi_type)
-        fast_trough_indexes.append(terminated)
-        adp_indexes.append(adp_index)
-        if isi_type == "detour":
-            slow_trough_indexes.append(slow_phase_min_index)
-        else:
-            slow_trough_indexes.append(np.nan)
+    n_valid = len(valid_peak_indexes)
+    next_spks = np.append(valid_spike_indexes[1:], end_index).astype(int)[:n_valid]
+
+    fast_trough_indexes = np.zeros(n_valid) * np.nan
+    adp_indexes = np.zeros(n_valid) * np.nan
+    slow_trough_indexes = np.zeros(n_valid) * np.nan
+    detour = np.zeros(n_valid, dtype=bool)
+
+    downstrokes = _segment_argmin(dvdt, valid_peak_indexes, next_spks)
+    targets = term_frac * dvdt[downstrokes]
+    terminated, has_fast_trough = _segment_first(dvdt, downstrokes, next_spks,
+                                                 targets, np.greater_equal)
+    if np.any(~has_fast_trough):
+        logging.debug("Could not identify fast trough - marking spike as clipped")
+    update_clipped = ~has_fast_trough
+
+    # Could there be an ADP?
+    fast = np.flatnonzero(has_fast_trough)
+    term, next_spk = terminated[fast], next_spks[fast]
+    fast_trough_indexes[fast] = term
+
+    cross, has_cross = _segment_first(dvdt_hvy, term, next_spk,
+                                      adp_thresh, np.greater_equal)
+
+    # only want to look for ADP before things get pretty flat
+    # otherwise, could just pick up random transients long after the spike
+    has_cross[has_cross] = t[cross[has_cross]] - t[term[has_cross]] < flat_interval
+    crossed = np.flatnonzero(has_cross)
+
+    # Going back up fast, but could just be going into another spike
+    # so need to check for a reversal (zero-crossing) in dV/dt
+    zero_return, has_zero_return = _segment_first(dvdt_hvy, cross[crossed], next_spk[crossed],
+                                                  0, np.less_equal)
+    adp = crossed[has_zero_return]
+    putative_adp = zero_return[has_zero_return]
+    adp_min = _segment_argmin(v, putative_adp, next_spk[adp])
+    is_adp = ((v[putative_adp] - v[adp_min] >= tol) &
+              (v[putative_adp] - v[term[adp]] <= adp_max_delta_v) &
+              (t[putative_adp] - t[term[adp]] <= adp_max_delta_t))
+    adp, putative_adp, adp_min = adp[is_adp], putative_adp[is_adp], adp_min[is_adp]
+
+    adp_indexes[fast[adp]] = putative_adp
+    slow_trough_indexes[fast[adp]] = adp_min
+    detour[fast[adp]] = True
+
+    no_adp = np.ones(len(fast), dtype=bool)
+    no_adp[adp] = False
+    no_adp = np.flatnonzero(no_adp)
+    min_indexes = _segment_argmin(v, term[no_adp], next_spk[no_adp])
+    # dropped further after end of spike -> detour reset
+    dropped = v[term[no_adp]] - v[min_indexes] >= tol
+    slow_trough_indexes[fast[no_adp[dropped]]] = min_indexes[dropped]
+    detour[fast[no_adp[dropped]]] = True
+
+    isi_types = [np.nan if not has_fast else ("detour" if is_detour else "direct")
+                 for has_fast, is_detour in zip(has_fast_trough, detour)]
 
     # If we had to kick some spikes out before, need to add nans at the end
     output = []
     output.append(np.array(isi_types))
     for d in (fast_trough_indexes, adp_indexes, slow_trough_indexes):
-        output.append(np.array(d, dtype=float))
+        output.append(d)
 
     if orig_len > len(isi_types):
         extra = np.zeros(orig_len - len(isi_types)) * np.nan
@@ -650,7 +632,9 @@ def calculate_dvdt(v, t, filter=None):
     dvdt : numpy array of time-derivative of voltage (V/s = mV/ms)
     """
 
-    if has_fixed_dt(t) and filter:
+    dt = np.diff(t)
+
+    if filter and np.allclose(dt, dt[0]):
         delta_t = t[1] - t[0]
         sample_freq = 1. / delta_t
         filt_coeff = (filter * 1e3) / (sample_freq / 2.) # filter kHz -> Hz, then get fraction of Nyquist frequency
@@ -662,7 +646,6 @@ def calculate_dvdt(v, t, filter=None):
     else:
         dv = np.diff(v)
 
-    dt = np.diff(t)
     dvdt = 1e-3 * dv / dt # in V/s = mV/ms
 
     # Remove nan values (in case any dt values == 0)
@@ -1145,6 +1128,117 @@ def estimate_adjusted_detection_parameters(v_set, t_set, interval_start, interva
     return new_dv_cutoff, new_thresh_frac
 
 
+# Segment-wise reductions used to vectorize the per-spike searches above.
+# Each takes slices [starts[i]:ends[i]] of an array and follows Python
+# slicing semantics, so results match the equivalent per-spike loop.
+
+def _clip_segments(n, starts, ends):
+    starts = np.clip(np.asarray(starts, dtype=int), 0, n)
+    ends = np.clip(np.asarray(ends, dtype=int), 0, n)
+    return starts, np.maximum(ends, starts)
+
+
+def _segment_runs(starts, ends):
+    """For sorted, non-overlapping slices, the offsets and lengths of the
+    alternating slice and gap runs that tile [starts[0]:ends[-1]], and a
+    flag that is True for the slice runs.  None for any other slices."""
+    if np.any(starts[1:] < ends[:-1]):
+        return None
+
+    bounds = np.empty(2 * len(starts), dtype=int)
+    bounds[0::2] = starts
+    bounds[1::2] = ends
+    bounds -= starts[0]
+
+    offsets = bounds[:-1]
+    lengths = np.diff(bounds)
+    is_segment = np.arange(len(offsets)) % 2 == 0
+    return offsets, lengths, is_segment
+
+
+def _segment_arg_extreme(x, starts, ends, ufunc):
+    """Index of the first maximum (ufunc=np.maximum) or minimum (np.minimum)
+    of each slice, like np.argmax(x[s:e]) + s."""
+    starts, ends = _clip_segments(len(x), starts, ends)
+    if np.any(ends == starts):
+        raise ValueError("attempt to get argmax or argmin of an empty sequence")
+    if not starts.size:
+        return np.array([], dtype=int)
+
+    runs = _segment_runs(starts, ends)
+    if runs is not None:
+        offsets, lengths, is_segment = runs
+        span = x[starts[0]:ends[-1]]
+        extremes = ufunc.reduceat(span, offsets)
+        if not np.any(np.isnan(extremes[is_segment])):
+            hits = (span == np.repeat(extremes, lengths)) & np.repeat(is_segment, lengths)
+            hit_positions = np.flatnonzero(hits)
+            return hit_positions[np.searchsorted(hit_positions, starts - starts[0])] + starts[0]
+
+    # overlapping slices or nans: gather every slice into one array
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    indexes = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+    values = x[indexes]
+    extremes = np.repeat(ufunc.reduceat(values, offsets), lengths)
+
+    # np.argmax/argmin return the first nan if there is one
+    hits = (values == extremes) | (np.isnan(values) & np.isnan(extremes))
+    positions = np.where(hits, np.arange(len(hits)), len(hits))
+    return indexes[np.minimum.reduceat(positions, offsets)]
+
+
+def _segment_argmax(x, starts, ends):
+    return _segment_arg_extreme(x, starts, ends, np.maximum)
+
+
+def _segment_argmin(x, starts, ends):
+    return _segment_arg_extreme(x, starts, ends, np.minimum)
+
+
+def _segment_first(x, starts, ends, levels, op):
+    """First index in each slice where op(x, level) is True, where level is
+    a scalar or one value per slice.  Returns the indexes and a boolean array
+    that is False for slices with no such point."""
+    starts, ends = _clip_segments(len(x), starts, ends)
+    first = np.zeros(len(starts), dtype=int)
+    found = np.zeros(len(starts), dtype=bool)
+    if not starts.size:
+        return first, found
+
+    lo, hi = starts.min(), ends.max()
+    if np.ndim(levels) == 0:
+        hits = op(x[lo:hi], levels)
+    else:
+        runs = _segment_runs(starts, ends)
+        if runs is None:
+            for i, (start, end) in enumerate(zip(starts, ends)):
+                positions = np.flatnonzero(op(x[start:end], levels[i]))
+                if positions.size:
+                    first[i], found[i] = positions[0] + start, True
+            return first, found
+
+        offsets, lengths, is_segment = runs
+        run_levels = np.zeros(len(offsets), dtype=np.asarray(levels).dtype)
+        run_levels[is_segment] = levels
+        hits = op(x[lo:hi], np.repeat(run_levels, lengths)) & np.repeat(is_segment, lengths)
+
+    hit_positions = np.flatnonzero(hits) + lo
+    if hit_positions.size:
+        k = np.minimum(np.searchsorted(hit_positions, starts), len(hit_positions) - 1)
+        found = (hit_positions[k] >= starts) & (hit_positions[k] < ends)
+        first[found] = hit_positions[k[found]]
+
+    return first, found
+
+
+def _segment_any(mask, starts, ends):
+    """np.any(mask[starts[i]:ends[i]]) for each slice."""
+    starts, ends = _clip_segments(len(mask), starts, ends)
+    counts = np.append(0, np.cumsum(mask))
+    return counts[ends] > counts[starts]
+
+
 def _score_burst_set(bursts, isis, delta_t, c_n=0.1, c_tx=0.01):
     in_burst = np.zeros_like(isis, dtype=bool)
     for b in bursts:
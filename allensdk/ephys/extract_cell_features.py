@@ -34,8 +34,12 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 import numpy as np
+import pandas as pd
 import logging
+import traceback
+import multiprocessing as mp
 import six
+from allensdk.core.nwb_data_set import NwbDataSet
 from . import ephys_extractor as efex
 from . import ephys_features as ft
 
@@ -55,7 +59,7 @@ MEAN_FEATURES = [ "upstroke_downstroke_ratio", "peak_v", "peak_t", "trough_v", "
                   "threshold_v", "threshold_i", "threshold_t", "peak_v", "peak_t" ]
 
 
-def extract_sweep_features(data_set, sweeps_by_type):
+def extract_sweep_features(data_set, sweeps_by_type, executor=None):
     # extract sweep-level features
     sweep_features = {}
 
@@ -93,7 +97,7 @@ def extract_sweep_features(data_set, sweeps_by_type):
         else:
             fex = efex.extractor_for_nwb_sweeps(data_set, sweep_numbers)
 
-        fex.process_spikes()
+        fex.process_spikes(executor)
 
         sweep_features.update({ f.id:f.as_dict() for f in fex.sweeps() })
 
@@ -105,7 +109,8 @@ def extract_cell_features(data_set,
                           ramp_sweep_numbers,
                           short_square_sweep_numbers,
                           long_square_sweep_numbers,
-                          subthresh_min_amp = None):
+                          subthresh_min_amp = None,
+                          executor = None):
 
     if subthresh_min_amp is None:
         fex = efex.cell_extractor_for_nwb(data_set,
@@ -119,7 +124,7 @@ def extract_cell_features(data_set,
                                           long_square_sweep_numbers,
                                           subthresh_min_amp)
 
-    fex.process()
+    fex.process(executor=executor)
 
     cell_features = fex.as_dict()
 
@@ -166,6 +171,146 @@ def mean_features_spike_zero(sweeps):
         output[mf] = np.mean(mfd)
     return output
 
+class _SweepCache(object):
+    """ Wraps a data set so that each sweep is read from disk at most once.
+    The extractors fetch short square sweeps twice (once to estimate
+    detection parameters) and the cell extractor fetches every sweep
+    again, so this saves repeated trips to the file for a single cell.
+    """
+    def __init__(self, data_set):
+        self.data_set = data_set
+        self._sweeps = {}
+
+    def get_sweep(self, sweep_number):
+        if sweep_number not in self._sweeps:
+            self._sweeps[sweep_number] = self.data_set.get_sweep(sweep_number)
+        return self._sweeps[sweep_number]
+
+    def __getattr__(self, name):
+        return getattr(self.data_set, name)
+
+
+def _flatten_features(features, prefix=""):
+    """ Flatten a nested feature dictionary into {dotted.name: scalar}.
+    Lists (e.g. spikes, sweeps) are dropped. """
+    flat = {}
+    for key, value in six.iteritems(features):
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            flat.update(_flatten_features(value, name + "."))
+        elif value is None or np.isscalar(value):
+            flat[name] = value
+    return flat
+
+
+def _extract_cell(cell):
+    """ Pool worker: extract sweep and cell features for one cell description.
+    Returns (cell_id, sweep_features, cell_features, error). """
+    cell_id = cell.get("id", cell["nwb_file"])
+    try:
+        with NwbDataSet(cell["nwb_file"]) as nwb_data_set:
+            data_set = _SweepCache(nwb_data_set)
+
+            sweep_features = extract_sweep_features(data_set,
+                                                    cell.get("sweeps_by_type", {}))
+
+            cell_features = None
+            if cell.get("long_square_sweep_numbers"):
+                cell_features = extract_cell_features(data_set,
+                                                      cell.get("ramp_sweep_numbers", []),
+                                                      cell.get("short_square_sweep_numbers", []),
+                                                      cell["long_square_sweep_numbers"],
+                                                      cell.get("subthresh_min_amp"))
+        return cell_id, sweep_features, cell_features, None
+    except Exception:
+        return cell_id, None, None, traceback.format_exc()
+
+
+def iter_cell_features(cells, processes=None):
+    """ Extract features for many cells, yielding results as they finish.
+
+    Parameters
+    ----------
+    cells: list of dicts
+        One entry per cell, with keys 'nwb_file', 'sweeps_by_type' and
+        optionally 'id', 'ramp_sweep_numbers', 'short_square_sweep_numbers',
+        'long_square_sweep_numbers' and 'subthresh_min_amp'.  Cell-level
+        features are only computed when long square sweeps are given.
+    processes: int
+        Number of worker processes.  None uses all cores, 1 runs serially
+        in this process.
+
+    Yields
+    ------
+    tuple
+        (cell_id, sweep_features, cell_features, error).  error is a
+        traceback string if the cell failed, otherwise None.
+    """
+    if processes == 1:
+        for cell in cells:
+            yield _extract_cell(cell)
+        return
+
+    pool = mp.Pool(processes)
+    try:
+        for result in pool.imap_unordered(_extract_cell, cells):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def extract_cell_features_batch(cells, processes=None):
+    """ Extract features for many cells across a process pool.  A cell that
+    fails is logged and recorded rather than aborting the run.
+
+    Parameters
+    ----------
+    cells: list of dicts
+        See `iter_cell_features`.
+    processes: int
+        Number of worker processes.
+
+    Returns
+    -------
+    cell_table: pd.DataFrame
+        One row per cell, indexed by cell id, with scalar cell features
+        flattened into dotted column names (e.g. 'long_squares.rheobase_i').
+    sweep_table: pd.DataFrame
+        One row per sweep, indexed by (cell id, sweep number), with scalar
+        sweep features.
+    failures: dict
+        Traceback string for each failed cell id.
+    """
+    cell_rows, sweep_rows = [], []
+    failures = {}
+
+    for cell_id, sweep_features, cell_features, error in iter_cell_features(cells, processes):
+        if error is not None:
+            logging.error("feature extraction failed for cell %s:\n%s", cell_id, error)
+            failures[cell_id] = error
+            continue
+
+        for sweep_number, features in six.iteritems(sweep_features):
+            row = _flatten_features(features)
+            row["cell_id"] = cell_id
+            row["sweep_number"] = sweep_number
+            sweep_rows.append(row)
+
+        if cell_features is not None:
+            row = _flatten_features(cell_features)
+            row["cell_id"] = cell_id
+            cell_rows.append(row)
+
+    cell_table = pd.DataFrame(cell_rows, columns=None if cell_rows else ["cell_id"])
+    cell_table = cell_table.set_index("cell_id")
+
+    sweep_table = pd.DataFrame(sweep_rows, columns=None if sweep_rows else ["cell_id", "sweep_number"])
+    sweep_table = sweep_table.set_index(["cell_id", "sweep_number"]).sort_index()
+
+    return cell_table, sweep_table, failures
+
+
 def get_stim_characteristics(i, t, no_test_pulse=False):
     '''
     Identify the start time, duration, amplitude, start index, and
@@ -109,6 +109,144 @@ class FitEllipse (object):
         return params, error
 
 
+class BatchFitEllipse (FitEllipse):
+    """ RANSAC ellipse fitting with all iterations evaluated at once.
+
+    All max_iter minimal subsets are drawn up front, the conic least-squares
+    problems for every subset are solved as a stack of 6x6 systems, and every
+    candidate point is scored against every model in one broadcast.  The
+    consensus rule is the same as FitEllipse.ransac_fit.  Singular subsets are
+    skipped rather than accepted.
+    """
+
+    def __init__(self,min_points,max_iter,threshold,num_close,random_state=None):
+        super(BatchFitEllipse, self).__init__(min_points,max_iter,threshold,num_close)
+        self.random_state = random_state if random_state is not None else np.random
+
+    def ransac_fit(self,candidate_points):
+        params, error = self.ransac_params(candidate_points)
+
+        if params is not None and error < self.besterror:
+            self.best_params = params
+            self.best_params_set = True
+            self.besterror = error
+
+        if self.best_params_set:
+            return ellipse_center(self.best_params), ellipse_angle_of_rotation(self.best_params)*180./np.pi, ellipse_axis_length(self.best_params)
+        else:
+            return None
+
+    def ransac_params(self,candidate_points):
+        """ return the best conic parameters and their error, or (None, np.inf) """
+        points = np.asarray(candidate_points, dtype=np.float64).reshape(-1,2)
+        n = len(points)
+
+        # no outliers are left to vote when every point is in the sample
+        if n <= self.min_points:
+            return None, np.inf
+
+        D = design_matrix(points)
+
+        # draw max_iter subsets without replacement
+        order = np.argsort(self.random_state.random_sample((self.max_iter, n)), axis=1)
+        sample = np.zeros((self.max_iter, n), dtype=bool)
+        np.put_along_axis(sample, order[:,:self.min_points], True, axis=1)
+
+        params, _ = fit_conics(D, sample, self.C)
+
+        cost = np.dot(params, D.T)**2
+        with np.errstate(invalid='ignore'):
+            also_in = (cost < self.threshold) & ~sample
+        consensus = also_in.sum(axis=1) > self.num_close
+
+        if not np.any(consensus):
+            return None, np.inf
+
+        inliers = sample[consensus] | also_in[consensus]
+        params, error = fit_conics(D, inliers, self.C)
+
+        if np.all(np.isnan(error)):
+            return None, np.inf
+
+        best = np.nanargmin(error)
+        return params[best], error[best]
+
+
+def design_matrix(points):
+    """ (n,6) conic design matrix for (y,x) points """
+    y, x = np.asarray(points, dtype=np.float64).T
+    return np.stack([x*x, x*y, y*y, x, y, np.ones(len(y))], axis=1)
+
+
+def fit_conics(D, weights, C):
+    """ Solve the constrained conic least-squares problem for many point subsets.
+
+    Parameters
+    ----------
+    D: np.ndarray
+        (n,6) design matrix of all candidate points
+    weights: np.ndarray
+        (k,n) boolean (or 0/1) membership of each point in each of k subsets
+    C: np.ndarray
+        (6,6) ellipse constraint matrix
+
+    Returns
+    -------
+    params: np.ndarray
+        (k,6) conic parameters, NaN for singular subsets
+    error: np.ndarray
+        (k,) algebraic fit error per point, NaN for singular subsets
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    S = np.einsum('kn,ni,nj->kij', weights, D, D)
+
+    # S is inverted below, so it must have full rank.  five points determine a
+    # conic, but leave S singular with the conic in its null space
+    valid = np.linalg.matrix_rank(S) == 6
+
+    S_inv = np.full_like(S, np.nan)
+    try:
+        S_inv[valid] = np.linalg.inv(S[valid])
+    except np.linalg.LinAlgError:
+        for i in np.flatnonzero(valid):
+            try:
+                S_inv[i] = np.linalg.inv(S[i])
+            except np.linalg.LinAlgError:
+                valid[i] = False
+
+    params = np.full((len(S), 6), np.nan)
+    if np.any(valid):
+        U, _, _ = np.linalg.svd(np.matmul(S_inv[valid], C))
+        params[valid] = U[:,:,0]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        error = np.einsum('ki,kij,kj->k', params, S, params) / weights.sum(axis=1)
+
+    return params, error
+
+
+def refit_ellipses(candidate_point_sets, min_points=10, max_iter=10, threshold=0.0001, num_close=4, random_state=None):
+    """ Batched RANSAC fit of one ellipse per set of candidate points, e.g. for
+    offline refitting of stored per-frame candidate points.
+
+    Returns
+    -------
+    np.ndarray
+        (len(candidate_point_sets), 5) array of (center x, center y, angle,
+        axis1, axis2), NaN where no fit was found
+    """
+    results = np.full((len(candidate_point_sets), 5), np.nan)
+
+    for i, points in enumerate(candidate_point_sets):
+        fe = BatchFitEllipse(min_points, max_iter, threshold, num_close, random_state=random_state)
+        result = fe.ransac_fit(points)
+        if result is not None:
+            center, angle, axes = result
+            results[i] = (center[0], center[1], angle, axes[0], axes[1])
+
+    return results
+
+
 def ellipse_center(a):
     b,c,d,f,g,a = a[1]/2, a[2], a[3]/2, a[4]/2, a[5], a[0]
     num = b*b-a*c
@@ -6,14 +6,50 @@ from collections import deque
 import scipy.misc
 import traceback
 import signal
+import tempfile
+import re
+
+def first_channel(frame):
+    return frame[:,:,0].copy()
+
+def parse_ffmpeg_fps(log):
+    """ Return the video frame rate reported in ffmpeg's stream info, or None """
+    match = re.search(r'Video:.*?([\d.]+) fps', log)
+    return float(match.group(1)) if match else None
+
+def parse_ffmpeg_first_frame(log, fps):
+    """ Return the index of the first frame reported by the showinfo filter,
+    measured from the input's start time, or None if it has not been logged """
+    pts = re.search(r'pts_time:(-?[\d.]+)', log)
+    if pts is None:
+        return None
+
+    start = re.search(r'start: (-?[\d.]+)', log)
+    start_time = float(start.group(1)) if start else 0.0
+
+    return int(round((float(pts.group(1)) - start_time) * fps))
+
+def probe_fps(movie_path, ffmpeg_bin='ffmpeg'):
+    """ Read a movie's frame rate from the stream info ffmpeg prints for it """
+    proc = sp.Popen([ ffmpeg_bin, '-i', movie_path ], stdout=sp.PIPE, stderr=sp.PIPE)
+    _, log = proc.communicate()
+
+    fps = parse_ffmpeg_fps(log.decode('utf-8', 'replace'))
+    if fps is None:
+        raise IOError("could not determine frame rate of %s" % movie_path)
+
+    return fps
 
 class FrameInputStream( object ):
+    # streams that can start reading part way through a movie implement segment()
+    seekable = False
+
     def __init__(self, movie_path, num_frames=None, block_size=1, cache_frames=False, process_frame_cb=None):
         self.movie_path = movie_path
         self.num_frames = num_frames
         self.block_size = block_size
         self.cache_frames = cache_frames
-        self.process_frame_cb = process_frame_cb if process_frame_cb else lambda f: f[:,:,0].copy()
+        self.process_frame_cb = process_frame_cb if process_frame_cb else first_channel
 
         self.frames_read = 0
         self.frame_cache = []
@@ -36,6 +72,12 @@ class FrameInputStream( object ):
     def _read_iter(self):
         pass
 
+    def segment(self, start_frame, num_frames):
+        """ Return a new stream of the same movie that starts reading at start_frame
+        and stops after num_frames.  Used to shard a movie across worker processes.
+        Only available on streams with seekable = True. """
+        raise NotImplementedError("%s does not support segment()" % type(self).__name__)
+
     def __enter__(self):
         return self
 
@@ -49,6 +91,8 @@ class FrameInputStream( object ):
             self.open()
 
             self.frame_cache = []
+            # number of cached frames that have already been yielded
+            yielded = 0
 
             for frame in self._read_iter():
                 self.frame_cache.append(self._process_frame(frame))
@@ -59,18 +103,18 @@ class FrameInputStream( object ):
 
                 if self.block_size is None:
                     continue
-                if self.block_size == 1:
-                    yield self.frame_cache[-1]
-                elif (self.frames_read % self.block_size) == 0:
-                    for i in range(-self.block_size,0):
-                        yield self.frame_cache[i]
+                if (self.frames_read % self.block_size) == 0:
+                    for frame in self.frame_cache[yielded:]:
+                        yield frame
 
-                    if not self.cache_frames:
+                    if self.cache_frames:
+                        yielded = len(self.frame_cache)
+                    else:
                         self.frame_cache = []
 
             self.close()
 
-            for frame in self.frame_cache:
+            for frame in self.frame_cache[yielded:]:
                 yield frame
 
             if not self.cache_frames:
@@ -90,13 +134,18 @@ class FrameInputStream( object ):
         
 
 class FfmpegInputStream( FrameInputStream ):
-    def __init__(self, movie_path, frame_shape, ffmpeg_bin='ffmpeg', num_frames=None, block_size=1, cache_frames=False, process_frame_cb=None):
+    seekable = True
+
+    def __init__(self, movie_path, frame_shape, ffmpeg_bin='ffmpeg', num_frames=None, block_size=1, cache_frames=False, process_frame_cb=None, start_frame=0, fps=None):
         super(FfmpegInputStream, self).__init__(movie_path=movie_path, num_frames=num_frames, block_size=block_size, cache_frames=cache_frames, process_frame_cb=process_frame_cb)
 
         self.ffmpeg_bin = ffmpeg_bin
         self.frame_shape = frame_shape
+        self.start_frame = start_frame
+        self.fps = fps
 
         self.pipe = None
+        self.log_path = None
         
     def open(self):
         super(FfmpegInputStream, self).open()
@@ -104,21 +153,61 @@ class FfmpegInputStream( FrameInputStream ):
         if self.pipe:
             raise IOError("pipe is open already")
 
-        command = [ self.ffmpeg_bin,
-                    '-i', self.movie_path,
-                    '-f', 'image2pipe',
+        command = [ self.ffmpeg_bin ]
+
+        if self.start_frame:
+            if self.fps is None:
+                self.fps = probe_fps(self.movie_path, self.ffmpeg_bin)
+
+            # input-side seek: jump to the preceding keyframe and decode forward
+            # from there.  timestamps are kept so the first frame can be checked.
+            command += ['-ss', '%.6f' % (self.start_frame / float(self.fps)),
+                        '-copyts']
+
+        command += ['-i', self.movie_path]
+
+        if self.start_frame:
+            command += ['-vf', 'showinfo',
+                        '-vsync', '0']
+
+        command += ['-f', 'image2pipe',
                     '-pix_fmt', 'rgb24',
                     '-vcodec', 'rawvideo']
 
         if self.num_frames is not None:
-            command += ['-vframes', str(self.num_frames)]
+            command += ['-frames:v', str(self.num_frames)]
 
         command += ['-']
 
-        frame_size = np.prod(self.frame_shape)
-        self.pipe = sp.Popen(command, stdout=sp.PIPE, bufsize=0)
+        if self.start_frame:
+            # ffmpeg appends its log here; it is read back when the stream closes
+            fd, self.log_path = tempfile.mkstemp(suffix='.log')
+            os.close(fd)
+            with open(self.log_path, 'ab') as log_file:
+                self.pipe = sp.Popen(command, stdout=sp.PIPE, stderr=log_file, bufsize=0)
+        else:
+            self.pipe = sp.Popen(command, stdout=sp.PIPE, bufsize=0)
         logging.debug("opened pipe")
 
+    def check_first_frame(self):
+        """ Raise an IOError if the seek did not land on start_frame """
+        if self.log_path is None:
+            return
+
+        with open(self.log_path, 'rb') as log_file:
+            log = log_file.read().decode('utf-8', 'replace')
+
+        os.remove(self.log_path)
+        self.log_path = None
+
+        first_frame = parse_ffmpeg_first_frame(log, self.fps)
+
+        if first_frame is None:
+            raise IOError("could not read first frame time from ffmpeg log")
+
+        if first_frame != self.start_frame:
+            raise IOError("seek to frame %d started at frame %d" % (self.start_frame, first_frame))
+
     def close(self):
         if self.pipe is None:
             raise IOError("pipe is not open")
@@ -138,6 +227,8 @@ class FfmpegInputStream( FrameInputStream ):
 
         self.pipe = None
 
+        self.check_first_frame()
+
     def _process_frame(self, frame):
         frame = np.fromstring(frame, dtype=np.uint8)
         frame.resize(self.frame_shape)
@@ -168,6 +259,19 @@ class FfmpegInputStream( FrameInputStream ):
             self.pipe.kill()
             self.pipe = None
 
+        if self.log_path:
+            os.remove(self.log_path)
+            self.log_path = None
+
+    def segment(self, start_frame, num_frames):
+        return FfmpegInputStream(self.movie_path, self.frame_shape,
+                                 ffmpeg_bin=self.ffmpeg_bin,
+                                 num_frames=num_frames,
+                                 block_size=self.block_size,
+                                 process_frame_cb=self.process_frame_cb,
+                                 start_frame=self.start_frame + start_frame,
+                                 fps=self.fps)
+
     def create_images(self, output_directory, image_type):
         cmd = self.ffmpeg_bin + ' -i ' + self.movie_path + ' ' + output_directory + '/input_frame-%06d.' + image_type
 
@@ -7,9 +7,11 @@ from scipy.misc import imsave
 from scipy.signal import medfilt2d
 import ast
 import json
+import time
+import multiprocessing as mp
 
-from fit_ellipse import fit_ellipse, FitEllipse
-from itracker_utils import generate_rays, initial_pupil_point, initial_cr_point, sobel_grad
+from .fit_ellipse import fit_ellipse, FitEllipse, BatchFitEllipse
+from .itracker_utils import generate_rays, initial_pupil_point, initial_cr_point, sobel_grad
 import logging
 
 import matplotlib.pyplot as plt
@@ -18,6 +20,48 @@ import matplotlib.pyplot as plt
 
 color_list = ['b','g','r','c','m','y','k']
 
+def flatten_params(params):
+    """ convert ((x, y), angle, (axis1, axis2)) fit results to a flat 5-tuple """
+    return (params[0][0], params[0][1], params[1], params[2][0], params[2][1])
+
+def track_segment(args):
+    """ Track a contiguous block of frames in a worker process.
+
+    Parameters
+    ----------
+    args: tuple
+        (tracker, start_frame, num_frames).  The tracker's input stream is
+        re-opened at start_frame, so every worker decodes its own segment.
+
+    Returns
+    -------
+    tuple
+        start_frame, pupil_params (num_frames x 5), cr_params (num_frames x 5)
+    """
+    tracker, start_frame, num_frames = args
+
+    pupil_params = np.zeros([num_frames, 5])
+    cr_params = np.zeros([num_frames, 5])
+
+    input_stream = tracker.input_stream.segment(start_frame, num_frames)
+
+    for i, input_frame in enumerate(input_stream):
+        if i == 0 and start_frame > 0 and not tracker.auto:
+            # the previous segment's last pupil fit is not available here, so
+            # seed the pupil the way an automatic run would.  cr_loc is never
+            # updated by process_image and carries over unchanged.
+            im = medfilt2d(input_frame, kernel_size=3)
+            tracker.pupil_loc = initial_pupil_point(im, bbox=tracker.bbox_pupil)
+
+        pupil, cr = tracker.process_image(input_frame, bbox_pupil=tracker.bbox_pupil, bbox_cr=tracker.bbox_cr)
+
+        pupil_params[i] = flatten_params(pupil)
+        cr_params[i] = flatten_params(cr)
+
+    logging.debug("tracked frames %d-%d", start_frame, start_frame + num_frames)
+
+    return start_frame, pupil_params, cr_params
+
 class iTracker (object):
     def __init__(self, output_folder, 
                  im_shape, num_frames, 
@@ -25,7 +69,8 @@ class iTracker (object):
                  threshold_factor=1.3, auto=True,
                  cutoff_pixels=10,
                  bbox_pupil=None,
-                 bbox_cr=None):
+                 bbox_cr=None,
+                 batch_ransac=False):
 
         self.im_shape = im_shape
         self.num_frames = num_frames
@@ -38,6 +83,8 @@ class iTracker (object):
         self.cutoff_pixels = cutoff_pixels
         self.bbox_pupil = bbox_pupil
         self.bbox_cr = bbox_cr
+        self.batch_ransac = batch_ransac
+        self.ellipse_fitter = BatchFitEllipse if batch_ransac else FitEllipse
 
         self._mean_frame = None
 
@@ -51,7 +98,8 @@ class iTracker (object):
                             'movie_shape':  self.movie_shape,
                             'im_shape':  im_shape,
                             'bbox_pupil':  bbox_pupil,
-                            'bbox_cr':  bbox_cr }
+                            'bbox_cr':  bbox_cr,
+                            'batch_ransac': batch_ransac }
         with open(self.run_params_file, 'w') as f:
             f.write(json.dumps(self.run_params))
 
@@ -302,12 +350,14 @@ class iTracker (object):
         else:
             annotation_frame_output_stream = None
 
+        start_time = time.time()
+
         for i, input_frame in enumerate(self.input_stream):
             # get pupil and corneal reflection parameters, this line is the actual eye tracking algorithm
             pupil, cr = self.process_image(input_frame, bbox_pupil=self.bbox_pupil, bbox_cr=self.bbox_cr)
 
-            pupil_params = (pupil[0][0],pupil[0][1],pupil[1],pupil[2][0],pupil[2][1])
-            cr_params = (cr[0][0],cr[0][1],cr[1],cr[2][0],cr[2][1])
+            pupil_params = flatten_params(pupil)
+            cr_params = flatten_params(cr)
 
             if frame_output_stream:
                 frame_output_stream.write(input_frame)
@@ -324,12 +374,14 @@ class iTracker (object):
                     annotation_frame_output_stream.write( annotated_frame )
 
             # save results in arrays
-            self.pupil_params[i] = (pupil[0][0],pupil[0][1],pupil[1],pupil[2][0],pupil[2][1])
-            self.cr_params[i] = (cr[0][0],cr[0][1],cr[1],cr[2][0],cr[2][1])
+            self.pupil_params[i] = pupil_params
+            self.cr_params[i] = cr_params
 
             if i % 100 == 0:
                 logging.debug("tracked frame %d", i)
 
+        self.log_throughput(self.num_frames, time.time() - start_time)
+
         logging.debug("Saving pupil and cr parameters to:")
         logging.debug("\t%s", self.pupil_file)
         logging.debug("\t%s", self.cr_file)
@@ -348,6 +400,87 @@ class iTracker (object):
 
         # return mean_frame
 
+    def process_movie_parallel(self, num_workers=None, segment_size=1000,
+                               movie_output_stream=None,
+                               output_frames=False,
+                               output_annotation_frames=False):
+        """ Track the movie in contiguous segments of segment_size frames,
+        distributed across num_workers processes.  Each worker opens its own
+        input stream at the start of its segment, so the input stream must be
+        seekable.  Results are merged in frame order into pupil_params and
+        cr_params and saved as in process_movie.
+
+        With auto=True every frame is seeded independently and the results
+        match process_movie.  With auto=False, process_movie carries the pupil
+        seed forward from the previous frame's fit; here each segment after the
+        first is instead seeded with initial_pupil_point on its first frame.
+
+        If movie_output_stream is given, the annotated movie is written in a
+        second, serial pass that decodes the whole input stream again.
+        output_frames and output_annotation_frames are not supported and raise
+        a ValueError.
+        """
+
+        if output_frames or output_annotation_frames:
+            raise ValueError("output_frames and output_annotation_frames are "
+                             "only supported by process_movie")
+
+        if not self.input_stream.seekable:
+            raise ValueError("%s cannot be split into segments; use process_movie" %
+                             type(self.input_stream).__name__)
+
+        if num_workers is None:
+            num_workers = mp.cpu_count()
+
+        self.pupil_params = np.zeros([self.num_frames, 5])
+        self.cr_params = np.zeros([self.num_frames, 5])
+
+        segments = [ (self, start, min(segment_size, self.num_frames - start))
+                     for start in range(0, self.num_frames, segment_size) ]
+
+        start_time = time.time()
+
+        pool = mp.Pool(processes=num_workers)
+        try:
+            for start, pupil_params, cr_params in pool.imap_unordered(track_segment, segments):
+                self.pupil_params[start:start+len(pupil_params)] = pupil_params
+                self.cr_params[start:start+len(cr_params)] = cr_params
+        finally:
+            pool.close()
+            pool.join()
+
+        self.log_throughput(self.num_frames, time.time() - start_time)
+
+        logging.debug("Saving pupil and cr parameters to:")
+        logging.debug("\t%s", self.pupil_file)
+        logging.debug("\t%s", self.cr_file)
+
+        np.save(self.pupil_file, self.pupil_params)
+        np.save(self.cr_file, self.cr_params)
+
+        if movie_output_stream:
+            logging.info("writing annotated movie in a serial pass")
+            self.write_annotated_movie(movie_output_stream)
+
+    def write_annotated_movie(self, movie_output_stream):
+        """ write the input movie annotated with the stored pupil and cr parameters """
+        movie_output_stream.open(self.annotated_movie_file)
+
+        for i, input_frame in enumerate(self.input_stream):
+            annotated_frame = self.annotate_frame(np.dstack([input_frame,input_frame,input_frame]),
+                                                  self.pupil_params[i],
+                                                  self.cr_params[i])
+            movie_output_stream.write(annotated_frame)
+
+        movie_output_stream.close()
+
+    def log_throughput(self, num_frames, elapsed):
+        """ record and log tracking throughput in frames per second """
+        self.frames_per_second = num_frames / elapsed if elapsed > 0 else np.inf
+        logging.info("tracked %d frames in %.1f s (%.2f frames/s)",
+                     num_frames, elapsed, self.frames_per_second)
+        return self.frames_per_second
+
     def clear_input_images(self):
         logging.debug("Deleting input image folder")
         shutil.rmtree(os.path.join(self.folder, 'input_images'))
@@ -376,7 +509,7 @@ class iTracker (object):
         #pupil_params = fit_ellipse(pupil_candidate_points)
 
         # fit pupil ellipse with ransac algorithm
-        fe=FitEllipse(10,10,0.0001,4)
+        fe=self.ellipse_fitter(10,10,0.0001,4)
         result = fe.ransac_fit(pupil_candidate_points)
 
         # if np.any(np.isnan(result)):    #should use np.any(np.isnan(result))
@@ -402,7 +535,7 @@ class iTracker (object):
 
         try:
             #cr_params = fit_ellipse(cr_candidate_points)
-            fe=FitEllipse(10,10,0.0001,4)
+            fe=self.ellipse_fitter(10,10,0.0001,4)
             result = fe.ransac_fit(cr_candidate_points)
 
             if result!=None:
@@ -1,12 +1,18 @@
 import itertools
 import numpy as np
+import scipy.sparse as sparse
 import logging
 
 class MaskSet( object ):
     def __init__(self, masks):
         self.masks = masks
-        self.bbs = make_bbs(self.masks)
-        self.mask_dist = bb_dist(self.bbs)
+        self.pixels = make_pixel_sets(self.masks)
+        self.bbs = make_bbs(self.masks, self.pixels)
+        self.bb_array = np.array(self.bbs, dtype=float).reshape(-1, 2, 2)
+
+        self._mask_dist = None
+        self._neighbors = {}
+        self._overlaps = None
 
         self.cached_sizes = {}
 
@@ -20,15 +26,48 @@ class MaskSet( object ):
     def count(self):
         return len(self.bbs)
 
+    @property
+    def mask_dist(self):
+        if self._mask_dist is None:
+            self._mask_dist = bb_dist(self.bbs)
+        return self._mask_dist
+
     def distance(self, mask_idxs):
         return max(self.mask_dist[i,j] for (i,j) in itertools.combinations(mask_idxs, 2))
 
     def close(self, mask_idxs, max_dist):
-        return not any(self.mask_dist[i,j] > max_dist for (i,j) in itertools.combinations(mask_idxs, 2)) 
+        return not any(self.mask_dist[i,j] > max_dist for (i,j) in itertools.combinations(mask_idxs, 2))
+
+    def close_pairs(self, max_dist):
+        ''' Find all pairs of masks whose bounding boxes are within max_dist
+        of one another.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Indices (i, j) of the pairs, with i < j, in lexicographic order.
+        '''
+        return close_pairs(self.bb_array, max_dist)
+
+    def neighbors(self, max_dist):
+        ''' For each mask, a sorted array of the other masks whose bounding
+        boxes are within max_dist of its own. '''
+        if max_dist not in self._neighbors:
+            i, j = self.close_pairs(max_dist)
+            rows = np.concatenate([i, j])
+            cols = np.concatenate([j, i])
+            order = np.lexsort((cols, rows))
+            bounds = np.searchsorted(rows[order], np.arange(self.count + 1))
+            cols = cols[order]
+            self._neighbors[max_dist] = [ cols[bounds[k]:bounds[k+1]] for k in range(self.count) ]
+        return self._neighbors[max_dist]
 
     def close_sets(self, set_size, max_dist):
-        mask_sets = itertools.combinations(range(len(self.bbs)), set_size)
-        return (ms for ms in mask_sets if self.close(ms,  max_dist))
+        if set_size < 2:
+            return itertools.combinations(range(len(self.bbs)), set_size)
+
+        later = [ nbrs[nbrs > k].tolist() for k, nbrs in enumerate(self.neighbors(max_dist)) ]
+        return _cliques(later, set_size)
 
     def _idx_key(self, idxs):
         return tuple(sorted(set(idxs)))
@@ -38,7 +77,7 @@ class MaskSet( object ):
 
     def union(self, mask_idxs):
         mask_idxs = self._idx_key(mask_idxs)
-        
+
         if mask_idxs in self.cached_unions:
             return self.cached_unions[mask_idxs]
 
@@ -47,7 +86,7 @@ class MaskSet( object ):
 
         i0 = mask_idxs[0]
         union = self.masks[i0].copy()
-        
+
         if len(mask_idxs) == 1:
             return union
 
@@ -58,21 +97,50 @@ class MaskSet( object ):
 
         return union
 
+    def union_pixels(self, mask_idxs):
+        ''' Flat indices of the pixels covered by any of a set of masks. '''
+        mask_idxs = self._idx_key(mask_idxs)
+
+        if len(mask_idxs) == 0:
+            return np.zeros(0, dtype=int)
+
+        return _reduce_pixels(np.union1d, [ self.pixels[idx] for idx in mask_idxs ])
+
+    def intersection_pixels(self, mask_idxs):
+        ''' Flat indices of the pixels covered by all of a set of masks. '''
+        mask_idxs = self._idx_key(mask_idxs)
+
+        if len(mask_idxs) == 0:
+            return np.zeros(0, dtype=int)
+
+        return _reduce_pixels(lambda a, b: np.intersect1d(a, b, assume_unique=True),
+                              [ self.pixels[idx] for idx in mask_idxs ])
+
+    @property
+    def overlaps(self):
+        ''' For each mask, a dict mapping the other masks it overlaps to the
+        number of pixels they share. '''
+        if self._overlaps is None:
+            self._overlaps = pairwise_overlaps(self.pixels, self.count)
+        return self._overlaps
+
     def overlap_fraction(self, idx0, idx1):
         union_size = self.union_size([idx0,idx1])
         overlap_size = self.intersection_size([idx0,idx1])
         return float(overlap_size) / float(union_size)
 
     def detect_duplicates(self, overlap_threshold):
-        duplicate_masks = set()
+        idx0, idx1 = self.close_pairs(0)
+        sizes = np.array([ len(p) for p in self.pixels ])
 
-        for idx0,idx1 in self.close_sets(set_size=2, max_dist=0):
-            overlap_frac = self.overlap_fraction(idx0, idx1)
+        overlaps = self.overlaps
+        overlap_size = np.array([ overlaps[i].get(j, 0) for i, j in zip(idx0.tolist(), idx1.tolist()) ], dtype=float)
+        union_size = sizes[idx0] + sizes[idx1] - overlap_size
 
-            if overlap_frac > overlap_threshold:
-                duplicate_masks.add(tuple(sorted([idx0,idx1])))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            duplicate = overlap_size / union_size > overlap_threshold
 
-        return duplicate_masks
+        return set(zip(idx0[duplicate].tolist(), idx1[duplicate].tolist()))
 
     def mask_is_union_of_set(self, mask_idx, set_idxs, threshold):
         # does this mask overlap with each element of the set individually?
@@ -85,26 +153,33 @@ class MaskSet( object ):
 
 
         # does this mask cover more than the union of the individual set elements?
-        set_union = self.union(set_idxs)
-        mask = self.mask(mask_idx)
-        overlap = set_union & mask
-        overlap_size = overlap.sum()
+        set_union = self.union_pixels(set_idxs)
+        overlap = np.intersect1d(set_union, self.pixels[mask_idx], assume_unique=True)
+        overlap_size = len(overlap)
 
         return overlap_size > self.size(mask_idx) * threshold
 
     def detect_unions(self, set_size=2, max_dist=10, threshold=0.7):
         union_masks = {}
 
-        mask_combos = list(self.close_sets(set_size, max_dist))
-
-        for i, set_idxs in enumerate(mask_combos):
-            for mask_idx in range(self.count):
-                if mask_idx in set_idxs:
+        neighbors = self.neighbors(max_dist)
+        sizes = [ len(p) for p in self.pixels ]
+        overlaps = self.overlaps
+
+        for set_idxs in self.close_sets(set_size, max_dist):
+            # masks close to every member of the set, in ascending order
+            if len(set_idxs) > 0:
+                candidates = _reduce_pixels(lambda a, b: np.intersect1d(a, b, assume_unique=True),
+                                            [ neighbors[idx] for idx in set_idxs ])
+            else:
+                candidates = np.arange(self.count)
+
+            for mask_idx in candidates.tolist():
+                # cheap rejection: each set element must be mostly covered by the mask
+                if any(overlaps[idx].get(mask_idx, 0) < threshold * sizes[idx] for idx in set_idxs):
                     continue
-                elif not self.close([mask_idx] + list(set_idxs), max_dist):
-                    continue        
 
-                if self.mask_is_union_of_set(mask_idx, set_idxs, threshold):                    
+                if self.mask_is_union_of_set(mask_idx, set_idxs, threshold):
                     if mask_idx in union_masks:
                         logging.warning("already detected this mask as a union")
                     union_masks[mask_idx] = set_idxs
@@ -116,15 +191,15 @@ class MaskSet( object ):
 
         if mask_idxs in self.cached_union_sizes:
             return self.cached_union_sizes[mask_idxs]
-   
-        s = self.union(mask_idxs).sum()
+
+        s = len(self.union_pixels(mask_idxs))
         self.cached_union_sizes[mask_idxs] = s
 
         return s
 
-    def intersection(self, mask_idxs):        
+    def intersection(self, mask_idxs):
         mask_idxs = self._idx_key(mask_idxs)
-        
+
         if mask_idxs in self.cached_intersections:
             return self.cached_intersections[mask_idxs]
 
@@ -134,7 +209,7 @@ class MaskSet( object ):
         # don't cache the empty ones
         if not self.close(mask_idxs, 0):
             return np.zeros(self.masks[0].shape)
-        
+
         i0 = mask_idxs[0]
         intersection = self.masks[i0].copy()
 
@@ -153,8 +228,12 @@ class MaskSet( object ):
 
         if mask_idxs in self.cached_intersection_sizes:
             return self.cached_intersection_sizes[mask_idxs]
-   
-        s = self.intersection(mask_idxs).sum()
+
+        if len(mask_idxs) == 2:
+            i, j = mask_idxs
+            s = self.overlaps[i].get(j, 0)
+        else:
+            s = len(self.intersection_pixels(mask_idxs))
         self.cached_intersection_sizes[mask_idxs] = s
 
         return s
@@ -163,11 +242,135 @@ class MaskSet( object ):
         return self.union_size([mask_idx])
 
 
-def make_bbs(masks):
+def _reduce_pixels(fn, pixel_sets):
+    result = pixel_sets[0]
+    for pixels in pixel_sets[1:]:
+        result = fn(result, pixels)
+    return result
+
+
+def _cliques(later, set_size):
+    ''' Enumerate, in lexicographic order, the sets of set_size nodes that
+    are all adjacent to one another. later[i] lists the neighbors of node i
+    that are greater than i, in ascending order. '''
+
+    later_sets = [ set(nbrs) for nbrs in later ]
+
+    def extend(clique, candidates):
+        if len(clique) == set_size:
+            yield tuple(clique)
+            return
+
+        for c in candidates:
+            nbrs = later_sets[c]
+            yield from extend(clique + [c], [ n for n in candidates if n in nbrs ])
+
+    for i, nbrs in enumerate(later):
+        yield from extend([i], nbrs)
+
+
+def make_pixel_sets(masks):
+    ''' Sorted flat indices of the nonzero pixels of each mask. '''
+    if len(masks) == 0:
+        return []
+
+    flat = np.asarray(masks).reshape(len(masks), -1)
+    rows, pixels = np.nonzero(flat)
+    bounds = np.searchsorted(rows, np.arange(len(masks) + 1))
+
+    return [ pixels[bounds[i]:bounds[i+1]] for i in range(len(masks)) ]
+
+
+def pairwise_overlaps(pixels, count):
+    ''' Count the pixels shared by each pair of masks with a single sparse
+    product. Returns, for each mask, a dict from overlapping mask index to
+    shared pixel count (excluding the mask itself). '''
+    if count == 0:
+        return []
+
+    lengths = [ len(p) for p in pixels ]
+    cols = np.concatenate(pixels)
+    rows = np.repeat(np.arange(count), lengths)
+    data = np.ones(len(cols), dtype=np.int64)
+    width = int(cols.max()) + 1 if len(cols) else 1
+
+    membership = sparse.csr_matrix((data, (rows, cols)), shape=(count, width))
+    shared = (membership * membership.T).tocsr()
+
+    overlaps = []
+    for i in range(count):
+        start, end = shared.indptr[i], shared.indptr[i+1]
+        row = dict(zip(shared.indices[start:end].tolist(), shared.data[start:end].tolist()))
+        row.pop(i, None)
+        overlaps.append(row)
+
+    return overlaps
+
+
+def close_pairs(bb_array, max_dist):
+    ''' Find pairs of bounding boxes within max_dist of one another (as
+    measured by bb_dist) by sweeping along the first axis, so that only
+    boxes whose extents along that axis come near each other are compared.
+
+    Parameters
+    ----------
+    bb_array : np.ndarray
+        Nx2x2 array of [[min0, max0], [min1, max1]] bounding boxes.
+    max_dist : float
+        Largest distance allowed between paired boxes.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        Indices (i, j) of the pairs, with i < j, in lexicographic order.
+    '''
+    empty = (np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+    if len(bb_array) < 2:
+        return empty
+
+    reach = max(max_dist, 0)
+    order = np.argsort(bb_array[:, 0, 0], kind='mergesort')
+    starts = bb_array[order, 0, 0]
+    ends = np.searchsorted(starts, bb_array[order, 0, 1] + reach, side='right')
+
+    first = np.arange(1, len(order) + 1)
+    counts = np.maximum(ends - first, 0)
+    if counts.sum() == 0:
+        return empty
+
+    a = np.repeat(np.arange(len(order)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    b = np.repeat(first, counts) + offsets
+
+    i = np.minimum(order[a], order[b])
+    j = np.maximum(order[a], order[b])
+
+    close = pair_dist(bb_array, i, j) <= max_dist
+    i, j = i[close], j[close]
+
+    lex = np.lexsort((j, i))
+    return i[lex], j[lex]
+
+
+def pair_dist(bb_array, i, j):
+    ''' bb_dist for selected pairs of bounding boxes, where i < j. '''
+    bbi = bb_array[i]
+    bbj = bb_array[j]
+
+    dist = np.where(bbi[:, :, 0] < bbj[:, :, 1],
+                    bbj[:, :, 0] - bbi[:, :, 1],
+                    bbi[:, :, 0] - bbj[:, :, 1])
+    return dist.max(axis=1)
+
+
+def make_bbs(masks, pixels=None):
+    if pixels is None:
+        pixels = make_pixel_sets(masks)
+
     bbs = []
 
     for i in range(len(masks)):
-        m = np.where(masks[i])
+        m = np.unravel_index(pixels[i], masks[i].shape)
         bbs.append([[m[0].min(), m[0].max()],[m[1].min(), m[1].max()]])
 
     return bbs
@@ -176,21 +379,11 @@ def bb_dist(bbs):
     num_bbs = len(bbs)
 
     dist = np.zeros((num_bbs, num_bbs))
-    for i,j in itertools.combinations(range(num_bbs), 2):
-        bbi = bbs[i]
-        bbj = bbs[j]
-
-        if bbi[0][0] < bbj[0][1]:
-            distx = bbj[0][0] - bbi[0][1]
-        else:
-            distx = bbi[0][0] - bbj[0][1]
-
-        if bbi[1][0] < bbj[1][1]:
-            disty = bbj[1][0] - bbi[1][1]
-        else:
-            disty = bbi[1][0] - bbj[1][1]
+    if num_bbs < 2:
+        return dist
 
-        dist[i,j] = max(distx,disty)
-        dist[j,i] = dist[i,j]
+    i, j = np.triu_indices(num_bbs, 1)
+    dist[i,j] = pair_dist(np.array(bbs, dtype=float).reshape(-1, 2, 2), i, j)
+    dist[j,i] = dist[i,j]
 
     return dist
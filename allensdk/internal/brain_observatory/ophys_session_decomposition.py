@@ -1,7 +1,31 @@
+import logging
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from six.moves import queue
 import numpy as np
 import h5py
 
 
+# Codec and chunk-shape presets for export_frame_to_hdf5_pipelined. Chunks
+# span whole frames; chunk_frames sets how many frames share a chunk.
+#   legacy: the settings used by export_frame_to_hdf5
+#   gzip: fast deflate with byte shuffling, readable anywhere hdf5 is
+#   lzf: h5py's lzf filter, faster still but h5py-specific
+#   none: uncompressed
+COMPRESSION_PRESETS = {
+    "legacy": {"compression": "gzip", "compression_opts": 9,
+               "shuffle": False, "chunk_frames": 1},
+    "gzip": {"compression": "gzip", "compression_opts": 1,
+             "shuffle": True, "chunk_frames": 8},
+    "lzf": {"compression": "lzf", "compression_opts": None,
+            "shuffle": True, "chunk_frames": 8},
+    "none": {"compression": None, "compression_opts": None,
+             "shuffle": False, "chunk_frames": 32},
+}
+
+
 def open_view_on_binary(file_like, dtype=np.uint8, mode="r", offset=0,
                         shape=None, order="C", strides=None):
     '''Open a view into a memory-mapped binary file.
@@ -34,18 +58,79 @@ def open_view_on_binary(file_like, dtype=np.uint8, mode="r", offset=0,
                                            strides=strides)
 
 
+def _readinto_exactly(f, buf):
+    if f.readinto(buf) != len(buf):
+        raise IOError("unexpected end of file in {}".format(f.name))
+
+
+def iter_strided_blocks(filename, dtype, offset, shape, strides,
+                        block_frames=64, use_memmap=False):
+    '''Read a strided multi-frame raw array a block of frames at a time.
+
+    Each frame must be contiguous on disk; frames are strides[0] bytes
+    apart. Without memory-mapping, frames that are separated by no more
+    than a frame's worth of other data are read with a single read per
+    block.
+
+    Parameters
+    ----------
+    filename : string
+        Raw file to read.
+    dtype : numpy.dtype
+        Data type of the array.
+    offset : integer
+        Offset (in bytes) of the first frame.
+    shape : {tuple, list}
+        Shape of the array; the first axis is frames.
+    strides : {tuple, list}
+        Strides of the array, in bytes.
+    block_frames : integer
+        Number of frames per block.
+    use_memmap : bool
+        Copy blocks out of a memory-mapped view instead of reading.
+
+    Yields
+    ------
+    (integer, numpy.ndarray)
+        Index of the first frame in the block, and the block.
+    '''
+    n_frames = shape[0]
+    if use_memmap:
+        view = open_view_on_binary(filename, dtype=dtype, offset=offset,
+                                   shape=shape, strides=strides)
+        for start in range(0, n_frames, block_frames):
+            yield start, np.array(view[start:start + block_frames])
+        return
+
+    dtype = np.dtype(dtype)
+    frame_shape = tuple(shape[1:])
+    frame_size = dtype.itemsize*int(np.prod(frame_shape))
+    stride = strides[0]
+    with open(filename, "rb") as f:
+        for start in range(0, n_frames, block_frames):
+            n = min(block_frames, n_frames - start)
+            block = np.empty((n,) + frame_shape, dtype=dtype)
+            f.seek(offset + start*stride)
+            if stride == frame_size:
+                _readinto_exactly(f, memoryview(block).cast("B"))
+            elif stride - frame_size <= frame_size:
+                span = bytearray(n*stride)
+                _readinto_exactly(f, memoryview(span)[:(n - 1)*stride + frame_size])
+                frames = np.frombuffer(span, dtype=np.uint8).reshape(n, stride)
+                block.view(np.uint8).reshape(n, frame_size)[:] = frames[:, :frame_size]
+            else:
+                for i in range(n):
+                    f.seek(offset + (start + i)*stride)
+                    _readinto_exactly(f, memoryview(block[i]).cast("B"))
+            yield start, block
+
+
 def read_strided(filename, dtype, offset, shape, strides):
     '''Load a frame without memory-mapping.'''
-    frame_size = np.dtype(dtype).itemsize
     arr = np.empty(shape, dtype=dtype)
-    frame_size = arr.dtype.itemsize*np.product(shape[1:])
-    step = strides[0] - frame_size
-    with open(filename, "rb") as f:
-        f.seek(offset)
-        for i in range(shape[0]):
-            frame = np.frombuffer(f.read(frame_size), dtype=dtype)
-            arr[i] = frame.reshape(shape[1:])
-            f.seek(step, 1)
+    for start, block in iter_strided_blocks(filename, dtype, offset, shape,
+                                            strides):
+        arr[start:start + len(block)] = block
     return arr
 
 
@@ -95,3 +180,140 @@ def export_frame_to_hdf5(raw_filename, data_hdf5_filename,
             f.create_dataset(json_meta["channel_description"], data=data,
                              chunks=chunks, compression=compression,
                              compression_opts=compression_opts)
+
+
+def _compress_chunk(chunk, compression_opts, shuffle):
+    '''Apply hdf5's shuffle and deflate filters to a chunk.'''
+    data = np.ascontiguousarray(chunk).view(np.uint8)
+    if shuffle and chunk.dtype.itemsize > 1:
+        data = data.reshape(-1, chunk.dtype.itemsize).T
+    return zlib.compress(np.ascontiguousarray(data).tobytes(),
+                         compression_opts)
+
+
+def _read_ahead(blocks, max_blocks=2):
+    '''Run a block iterator on a background thread, keeping at most
+    max_blocks blocks queued.'''
+    q = queue.Queue(maxsize=max_blocks)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in blocks:
+                if stop.is_set():
+                    return
+                q.put(item)
+        except Exception as e:
+            q.put(e)
+        q.put(done)
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # if the consumer stopped early, unblock the producer so it exits
+        stop.set()
+        while thread.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def write_blocks_to_dataset(dataset, blocks, compression_threads=4):
+    '''Write blocks of frames to a dataset chunked along whole frames.
+
+    Block lengths must be a multiple of the chunk length, except for the
+    last block. gzip datasets are compressed in a pool of threads and
+    written as raw chunks; others go through the normal hdf5 filters.
+    '''
+    chunk_frames = dataset.chunks[0]
+    direct = dataset.compression == "gzip" and compression_threads > 1
+    if not direct:
+        for start, block in blocks:
+            dataset[start:start + len(block)] = block
+        return
+
+    shuffle = dataset.shuffle
+    level = dataset.compression_opts
+    chunk_shape = dataset.chunks
+    with ThreadPoolExecutor(max_workers=compression_threads) as executor:
+        for start, block in blocks:
+            chunks = []
+            for i in range(0, len(block), chunk_frames):
+                chunk = block[i:i + chunk_frames]
+                if len(chunk) < chunk_frames:
+                    # hdf5 stores edge chunks at full size
+                    padded = np.zeros(chunk_shape, dtype=block.dtype)
+                    padded[:len(chunk)] = chunk
+                    chunk = padded
+                chunks.append((start + i, executor.submit(
+                    _compress_chunk, chunk, level, shuffle)))
+            for chunk_start, future in chunks:
+                dataset.id.write_direct_chunk(
+                    (chunk_start,) + (0,)*(dataset.ndim - 1), future.result())
+
+
+def export_frame_to_hdf5_pipelined(raw_filename, data_hdf5_filename,
+                                   auxiliary_hdf5_filename, frame_meta,
+                                   preset="gzip", block_frames=None,
+                                   compression_threads=4, use_memmap=False):
+    '''Export a frame from raw to hdf5, reading blocks of frames on a
+    background thread while compressing and writing on others.
+
+    Output layout is as for export_frame_to_hdf5.
+
+    Parameters
+    ----------
+    preset : string
+        Key into COMPRESSION_PRESETS selecting the codec and chunk shape.
+    block_frames : integer
+        Frames read per block. Defaults to 32 chunks' worth.
+    compression_threads : integer
+        Threads used to compress gzip chunks.
+    use_memmap : bool
+        Read blocks from a memory-mapped view of the raw file.
+    '''
+    settings = COMPRESSION_PRESETS[preset]
+    created = set()
+    for json_meta in frame_meta:
+        if json_meta["channel_description"] == "data":
+            filename = data_hdf5_filename
+        else:
+            filename = auxiliary_hdf5_filename
+        mode = "a" if filename in created else "w"
+        created.add(filename)
+
+        shape = tuple(json_meta["shape"])
+        chunk_frames = min(settings["chunk_frames"], shape[0])
+        chunk_frames = max(chunk_frames, 1)
+        frames_per_block = block_frames or 32*chunk_frames
+        frames_per_block -= frames_per_block % chunk_frames
+        frames_per_block = max(frames_per_block, chunk_frames)
+
+        blocks = iter_strided_blocks(raw_filename, json_meta["dtype"],
+                                     json_meta["byte_offset"], shape,
+                                     json_meta["strides"],
+                                     block_frames=frames_per_block,
+                                     use_memmap=use_memmap)
+        with h5py.File(filename, mode) as f:
+            dataset = f.create_dataset(
+                json_meta["channel_description"], shape=shape,
+                dtype=json_meta["dtype"],
+                chunks=(chunk_frames,) + shape[1:],
+                compression=settings["compression"],
+                compression_opts=settings["compression_opts"],
+                shuffle=settings["shuffle"])
+            write_blocks_to_dataset(dataset, _read_ahead(blocks),
+                                    compression_threads)
+        logging.info("exported %s to %s",
+                     json_meta["channel_description"], filename)
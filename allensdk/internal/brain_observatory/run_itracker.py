@@ -97,6 +97,8 @@ def run_itracker(movie_file, output_directory,
                  input_block_size=1,
                  metadata_file=None,
                  movie_shape=None,
+                 num_workers=1,
+                 segment_size=1000,
                  **kwargs):
 
     if output_directory is not None:
@@ -139,9 +141,17 @@ def run_itracker(movie_file, output_directory,
         bbox_pupil, bbox_cr = itracker.estimate_bbox_from_mean_frame()
 
 
-    itracker.process_movie(movie_output_stream=movie_output_stream,
-                           output_frames=output_frames,
-                           output_annotation_frames=output_annotation_frames)
+    if num_workers > 1:
+        # the annotated movie, if requested, costs a second serial decode
+        itracker.process_movie_parallel(num_workers=num_workers,
+                                        segment_size=segment_size,
+                                        movie_output_stream=movie_output_stream,
+                                        output_frames=output_frames,
+                                        output_annotation_frames=output_annotation_frames)
+    else:
+        itracker.process_movie(movie_output_stream=movie_output_stream,
+                               output_frames=output_frames,
+                               output_annotation_frames=output_annotation_frames)
 
     if output_QC:
         itracker.output_QC(image_type=image_type)
@@ -158,6 +168,9 @@ def main():
     parser.add_argument('--estimate_bbox', action='store_true')
     parser.add_argument('--num_frames', default=None, type=int)
     parser.add_argument('--threshold_factor', default=DEFAULT_THRESHOLD_FACTOR)
+    parser.add_argument('--num_workers', default=1, type=int)
+    parser.add_argument('--segment_size', default=1000, type=int)
+    parser.add_argument('--batch_ransac', action='store_true')
     parser.add_argument('--log_level', default=logging.DEBUG)
     args = parser.parse_args()
 
@@ -167,7 +180,10 @@ def main():
         threshold_factor=args.threshold_factor,
         output_directory=args.output_directory,
         num_frames=args.num_frames,
-        estimate_bbox=args.estimate_bbox
+        estimate_bbox=args.estimate_bbox,
+        num_workers=args.num_workers,
+        segment_size=args.segment_size,
+        batch_ransac=args.batch_ransac
         )
 
     if args.experiment_id:
@@ -122,6 +122,44 @@ def get_alignment_array(ref, other, int_method=np.floor):
                       right=np.nan))
 
 
+class SyncLineCache(object):
+    """Wraps a sync dataset so that the edges of each line are read at most
+    once. Implements the parts of the Dataset interface used for alignment,
+    and can be passed in its place to `monitor_delay` and the photodiode
+    functions. Returned arrays are shared between calls, so they are
+    read-only.
+    """
+    def __init__(self, sync_dset):
+        self.dataset = sync_dset
+        self._edges = {}
+
+    @property
+    def sample_freq(self):
+        return self.dataset.sample_freq
+
+    @property
+    def line_labels(self):
+        return self.dataset.line_labels
+
+    def _get(self, method, line, units):
+        key = (method, line, units)
+        if key not in self._edges:
+            edges = np.asarray(
+                getattr(self.dataset, method)(line, units=units)).view()
+            edges.setflags(write=False)
+            self._edges[key] = edges
+        return self._edges[key]
+
+    def get_events_by_line(self, line, units="samples"):
+        return self._get("get_events_by_line", line, units)
+
+    def get_rising_edges(self, line, units="samples"):
+        return self._get("get_rising_edges", line, units)
+
+    def get_falling_edges(self, line, units="samples"):
+        return self._get("get_falling_edges", line, units)
+
+
 def get_video_length(filename):
     if cv2 is not None:
         try:
@@ -184,6 +222,7 @@ class OphysTimeAligner(object):
                  long_stim_threshold=LONG_STIM_THRESHOLD):
         self.scanner = scanner if scanner is not None else "SCIVIVO"
         self._dataset = Dataset(sync_file)
+        self._lines = SyncLineCache(self._dataset)
         self._keys = get_keys(self._dataset)
         self.long_stim_threshold = long_stim_threshold
         if dff_file is not None:
@@ -215,13 +254,13 @@ class OphysTimeAligner(object):
         if self.scanner == "SCIVIVO":
             # Scientifica data looks different than Nikon.
             # http://confluence.corp.alleninstitute.org/display/IT/Ophys+Time+Sync
-            times = self.dataset.get_rising_edges(ophys_key, units="seconds")
+            times = self._lines.get_rising_edges(ophys_key, units="seconds")
         elif self.scanner == "NIKONA1RMP":
             # Nikon has a signal that indicates when it started writing to disk
             acquiring_key = self._keys["acquiring"]
-            acquisition_start = self._dataset.get_rising_edges(
+            acquisition_start = self._lines.get_rising_edges(
                 acquiring_key, units="seconds")[0]
-            ophys_times = self._dataset.get_falling_edges(
+            ophys_times = self._lines.get_falling_edges(
                 ophys_key, units="seconds")
             times = ophys_times[ophys_times >= acquisition_start]
         else:
@@ -254,7 +293,7 @@ class OphysTimeAligner(object):
     def stim_timestamps(self):
         stim_key = self._keys["stimulus"]
 
-        return self.dataset.get_falling_edges(stim_key, units="seconds")
+        return self._lines.get_falling_edges(stim_key, units="seconds")
 
     @property
     def corrected_stim_timestamps(self):
@@ -264,7 +303,7 @@ class OphysTimeAligner(object):
         if self.stim_data_length is not None and \
            self.stim_data_length < len(timestamps):
             stim_key = self._keys["stimulus"]
-            rising = self.dataset.get_rising_edges(stim_key, units="seconds")
+            rising = self._lines.get_rising_edges(stim_key, units="seconds")
 
             # Some versions of camstim caused a spike when the DAQ is first
             # initialized. Remove it.
@@ -282,7 +321,7 @@ class OphysTimeAligner(object):
             logging.info("No data length provided for stim stream")
 
         photodiode_key = self._keys["photodiode"]
-        delay = monitor_delay(self.dataset, timestamps, photodiode_key)
+        delay = monitor_delay(self._lines, timestamps, photodiode_key)
         
         return timestamps + delay, delta
 
@@ -290,7 +329,7 @@ class OphysTimeAligner(object):
     def behavior_video_timestamps(self):
         key = self._keys["behavior_camera"]
 
-        return self.dataset.get_falling_edges(key, units="seconds")
+        return self._lines.get_falling_edges(key, units="seconds")
 
     @property
     def corrected_behavior_video_timestamps(self):
@@ -302,10 +341,50 @@ class OphysTimeAligner(object):
     def eye_video_timestamps(self):
         key = self._keys["eye_camera"]
 
-        return self.dataset.get_falling_edges(key, units="seconds")
+        return self._lines.get_falling_edges(key, units="seconds")
 
     @property
     def corrected_eye_video_timestamps(self):
         return corrected_video_timestamps("Eye video",
                                           self.eye_video_timestamps,
                                           self.eye_data_length)
+
+    def get_alignment_arrays(self):
+        """Compute the timestamps of every stream and their alignment to the
+        ophys frames. Each sync line is read once.
+
+        Returns
+        -------
+        dict
+            Corrected timestamps and deltas for the ophys, stimulus, eye
+            video and behavior video streams, along with:
+            stim_alignment : index of the ophys frame for each stimulus frame
+            eye_alignment : index of the eye video frame for each ophys frame
+            behavior_alignment : index of the behavior video frame for each
+                ophys frame
+        """
+        ophys_times, ophys_delta = self.corrected_ophys_timestamps
+        stim_times, stim_delta = self.corrected_stim_timestamps
+        eye_times, eye_delta = self.corrected_eye_video_timestamps
+        beh_times, beh_delta = self.corrected_behavior_video_timestamps
+
+        return {
+            "ophys_times": ophys_times,
+            "ophys_delta": ophys_delta,
+            "stim_times": stim_times,
+            "stim_delta": stim_delta,
+            "eye_times": eye_times,
+            "eye_delta": eye_delta,
+            "behavior_times": beh_times,
+            "behavior_delta": beh_delta,
+            # stim array is index of ophys frame for each stim frame to
+            # match to so len(stim_times)
+            "stim_alignment": get_alignment_array(ophys_times, stim_times),
+            # camera arrays are index of camera frame for each ophys frame
+            # ... cam_nwb_creator depends on this so keeping it that way
+            # even though it makes little sense... len(video_times)
+            "eye_alignment": get_alignment_array(eye_times, ophys_times,
+                                                 int_method=np.ceil),
+            "behavior_alignment": get_alignment_array(beh_times, ophys_times,
+                                                      int_method=np.ceil)
+        }
@@ -18,6 +18,7 @@ import math
 import numpy as np
 from allensdk.internal.morphology.node import Node
 from allensdk.internal.morphology.compartment import Compartment
+from allensdk.core.swc import NodeSpatialIndex
 
 
 class Morphology( object ):
@@ -58,6 +59,11 @@ class Morphology( object ):
         # NOTE: if morphology is manually manipulated, this value can
         #   become incorrect
         self.dims = None
+
+        ##############################################
+        # spatial index of node locations. built on demand and discarded
+        #   whenever the morphology is restructured or transformed
+        self._spatial_index = None
         
         ##############################################
         # construct the node list
@@ -331,6 +337,25 @@ class Morphology( object ):
             self.dims = [(max_x-min_x), (max_y-min_y), (max_z-min_z)], [min_x, min_y, min_z], [max_x, max_y, max_z]
         return self.dims
 
+    @property
+    def spatial_index(self):
+        """ Returns a NodeSpatialIndex over node locations. The index is
+            built on first use and rebuilt after the morphology is
+            restructured or transformed.
+            WARNING: if locations or types of nodes are manipulated
+            directly then the index can become incorrect. It can be reset
+            by calling invalidate_spatial_index().
+        """
+        if self._spatial_index is None:
+            xyz = [(node.x, node.y, node.z) for node in self.node_list]
+            types = [node.t for node in self.node_list]
+            self._spatial_index = NodeSpatialIndex(xyz, types)
+        return self._spatial_index
+
+    def invalidate_spatial_index(self):
+        """ Discard the spatial index so it is rebuilt on next use """
+        self._spatial_index = None
+
     # returns a list of node located within dist of x,y,z
     def find(self, x, y, z, dist, node_type=None):
         """ Returns a list of Morphology Objects located within 'dist' 
@@ -353,15 +378,58 @@ class Morphology( object ):
         -------
         A list of all Morphology Objects matching the search criteria
         """
-        found = []
-        for seg in self.node_list:
-            dx = seg.x - x
-            dy = seg.y - y
-            dz = seg.z - z
-            if math.sqrt(dx*dx + dy*dy + dz*dz) <= dist:
-                if node_type is None or seg.t == node_type:
-                    found.append(seg)
-        return found
+        return self.find_all([(x, y, z)], dist, node_type)[0]
+
+
+    def find_all(self, points, dist, node_type=None):
+        """ Batched version of find(). Returns, for each point, a list 
+        of Morphology Objects located within 'dist' of it.
+        
+        Parameters
+        ----------
+        points: Nx3 array of floats
+            The x,y,z coordinates from which to search around
+        
+        dist: float
+            The search radius
+        
+        node_type: enum (optional)
+            One of the following constants: SOMA, AXON, 
+            BASAL_DENDRITE or APICAL_DENDRITE
+            
+        Returns
+        -------
+        A list of lists of Morphology Objects
+        """
+        found = self.spatial_index.query_radius(points, dist, node_type)
+        return [[self._node_list[i] for i in ids.tolist()] for ids in found]
+
+
+    def find_nearest(self, points, k=1, node_type=None):
+        """ Find the k nodes nearest to each of a set of points.
+        
+        Parameters
+        ----------
+        points: Nx3 array of floats
+            The x,y,z coordinates to search from
+        
+        k: int
+            Number of neighbors to return for each point
+        
+        node_type: enum (optional)
+            One of the following constants: SOMA, AXON, 
+            BASAL_DENDRITE or APICAL_DENDRITE
+            
+        Returns
+        -------
+        distances: Nxk array of floats
+            Distances to the neighbors, nearest first. Padded with inf
+            where fewer than k nodes are available.
+
+        ids: Nxk array of ints
+            IDs of the neighbors. Padded with -1.
+        """
+        return self.spatial_index.query_nearest(points, k, node_type)
 
 
     def node_list_by_type(self, node_type):
@@ -489,6 +557,7 @@ class Morphology( object ):
                 node.parent = remap[node.parent]
         # replace node list with newly created node list
         self._node_list = tmp_list
+        self._spatial_index = None
         # reconstruct parent/child relationship links
         ############################
         # node list is complete and sequential so don't need index
@@ -569,6 +638,7 @@ class Morphology( object ):
         for node in self.node_list:
             if node.t == from_type:
                 node.t = to_type
+        self._spatial_index = None
 
 
     def stumpify_axon(self, count=10):
@@ -764,6 +834,7 @@ class Morphology( object ):
             seg.x = x
             seg.y = y
             seg.z = z
+        self._spatial_index = None
 #        # relocate back to zero
 #        soma = self.soma_root()
 #        if soma is not None:
@@ -833,6 +904,7 @@ class Morphology( object ):
             seg.y = y
             seg.z = z
             seg.radius *= scale
+        self._spatial_index = None
 
 
     def _separate_trees(self):
@@ -1,5 +1,5 @@
-import functools
 import logging
+import multiprocessing as mp
 from six.moves import xrange
 
 import numpy as np
@@ -80,7 +80,14 @@ def simple_rotation(from_axis, to_axis, start, end, nsteps):
     return from_axes, to_axes, angles
 
 
-def run(volume, imin, imax, rotations, colormap):
+def run(volume, imin, imax, rotations, colormap, processes=None):
+    '''Generate rotation strips of max projections of a volume. Each strip's 
+    rotations are projected by ray casting, divided among processes worker 
+    processes (defaulting to one per cpu).
+    '''
+
+    if processes is None:
+        processes = mp.cpu_count()
 
     volume = vis.sitk_safe_ln(volume)
 
@@ -95,13 +102,15 @@ def run(volume, imin, imax, rotations, colormap):
         depth_sheet = ImageSheet()
 
         vp = VolumeProjector.fixed_factory(volume, rotation['window_size'])
-        callback = functools.partial(max_cb, max_sheet, depth_sheet, **rotation['projection_parameters'])
+        axis = rotation['projection_parameters']['axis']
 
         rot = rotation['rotation_parameters']
         from_axes, to_axes, angles = simple_rotation(**rot)
 
-        for response in vp.rotate_and_extract(from_axes, to_axes, angles, callback):
-            pass
+        for m, d in vp.project_max_series(from_axes, to_axes, angles, axis, 
+                                          processes=min(processes, rot['nsteps'])):
+            max_sheet.append(m.T)
+            depth_sheet.append(d.T)
 
         rotation['write_depth_sheet'](depth_sheet.get_output(-1))
 
@@ -1,8 +1,10 @@
 import logging
+import multiprocessing as mp
 
 import SimpleITK as sitk
 from six.moves import xrange
 import numpy as np
+from scipy.ndimage import map_coordinates
 
 from . import volume_utilities as vol
 
@@ -45,6 +47,69 @@ class VolumeProjector(object):
         return cb(volume)
 
     
+    @property
+    def view_array(self):
+        if not hasattr(self, '_view_array'):
+            self._view_array = sitk.GetArrayFromImage(self.view_volume)
+        return self._view_array
+
+
+    @property
+    def nonzero_bounds(self):
+        if not hasattr(self, '_nonzero_bounds'):
+            self._nonzero_bounds = get_nonzero_bounds(self.view_array)
+        return self._nonzero_bounds
+
+
+    def get_transform_parameters(self, from_axis, to_axis, angle):
+        transform = self.build_rotation_transform(from_axis, to_axis, angle)
+        return (np.reshape(transform.GetMatrix(), (3, 3)), 
+                np.array(transform.GetCenter()), 
+                np.array(transform.GetTranslation()))
+
+
+    def project_max(self, from_axis, to_axis, angle, axis):
+        '''Max and depth (argmax) projections along axis of the view volume 
+        rotated as in rotate. Rays are cast through the unrotated volume, so 
+        the rotated volume is never materialized.
+        '''
+        logging.info('projecting along axis {0} after rotating from axis {1} to axis {2} '
+                     'by {3:2.2f} radians'.format(axis, from_axis, to_axis, angle))
+
+        matrix, center, translation = self.get_transform_parameters(from_axis, to_axis, angle)
+        return ray_max_projection(self.view_array, matrix, center, translation, axis, 
+                                  self.nonzero_bounds)
+
+
+    def project_max_series(self, from_axes, to_axes, angles, axis, processes=1):
+        '''As project_max, for a series of rotations. Rotations are divided 
+        among a pool of processes, each holding one copy of the view volume.
+
+        Yields
+        ------
+        (max, depth) projections, in the order of the rotations
+        '''
+        parameters = [self.get_transform_parameters(fax, tax, angle) + (axis,) 
+                      for fax, tax, angle in zip(from_axes, to_axes, angles)]
+
+        if processes == 1:
+            _init_ray_worker(self.view_array, self.nonzero_bounds)
+            try:
+                for params in parameters:
+                    yield _ray_worker(params)
+            finally:
+                _init_ray_worker(None, None)
+            return
+
+        pool = mp.Pool(processes, initializer=_init_ray_worker, 
+                       initargs=(self.view_array, self.nonzero_bounds))
+        try:
+            for projections in pool.imap(_ray_worker, parameters):
+                yield projections
+        finally:
+            pool.terminate()
+
+
     def rotate_and_extract(self, from_axes, to_axes, angles, cb):
         
         for fax, tax, angle in zip(from_axes, to_axes, angles):
@@ -81,3 +146,104 @@ class VolumeProjector(object):
 
 
 
+
+
+_worker_array = None
+_worker_bounds = None
+
+
+def _init_ray_worker(array, bounds):
+    global _worker_array, _worker_bounds
+    _worker_array = array
+    _worker_bounds = bounds
+
+
+def _ray_worker(params):
+    matrix, center, translation, axis = params
+    return ray_max_projection(_worker_array, matrix, center, translation, axis, _worker_bounds)
+
+
+def get_nonzero_bounds(array):
+    '''Inclusive (low, high) index bounds, per numpy axis, of the nonzero 
+    voxels of array. None if there are none.
+    '''
+
+    bounds = []
+    for ax in xrange(array.ndim):
+        other = tuple(oa for oa in xrange(array.ndim) if oa != ax)
+        nonzero = np.flatnonzero(np.any(array != 0, axis=other))
+        if len(nonzero) == 0:
+            return None
+        bounds.append((nonzero[0], nonzero[-1]))
+    return bounds
+
+
+def ray_max_projection(array, matrix, center, translation, axis, bounds=None):
+    '''Max and depth projections of a rotated volume, computed one plane of 
+    ray samples at a time.
+
+    Equivalent to linearly resampling the volume through the affine transform 
+    (as sitk.Resample, with 0 outside the volume) and then taking 
+    projection_functions.max_projection along axis.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        Volume, in numpy (z, y, x) order.
+    matrix, center, translation : np.ndarray
+        Affine transform, in sitk (x, y, z) order, mapping output points to 
+        input points.
+    axis : int
+        Projection axis, in sitk order.
+    bounds : list, optional
+        Nonzero bounds of array, as from get_nonzero_bounds. Samples far 
+        enough outside these are known to be 0 and are skipped.
+
+    Returns
+    -------
+    max, depth : np.ndarray
+        As from projection_functions.max_projection
+    '''
+
+    size = np.array(array.shape[::-1])  # sitk order
+    plane_axes = [ax for ax in xrange(3) if ax != axis]
+
+    # sitk coordinates of the first plane of output points, laid out as the 
+    # projection will be (numpy order)
+    plane_shape = tuple(size[plane_axes][::-1])
+    points = np.zeros((3,) + plane_shape)
+    grids = np.indices(plane_shape)
+    points[plane_axes[1]] = grids[0]
+    points[plane_axes[0]] = grids[1]
+    points = points.reshape(3, -1)
+
+    start = matrix.dot(points - center[:, None]) + (center + translation)[:, None]
+    step = matrix[:, axis]
+
+    # continuous indices at which samples may be nonzero
+    low = np.full(3, -0.5)
+    high = size - 0.5
+    if bounds is not None:
+        nz = np.array(bounds[::-1], dtype=float)
+        low = np.maximum(low, nz[:, 0] - 1)
+        high = np.minimum(high, nz[:, 1] + 1)
+
+    max_image = np.full(start.shape[1], -np.inf)
+    depth_image = np.zeros(start.shape[1], dtype=int)
+    samples = np.zeros(start.shape[1], dtype=array.dtype)
+
+    for ii in xrange(size[axis]):
+        coords = start + ii * step[:, None]
+
+        samples[:] = 0
+        inside = np.all((coords >= low[:, None]) & (coords < high[:, None]), axis=0)
+        if np.any(inside):
+            samples[inside] = map_coordinates(array, coords[::-1, inside], order=1, 
+                                              mode='nearest')
+
+        better = samples > max_image
+        max_image[better] = samples[better]
+        depth_image[better] = ii
+
+    return (max_image.reshape(plane_shape).astype(array.dtype), 
+            depth_image.reshape(plane_shape))
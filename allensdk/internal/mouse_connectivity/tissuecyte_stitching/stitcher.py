@@ -1,6 +1,9 @@
 import logging
 import operator as op
-from collections import defaultdict
+import tempfile
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from six.moves import reduce
 
 import numpy as np
@@ -60,6 +63,108 @@ class Stitcher(object):
         logging.info('updated image region with tile data')
 
 
+class PipelinedStitcher(Stitcher):
+    '''Stitches tiles like Stitcher, but loads, flatfield-corrects and trims 
+    them in a pool of worker threads while the main thread blends. Tiles are 
+    still blended in order, so the result is identical.
+
+    Tiles may be given as Tile objects or as callables returning Tile objects. 
+    In the latter case the call (eg. reading the tile image) happens on a 
+    worker.
+
+    If output_path is given, the slice image is written to a memory-mapped 
+    .npy file at that path (and the stitched indicator to an anonymous 
+    temporary file), so the full slice never has to be resident in memory.
+
+    After run, self.timings holds the seconds spent in each stage. The 
+    load and correct stages are summed across workers; wait is the time 
+    the main thread spent waiting on workers.
+    '''
+
+
+    def __init__(self, image_dimensions, tiles, average_tiles, channels, 
+                 n_workers=4, output_path=None):
+
+        super(PipelinedStitcher, self).__init__(image_dimensions, tiles, average_tiles, channels)
+
+        self.n_workers = n_workers
+        self.output_path = output_path
+        self.timings = {}
+
+
+    def initialize_images(self):
+
+        if self.output_path is None:
+            return initialize_images(self.image_dimensions, len(self.channels))
+        return initialize_memmap_images(self.image_dimensions, len(self.channels), self.output_path)
+
+
+    def prepare_tile(self, tile):
+
+        timings = {}
+
+        start = time.time()
+        if callable(tile):
+            tile = tile()
+        timings['load'] = time.time() - start
+
+        start = time.time()
+        if tile.is_missing:
+            tile.initialize_image()
+        else:
+            tile.apply_average_tile_to_self(self.average_tiles[tile.channel])
+            tile.trim_self()
+        timings['correct'] = time.time() - start
+
+        return tile, timings
+
+
+    def run(self, cb=np.array):
+
+        start = time.time()
+        timings = defaultdict(float)
+
+        slice_image, stitched_indicator = self.initialize_images()
+        missing_tiles = {}
+
+        def stitch_next(pending):
+
+            wait_start = time.time()
+            tile, tile_timings = pending.popleft().result()
+            timings['wait'] += time.time() - wait_start
+            for stage, duration in tile_timings.items():
+                timings[stage] += duration
+
+            if tile.is_missing:
+                missing_tiles[tile.index] = tile.get_missing_path()
+
+            blend_start = time.time()
+            self.stitch(slice_image, stitched_indicator, tile, cb)
+            timings['blend'] += time.time() - blend_start
+
+        # keep a bounded number of tiles in flight so that memory use 
+        # doesn't grow with the number of tiles
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            pending = deque()
+
+            for tile in self.tiles:
+                pending.append(executor.submit(self.prepare_tile, tile))
+                if len(pending) >= 2 * self.n_workers:
+                    stitch_next(pending)
+
+            while pending:
+                stitch_next(pending)
+
+        if isinstance(slice_image, np.memmap):
+            slice_image.flush()
+
+        timings['total'] = time.time() - start
+        self.timings = dict(timings)
+        logging.info('stitching timings (s): {0}'.format(self.timings))
+
+        return slice_image, missing_tiles
+
+
 def initialize_image(dimensions, nchannels, dtype, order='C'):
     return np.zeros((dimensions['row'], dimensions['column'], nchannels), dtype=dtype, order=order)
 
@@ -68,6 +173,19 @@ def initialize_images(dimensions, nchannels):
     return initialize_image(dimensions, nchannels, np.uint16), initialize_image(dimensions, nchannels, np.int8)
 
 
+def initialize_memmap_images(dimensions, nchannels, path):
+    '''As initialize_images, but the image is a memory-mapped .npy file at 
+    path and the indicator is backed by an anonymous temporary file.
+    '''
+
+    shape = (dimensions['row'], dimensions['column'], nchannels)
+
+    image = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint16, shape=shape)
+    indicator = np.memmap(tempfile.TemporaryFile(), mode='w+', dtype=np.int8, shape=shape)
+
+    return image, indicator
+
+
 def make_blended_tile(blend, tile, current_region):
     return np.multiply((1 - blend), tile) + np.multiply(blend, current_region)
 
@@ -133,11 +251,28 @@ def get_overall_blend(indicator, meshes):
     return reduce(np.maximum, blends)
 
 
+def get_meshes(stup):
+    '''Index meshes for a tile of shape stup. Tiles on a slice share a 
+    shape, so the last few are cached. The returned arrays are shared and 
+    must not be modified.
+    '''
+
+    key = tuple(stup)
+    if key not in _mesh_cache:
+        if len(_mesh_cache) >= 4:
+            _mesh_cache.clear()
+        _mesh_cache[key] = np.meshgrid(*map(np.arange, key), indexing='ij')
+    return _mesh_cache[key]
+
+
+_mesh_cache = {}
+
+
 def get_blend(indicator_region, stup, cb=np.array):
     '''
     '''
 
-    meshes = np.meshgrid(*map(np.arange, stup), indexing='ij')
+    meshes = get_meshes(stup)
     blend = get_overall_blend(indicator_region, meshes)
 
     return cb(np.multiply(blend, indicator_region))
@@ -77,8 +77,12 @@ def convert_frame(conversion_definition):
     auxiliary_hdf5_filename = conversion_definition["auxiliary_output_file"]
     experiment_id = conversion_definition["experiment_id"]
     frame_metadata = conversion_definition["frame_metadata"]
-    osd.export_frame_to_hdf5(raw_filename, ophys_hdf5_filename,
-                             auxiliary_hdf5_filename, frame_metadata)
+    preset = conversion_definition.get("compression_preset", "gzip")
+    compression_threads = conversion_definition.get("compression_threads", 4)
+    osd.export_frame_to_hdf5_pipelined(raw_filename, ophys_hdf5_filename,
+                                       auxiliary_hdf5_filename,
+                                       frame_metadata, preset=preset,
+                                       compression_threads=compression_threads)
     return experiment_id, ophys_hdf5_filename, auxiliary_hdf5_filename
 
 
@@ -93,9 +97,16 @@ def parse_input(data):
 def main():
     mod = PipelineModule("Decompose ophys session into individual planes.")
     mod.parser.add_argument("-t", "--threads", type=int, default=4)
+    mod.parser.add_argument("-p", "--preset", default="gzip",
+                            choices=sorted(osd.COMPRESSION_PRESETS))
+    mod.parser.add_argument("-c", "--compression_threads", type=int,
+                            default=4)
 
     input_data = mod.input_data()
     conversion_definitions = parse_input(input_data)
+    for definition in conversion_definitions:
+        definition["compression_preset"] = mod.args.preset
+        definition["compression_threads"] = mod.args.compression_threads
 
     if mod.args.threads > 1:
         pool = Pool(processes=mod.args.threads)
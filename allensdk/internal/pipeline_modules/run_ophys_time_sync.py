@@ -35,27 +35,13 @@ def main():
 
     aligner = ts.OphysTimeAligner(sync_file, **input_data)
 
-    ophys_times, ophys_delta = aligner.corrected_ophys_timestamps
-    stim_times, stim_delta = aligner.corrected_stim_timestamps
-    eye_times, eye_delta = aligner.corrected_eye_video_timestamps
-    beh_times, beh_delta = aligner.corrected_behavior_video_timestamps
+    alignment = aligner.get_alignment_arrays()
 
-    # stim array is index of ophys frame for each stim frame to match to
-    # so len(stim_times)
-    stim_alignment = ts.get_alignment_array(ophys_times, stim_times)
-
-    # camera arrays are index of camera frame for each ophys frame ...
-    # cam_nwb_creator depends on this so keeping it that way even though
-    # it makes little sense... len(video_times)
-    eye_alignment = ts.get_alignment_array(eye_times, ophys_times,
-                                           int_method=np.ceil)
-
-    behavior_alignment = ts.get_alignment_array(beh_times, ophys_times,
-                                                int_method=np.ceil)
-
-    write_output(output_file, ophys_times, stim_alignment, eye_alignment,
-                 behavior_alignment, ophys_delta, stim_delta, eye_delta,
-                 beh_delta)
+    write_output(output_file, alignment["ophys_times"],
+                 alignment["stim_alignment"], alignment["eye_alignment"],
+                 alignment["behavior_alignment"], alignment["ophys_delta"],
+                 alignment["stim_delta"], alignment["eye_delta"],
+                 alignment["behavior_delta"])
 
 
 if __name__ == "__main__": main()
\ No newline at end of file
@@ -1,7 +1,10 @@
 import sys
 import argparse
+import functools
 import logging
 import os
+import shutil
+import tempfile
 
 from xml.etree.ElementTree import Element, SubElement, Comment, tostring
 from xml.dom import minidom
@@ -11,7 +14,7 @@ import numpy as np
 from six import iteritems
 
 from allensdk.internal.core.lims_pipeline_module import PipelineModule, run_module
-from allensdk.internal.mouse_connectivity.tissuecyte_stitching.stitcher import Stitcher
+from allensdk.internal.mouse_connectivity.tissuecyte_stitching.stitcher import PipelinedStitcher
 from allensdk.internal.mouse_connectivity.tissuecyte_stitching.tile import Tile
 import allensdk.core.json_utilities as ju
 
@@ -76,23 +79,35 @@ def get_average_tiles(average_tile_paths):
     return average_tiles
 
 
+def load_tile(tile_params):
+
+    tile = tile_params.copy()
+
+    try:
+        tile['image'] = read_image(tile['path'])
+        tile['is_missing'] = False
+    except (IOError, OSError, RuntimeError) as err:
+        tile['image'] = None
+        tile['is_missing'] = True
+    
+    tile['channel'] = tile['channel'] - 1
+
+    return Tile(**tile)
+
+
 def generate_tiles(tiles):
 
     for tile_params in tiles:
-        tile = tile_params.copy()
+        yield load_tile(tile_params)
 
-        try:
-            tile['image'] = read_image(tile['path'])
-            tile['is_missing'] = False
-        except (IOError, OSError, RuntimeError) as err:
-            tile['image'] = None
-            tile['is_missing'] = True
-        
-        tile['channel'] = tile['channel'] - 1
 
-        tile_obj = Tile(**tile)
-        del tile
-        yield tile_obj
+def generate_tile_loaders(tiles):
+    '''Deferred version of generate_tiles. Each tile is read when its loader 
+    is called, which lets PipelinedStitcher read tiles on worker threads.
+    '''
+
+    for tile_params in tiles:
+        yield functools.partial(load_tile, tile_params)
 
 
 def write_output(arr, spacing, path):
@@ -106,15 +121,23 @@ def main():
 
     slice_path = os.path.join(output_directory, data['slice_fname'])
     
-    tiles = generate_tiles(data['tiles'])
+    tiles = generate_tile_loaders(data['tiles'])
     average_tiles = get_average_tiles(data['average_tile_paths'])
 
-    stitcher = Stitcher(data['image_dimensions'], tiles, average_tiles, data['channels'])
-    image, missing = stitcher.run()
-    del tiles
-    missing_tile_paths = get_missing_tile_paths(missing)
-
-    write_output(np.ascontiguousarray(image), data['spacing'], slice_path)
+    # stitch into a memory-mapped scratch image rather than holding the 
+    # whole slice in memory
+    scratch_directory = tempfile.mkdtemp(dir=output_directory)
+    try:
+        stitcher = PipelinedStitcher(data['image_dimensions'], tiles, average_tiles, data['channels'], 
+                                     output_path=os.path.join(scratch_directory, 'slice.npy'))
+        image, missing = stitcher.run()
+        del tiles
+        missing_tile_paths = get_missing_tile_paths(missing)
+
+        write_output(np.ascontiguousarray(image), data['spacing'], slice_path)
+        del image
+    finally:
+        shutil.rmtree(scratch_directory)
 
     module_outputs = {'slice_fname': slice_path, 
                       'missing_tile_paths': missing_tile_paths}
@@ -333,7 +333,8 @@ class GlifNeuron( object ):
         """ Run neuron simulation over a given stimulus. This steps through the stimulus applying dynamics equations.
         After each step it checks if voltage is above threshold.  If so, self.spike_cut_length NaNs are inserted 
         into the output voltages, reset rules are applied to the voltage, threshold, and afterspike currents, and the 
-        simulation resumes.
+        simulation resumes.  glif_neuron_kernels.run_fast and run_batch give identical results
+        much faster for neurons that use the methods in METHOD_LIBRARY.
 
         Parameters
         ----------
@@ -0,0 +1,557 @@
+# Allen Institute Software License - This software license is the 2-clause BSD
+# license plus a third clause that prohibits redistribution for commercial
+# purposes without further permission.
+#
+# Copyright 2017. Allen Institute. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Redistributions for commercial purposes are not permitted without the
+# Allen Institute's written permission.
+# For purposes of this license, commercial purposes is the incorporation of the
+# Allen Institute's software into anything for which you will charge fees or
+# other compensation. Contact terms@alleninstitute.org for commercial licensing
+# opportunities.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Simulation kernels for GlifNeurons configured with the dynamics and reset methods in
+METHOD_LIBRARY.  The kernels produce the same output as GlifNeuron.run, but replace the
+per-time-step method dispatch with arithmetic on precomputed constants.  run_fast simulates
+one neuron; run_batch simulates many neurons and/or stimuli together, stepping all of them
+through time at once.
+
+The kernels evaluate each expression in the same order as the library methods, so results
+are identical to GlifNeuron.run rather than merely close.  They do not fill in
+neuron.threshold_components.
+"""
+import logging
+
+import numpy as np
+
+from .glif_neuron_methods import METHOD_LIBRARY
+
+
+class KernelParameters(object):
+    """ Constants needed to simulate one GlifNeuron, computed exactly as the library methods
+    compute them at every time step.
+
+    Parameters
+    ----------
+    neuron : GlifNeuron
+        a neuron whose dynamics and reset methods all come from METHOD_LIBRARY
+    """
+
+    def __init__(self, neuron):
+        methods = library_method_names(neuron)
+        if methods is None:
+            raise ValueError("neuron uses dynamics or reset methods that are not in METHOD_LIBRARY")
+
+        self.methods = methods
+        params = dict((method_type, getattr(neuron, method_type).method.keywords)
+                      for method_type in METHOD_LIBRARY)
+
+        self.dt = neuron.dt
+        self.El = neuron.El
+        self.spike_cut_length = neuron.spike_cut_length
+        self.init_voltage = neuron.init_voltage
+        self.init_threshold = neuron.init_threshold
+        self.init_AScurrents = np.array(neuron.init_AScurrents, dtype=float)
+
+        # voltage dynamics, and the conductance and capacitance used by the threshold
+        self.g = neuron.G * neuron.coeffs['G']
+        self.C = neuron.C * neuron.coeffs['C']
+
+        # afterspike current dynamics and reset
+        self.asc_decay = np.exp(-neuron.k*neuron.dt)
+        self.asc_amp = neuron.asc_amp_array * neuron.coeffs['asc_amp_array']
+        self.asc_cut_decay = np.exp(-(neuron.k * neuron.dt * neuron.spike_cut_length))
+        self.asc_r = np.array(params['AScurrent_reset_method'].get('r', 0), dtype=float)
+
+        # threshold dynamics
+        self.th_inf = neuron.th_inf * neuron.coeffs['th_inf']
+
+        threshold_params = params['threshold_dynamics_method']
+        if 'b_spike' in threshold_params:
+            self.th_spike_decay = np.exp(-threshold_params['b_spike'] * neuron.dt)
+
+        if methods['threshold_dynamics_method'] == 'three_components_exact':
+            a_voltage = threshold_params['a_voltage'] * neuron.coeffs['a']
+            b_voltage = threshold_params['b_voltage'] * neuron.coeffs['b']
+
+            self.gEl = self.g*neuron.El
+            self.phi = a_voltage/(b_voltage-self.g/self.C)
+            self.th_voltage_decay = np.exp(-self.g*neuron.dt/self.C)
+            self.th_voltage_inv_decay = 1/(np.exp(b_voltage*neuron.dt))
+            self.a_over_b = a_voltage/b_voltage
+
+        # voltage reset
+        self.v_reset_a = params['voltage_reset_method'].get('a')
+        self.v_reset_b = params['voltage_reset_method'].get('b')
+
+        # threshold reset
+        threshold_reset_params = params['threshold_reset_method']
+        if methods['threshold_reset_method'] == 'three_components':
+            self.a_spike_reset = threshold_reset_params['a_spike']
+            self.th_spike_cut_decay = np.exp(-threshold_reset_params['b_spike'] * (neuron.spike_cut_length * neuron.dt))
+
+
+def library_method_names(neuron):
+    """ Look up the METHOD_LIBRARY names of a neuron's dynamics and reset methods.
+
+    Returns
+    -------
+    dict
+        method name by method type, or None if any method is not the library function of that name.
+    """
+    names = {}
+    for method_type, library in METHOD_LIBRARY.items():
+        method = getattr(neuron, method_type)
+        if library.get(method.name) is not getattr(method.method, 'func', None):
+            return None
+        names[method_type] = method.name
+
+    return names
+
+
+def run_fast(neuron, stim):
+    """ Simulate a neuron over a stimulus.  Returns the same dictionary as GlifNeuron.run.
+    Neurons with methods outside of METHOD_LIBRARY are simulated with GlifNeuron.run.
+
+    Parameters
+    ----------
+    neuron : GlifNeuron
+    stim : np.ndarray
+        vector of scalar current values
+
+    Returns
+    -------
+    dict
+        see GlifNeuron.run
+    """
+    if library_method_names(neuron) is None:
+        logging.warning("neuron uses methods outside of METHOD_LIBRARY; simulating with GlifNeuron.run")
+        return neuron.run(stim)
+
+    p = KernelParameters(neuron)
+    methods = p.methods
+
+    asc_dynamics = methods['AScurrent_dynamics_method']
+    threshold_dynamics = methods['threshold_dynamics_method']
+    asc_reset = methods['AScurrent_reset_method']
+    voltage_reset = methods['voltage_reset_method']
+    threshold_reset = methods['threshold_reset_method']
+
+    dt, El, g, C = p.dt, p.El, p.g, p.C
+    th_inf = p.th_inf
+    n_cut = p.spike_cut_length
+    asc_decay = p.asc_decay.tolist()
+    asc_amp = p.asc_amp.tolist()
+    asc_cut_decay = p.asc_cut_decay.tolist()
+    asc_r = np.broadcast_to(p.asc_r, p.asc_decay.shape).tolist()
+
+    voltage_t0 = p.init_voltage
+    threshold_t0 = p.init_threshold
+    AScurrents_t0 = p.init_AScurrents.tolist()
+    num_AScurrents = len(AScurrents_t0)
+    no_AScurrents = [0.0] * num_AScurrents
+
+    # spike and voltage components of the threshold, relative to th_inf
+    th_spike = 0.0
+    th_voltage = 0.0
+    has_threshold_components = False
+
+    num_time_steps = len(stim)
+    stim = np.asarray(stim).tolist()
+
+    voltage_out = np.empty(num_time_steps)
+    voltage_out[:] = np.nan
+    threshold_out = np.empty(num_time_steps)
+    threshold_out[:] = np.nan
+    AScurrents_out = np.empty(shape=(num_time_steps, num_AScurrents))
+    AScurrents_out[:] = np.nan
+
+    spike_time_steps = []
+    grid_spike_times = []
+    interpolated_spike_times = []
+    interpolated_spike_voltage = []
+    interpolated_spike_threshold = []
+
+    time_step = 0
+    while time_step < num_time_steps:
+        inj = stim[time_step]
+        AScurrents_sum = 0.0
+        for current in AScurrents_t0:
+            AScurrents_sum += current
+
+        if asc_dynamics == 'exp':
+            AScurrents_t1 = [ current * decay for current, decay in zip(AScurrents_t0, asc_decay) ]
+        else:
+            AScurrents_t1 = no_AScurrents
+
+        voltage_t1 = voltage_t0 + (inj + AScurrents_sum - g * (voltage_t0 - El)) * dt / C
+
+        if threshold_dynamics == 'inf':
+            threshold_t1 = th_inf
+        else:
+            if threshold_dynamics == 'three_components_exact':
+                beta = (inj + AScurrents_sum + p.gEl) / g
+                phi_v = p.phi * (voltage_t0 - beta)
+                offset = p.a_over_b * (beta - El)
+                th_voltage = phi_v * p.th_voltage_decay + p.th_voltage_inv_decay * (th_voltage - phi_v - offset - 0) + offset + 0
+            else:
+                th_voltage = 0.0
+            th_spike = th_spike * p.th_spike_decay
+            has_threshold_components = True
+            threshold_t1 = th_voltage + th_spike + th_inf
+
+        if voltage_t1 > threshold_t1:
+            spike_time_steps.append(time_step)
+            grid_spike_times.append(time_step * dt)
+
+            interpolated_spike_time = time_step * dt + dt * (threshold_t0 - voltage_t0) / ((voltage_t1 - voltage_t0) - (threshold_t1 - threshold_t0))
+            interpolated_spike_times.append(interpolated_spike_time)
+
+            interpolated_spike_time_offset = interpolated_spike_time - (time_step - 1) * dt
+            interpolated_spike_voltage.append(voltage_t0 + (voltage_t1 - voltage_t0) * interpolated_spike_time_offset / dt)
+            interpolated_spike_threshold.append(threshold_t0 + (threshold_t1 - threshold_t0) * interpolated_spike_time_offset / dt)
+
+            # reset voltage, threshold, and afterspike currents
+            if asc_reset == 'sum':
+                AScurrents_t0 = [ amp + current * r * decay for amp, current, r, decay in
+                                  zip(asc_amp, AScurrents_t1, asc_r, asc_cut_decay) ]
+            else:
+                if np.sum(AScurrents_t1) != 0:
+                    raise Exception('You are running a LIF but the AScurrents are not zero!')
+                AScurrents_t0 = no_AScurrents
+
+            if voltage_reset == 'v_before':
+                voltage_t0 = p.v_reset_a * voltage_t1 + p.v_reset_b
+            else:
+                voltage_t0 = 0.0
+
+            if threshold_reset == 'three_components':
+                if not has_threshold_components:
+                    raise Exception('reset should never happen at the beginning of a trace')
+                if n_cut > 0:
+                    th_spike = th_spike * p.th_spike_cut_decay
+                th_spike = th_spike + p.a_spike_reset
+                threshold_t0 = th_spike + th_voltage + th_inf
+            else:
+                threshold_t0 = th_inf
+
+            bad_reset_flag = voltage_t0 > threshold_t0
+
+            if n_cut > 0:
+                n = n_cut
+                cut_past_end = (time_step + n) >= num_time_steps
+                if cut_past_end:
+                    n = num_time_steps - time_step
+
+                if not cut_past_end:
+                    voltage_out[time_step+n] = voltage_t0
+                    threshold_out[time_step+n] = threshold_t0
+                    AScurrents_out[time_step+n,:] = AScurrents_t0
+
+                time_step += n_cut+1
+            else:
+                voltage_out[time_step] = voltage_t0
+                threshold_out[time_step] = threshold_t0
+                AScurrents_out[time_step,:] = AScurrents_t0
+                time_step += 1
+
+            if bad_reset_flag:
+                voltage_out[time_step:time_step+5] = voltage_t0
+                threshold_out[time_step:time_step+5] = threshold_t0
+                AScurrents_out[time_step:time_step+5] = AScurrents_t0
+                break
+        else:
+            voltage_out[time_step] = voltage_t1
+            threshold_out[time_step] = threshold_t1
+            AScurrents_out[time_step,:] = AScurrents_t1
+
+            voltage_t0 = voltage_t1
+            threshold_t0 = threshold_t1
+            AScurrents_t0 = AScurrents_t1
+
+            time_step += 1
+
+    return {
+        'voltage': voltage_out,
+        'threshold': threshold_out,
+        'AScurrents': AScurrents_out,
+        'grid_spike_times': np.array(grid_spike_times),
+        'interpolated_spike_times': np.array(interpolated_spike_times),
+        'spike_time_steps': np.array(spike_time_steps),
+        'interpolated_spike_voltage': np.array(interpolated_spike_voltage),
+        'interpolated_spike_threshold': np.array(interpolated_spike_threshold)
+        }
+
+
+def run_batch(neurons, stims):
+    """ Simulate many neurons and/or stimuli together.  Simulations whose neurons share the same
+    dynamics and reset methods, number of afterspike currents and stimulus length are stepped
+    through time together, as arrays.  Neurons with methods outside of METHOD_LIBRARY are
+    simulated one at a time with GlifNeuron.run.
+
+    Parameters
+    ----------
+    neurons : GlifNeuron or list of GlifNeurons
+        a single neuron is simulated with every stimulus
+    stims : np.ndarray or list of np.ndarrays
+        a 2D array or list of stimulus vectors.  A single vector is given to every neuron.
+
+    Returns
+    -------
+    list
+        one dictionary per simulation, as returned by GlifNeuron.run
+    """
+    if not isinstance(neurons, (list, tuple)):
+        neurons = [ neurons ]
+
+    if isinstance(stims, np.ndarray) and stims.ndim == 1:
+        stims = [ stims ]
+
+    stims = [ np.asarray(stim) for stim in stims ]
+
+    if len(neurons) == 1:
+        neurons = neurons * len(stims)
+    elif len(stims) == 1:
+        stims = stims * len(neurons)
+    elif len(neurons) != len(stims):
+        raise ValueError("number of neurons (%d) and stimuli (%d) do not match" % (len(neurons), len(stims)))
+
+    results = [ None ] * len(neurons)
+    groups = {}
+
+    for i, neuron in enumerate(neurons):
+        methods = library_method_names(neuron)
+        if methods is None:
+            logging.warning("neuron %d uses methods outside of METHOD_LIBRARY; simulating with GlifNeuron.run", i)
+            results[i] = neuron.run(stims[i])
+            continue
+
+        key = (tuple(sorted(methods.items())), len(neuron.asc_tau_array), len(stims[i]))
+        groups.setdefault(key, []).append(i)
+
+    for indices in groups.values():
+        group_results = _run_batch_group([ KernelParameters(neurons[i]) for i in indices ],
+                                         np.array([ stims[i] for i in indices ], dtype=float))
+        for i, result in zip(indices, group_results):
+            results[i] = result
+
+    return results
+
+
+def _stack(params, name):
+    return np.array([ getattr(p, name) for p in params ], dtype=float)
+
+
+def _run_batch_group(params, stims):
+    """ Simulate neurons that share dynamics and reset methods.  Every step computes the
+    dynamics of all neurons and keeps the results for those that are not within a spike cut. """
+
+    methods = params[0].methods
+    asc_dynamics = methods['AScurrent_dynamics_method']
+    threshold_dynamics = methods['threshold_dynamics_method']
+    asc_reset = methods['AScurrent_reset_method']
+    voltage_reset = methods['voltage_reset_method']
+    threshold_reset = methods['threshold_reset_method']
+
+    num_neurons, num_time_steps = stims.shape
+    num_AScurrents = len(params[0].init_AScurrents)
+
+    dt = _stack(params, 'dt')
+    El = _stack(params, 'El')
+    g = _stack(params, 'g')
+    C = _stack(params, 'C')
+    th_inf = _stack(params, 'th_inf')
+    spike_cut_length = np.array([ p.spike_cut_length for p in params ], dtype=int)
+
+    asc_decay = _stack(params, 'asc_decay').reshape(num_neurons, num_AScurrents)
+    asc_amp = _stack(params, 'asc_amp').reshape(num_neurons, num_AScurrents)
+    asc_cut_decay = _stack(params, 'asc_cut_decay').reshape(num_neurons, num_AScurrents)
+    asc_r = np.array([ np.broadcast_to(p.asc_r, (num_AScurrents,)) for p in params ], dtype=float).reshape(num_neurons, num_AScurrents)
+
+    if threshold_dynamics != 'inf':
+        th_spike_decay = _stack(params, 'th_spike_decay')
+    if threshold_dynamics == 'three_components_exact':
+        gEl = _stack(params, 'gEl')
+        phi = _stack(params, 'phi')
+        th_voltage_decay = _stack(params, 'th_voltage_decay')
+        th_voltage_inv_decay = _stack(params, 'th_voltage_inv_decay')
+        a_over_b = _stack(params, 'a_over_b')
+    if voltage_reset == 'v_before':
+        v_reset_a = _stack(params, 'v_reset_a')
+        v_reset_b = _stack(params, 'v_reset_b')
+    if threshold_reset == 'three_components':
+        a_spike_reset = _stack(params, 'a_spike_reset')
+        th_spike_cut_decay = _stack(params, 'th_spike_cut_decay')
+
+    voltage_t0 = _stack(params, 'init_voltage')
+    threshold_t0 = _stack(params, 'init_threshold')
+    AScurrents_t0 = _stack(params, 'init_AScurrents').reshape(num_neurons, num_AScurrents)
+    th_spike = np.zeros(num_neurons)
+    th_voltage = np.zeros(num_neurons)
+
+    # time-major outputs, so that each step writes a contiguous row
+    voltage_out = np.empty((num_time_steps, num_neurons))
+    voltage_out[:] = np.nan
+    threshold_out = np.empty((num_time_steps, num_neurons))
+    threshold_out[:] = np.nan
+    AScurrents_out = np.empty((num_time_steps, num_neurons, num_AScurrents))
+    AScurrents_out[:] = np.nan
+
+    spikes = [ { 'spike_time_steps': [], 'grid_spike_times': [], 'interpolated_spike_times': [],
+                 'interpolated_spike_voltage': [], 'interpolated_spike_threshold': [] }
+               for _ in range(num_neurons) ]
+
+    # first time step at which each neuron integrates again after a spike
+    resume = np.zeros(num_neurons, dtype=int)
+    done = np.zeros(num_neurons, dtype=bool)
+
+    with np.errstate(all='ignore'):
+        for time_step in range(num_time_steps):
+            active = (resume <= time_step) & ~done
+            if not active.any():
+                if done.all():
+                    break
+                continue
+
+            inj = stims[:, time_step]
+            AScurrents_sum = np.zeros(num_neurons)
+            for j in range(num_AScurrents):
+                AScurrents_sum = AScurrents_sum + AScurrents_t0[:, j]
+
+            if asc_dynamics == 'exp':
+                AScurrents_t1 = AScurrents_t0 * asc_decay
+            else:
+                AScurrents_t1 = np.zeros_like(AScurrents_t0)
+
+            voltage_t1 = voltage_t0 + (inj + AScurrents_sum - g * (voltage_t0 - El)) * dt / C
+
+            if threshold_dynamics == 'inf':
+                threshold_t1 = th_inf
+            else:
+                if threshold_dynamics == 'three_components_exact':
+                    beta = (inj + AScurrents_sum + gEl) / g
+                    phi_v = phi * (voltage_t0 - beta)
+                    offset = a_over_b * (beta - El)
+                    th_voltage_t1 = phi_v * th_voltage_decay + th_voltage_inv_decay * (th_voltage - phi_v - offset - 0) + offset + 0
+                else:
+                    th_voltage_t1 = np.zeros(num_neurons)
+                th_spike_t1 = th_spike * th_spike_decay
+                threshold_t1 = th_voltage_t1 + th_spike_t1 + th_inf
+
+                th_voltage = np.where(active, th_voltage_t1, th_voltage)
+                th_spike = np.where(active, th_spike_t1, th_spike)
+
+            spiking = active & (voltage_t1 > threshold_t1)
+            quiet = active & ~spiking
+
+            voltage_out[time_step] = np.where(quiet, voltage_t1, voltage_out[time_step])
+            threshold_out[time_step] = np.where(quiet, threshold_t1, threshold_out[time_step])
+            AScurrents_out[time_step] = np.where(quiet[:, np.newaxis], AScurrents_t1, AScurrents_out[time_step])
+
+            voltage_t0_next = np.where(quiet, voltage_t1, voltage_t0)
+            threshold_t0_next = np.where(quiet, threshold_t1, threshold_t0)
+            AScurrents_t0 = np.where(quiet[:, np.newaxis], AScurrents_t1, AScurrents_t0)
+            resume[quiet] = time_step + 1
+
+            if spiking.any():
+                s = np.flatnonzero(spiking)
+                v0, v1 = voltage_t0[s], voltage_t1[s]
+                th0, th1 = threshold_t0[s], np.broadcast_to(threshold_t1, (num_neurons,))[s]
+                sdt = dt[s]
+
+                interpolated_spike_time = time_step * sdt + sdt * (th0 - v0) / ((v1 - v0) - (th1 - th0))
+                interpolated_spike_time_offset = interpolated_spike_time - (time_step - 1) * sdt
+                interpolated_spike_voltage = v0 + (v1 - v0) * interpolated_spike_time_offset / sdt
+                interpolated_spike_threshold = th0 + (th1 - th0) * interpolated_spike_time_offset / sdt
+
+                for k, i in enumerate(s):
+                    spikes[i]['spike_time_steps'].append(time_step)
+                    spikes[i]['grid_spike_times'].append(time_step * dt[i])
+                    spikes[i]['interpolated_spike_times'].append(interpolated_spike_time[k])
+                    spikes[i]['interpolated_spike_voltage'].append(interpolated_spike_voltage[k])
+                    spikes[i]['interpolated_spike_threshold'].append(interpolated_spike_threshold[k])
+
+                # reset voltage, threshold, and afterspike currents
+                if asc_reset == 'sum':
+                    AScurrents_r = asc_amp[s] + AScurrents_t1[s] * asc_r[s] * asc_cut_decay[s]
+                else:
+                    for k, i in enumerate(s):
+                        if np.sum(AScurrents_t1[i]) != 0:
+                            raise Exception('You are running a LIF but the AScurrents are not zero!')
+                    AScurrents_r = np.zeros((len(s), num_AScurrents))
+
+                if voltage_reset == 'v_before':
+                    voltage_r = v_reset_a[s] * v1 + v_reset_b[s]
+                else:
+                    voltage_r = np.zeros(len(s))
+
+                if threshold_reset == 'three_components':
+                    if threshold_dynamics == 'inf':
+                        raise Exception('reset should never happen at the beginning of a trace')
+                    th_spike_r = th_spike[s]
+                    cut = spike_cut_length[s] > 0
+                    th_spike_r[cut] = th_spike_r[cut] * th_spike_cut_decay[s][cut]
+                    th_spike_r = th_spike_r + a_spike_reset[s]
+                    th_spike[s] = th_spike_r
+                    threshold_r = th_spike_r + th_voltage[s] + th_inf[s]
+                else:
+                    threshold_r = th_inf[s]
+
+                # the reset values are recorded at the end of the spike cut, when it ends before the stimulus
+                row = time_step + spike_cut_length[s]
+                recorded = row < num_time_steps
+                voltage_out[row[recorded], s[recorded]] = voltage_r[recorded]
+                threshold_out[row[recorded], s[recorded]] = threshold_r[recorded]
+                AScurrents_out[row[recorded], s[recorded]] = AScurrents_r[recorded]
+
+                resume[s] = row + 1
+                voltage_t0_next[s] = voltage_r
+                threshold_t0_next[s] = threshold_r
+                AScurrents_t0[s] = AScurrents_r
+
+                bad_reset = voltage_r > threshold_r
+                for k in np.flatnonzero(bad_reset):
+                    i = s[k]
+                    voltage_out[resume[i]:resume[i]+5, i] = voltage_r[k]
+                    threshold_out[resume[i]:resume[i]+5, i] = threshold_r[k]
+                    AScurrents_out[resume[i]:resume[i]+5, i] = AScurrents_r[k]
+                    done[i] = True
+
+            voltage_t0 = voltage_t0_next
+            threshold_t0 = threshold_t0_next
+
+    results = []
+    for i in range(num_neurons):
+        result = {
+            'voltage': voltage_out[:, i].copy(),
+            'threshold': threshold_out[:, i].copy(),
+            'AScurrents': AScurrents_out[:, i, :].copy()
+            }
+        for key, values in spikes[i].items():
+            result[key] = np.array(values)
+        results.append(result)
+
+    return results
@@ -42,6 +42,7 @@ import allensdk.core.json_utilities as json_utilities
 from allensdk.core.nwb_data_set import NwbDataSet
 from allensdk.api.queries.glif_api import GlifApi
 from allensdk.model.glif.glif_neuron import GlifNeuron
+from allensdk.model.glif.glif_neuron_kernels import run_fast
 
 DEFAULT_SPIKE_CUT_VALUE = 0.05 # 50mV
 
@@ -67,7 +68,7 @@ def simulate_sweep(neuron, stimulus, spike_cut_value):
 
     logging.debug("simulating")
 
-    data = neuron.run(stimulus)
+    data = run_fast(neuron, stimulus)
 
     voltage = data['voltage']
     voltage[np.isnan(voltage)] = spike_cut_value
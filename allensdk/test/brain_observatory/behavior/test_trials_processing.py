@@ -478,3 +478,77 @@ def test_get_trial_timing():
 
     # use assert_frame_equal to take advantage of the nice way it deals with NaNs
     pd.testing.assert_frame_equal(pd.DataFrame(result,index=[0]), pd.DataFrame(expected_result,index=[0]), check_names=False)
+
+
+def trial_log_session():
+    trial_log = [
+        {'index': 0, 'trial_params': {'catch': False, 'auto_reward': False},
+         'rewards': [(0.007, 2.5, 150)],
+         'stimulus_changes': [(('a', 'a'), ('b', 'b'), 2.0, 120)],
+         'events': [['trial_start', '', 0.5, 30],
+                    ['stimulus_changed', '', 2.0, 120],
+                    ['hit', '', 2.5, 150],
+                    ['trial_end', '', 4.0, 240]]},
+        {'index': 1, 'trial_params': {'catch': True, 'auto_reward': False},
+         'rewards': [],
+         'stimulus_changes': [],
+         'events': [['trial_start', '', 4.1, 246],
+                    ['sham_change', '', 5.0, 300],
+                    ['false_alarm', '', 5.3, 318],
+                    ['trial_end', '', 6.0, 360]]},
+        {'index': 2, 'trial_params': {'catch': False, 'auto_reward': False},
+         'rewards': [],
+         'stimulus_changes': [],
+         'events': [['trial_start', '', 6.1, 366],
+                    ['abort', '', 6.5, 390],
+                    ['trial_end', '', 7.0, 420]]},
+        {'index': 3, 'trial_params': {'catch': False, 'auto_reward': True},
+         'rewards': [(0.005, 8.0, 480)],
+         'stimulus_changes': [(('b', 'b'), ('c', 'c'), 7.9, 474)],
+         'events': [['trial_start', '', 7.1, 426],
+                    ['stimulus_changed', '', 7.9, 474],
+                    ['trial_end', '', 9.0, 540]]},
+    ]
+    stimuli = {
+        'images': {'set_log': [('Image', 'a', 0.0, 0),
+                               ('Image', 'c', 7.9, 474)]},
+        'more_images': {'set_log': [('Image', 'b', 2.0, 120)]},
+    }
+    data = {'items': {'behavior': {'trial_log': trial_log,
+                                   'stimuli': stimuli}}}
+
+    licks = pd.DataFrame({'time': [5.4, 2.6, 2.7, 8.2, 0.1]})
+    rewards = pd.DataFrame({'volume': [0.007, 0.005]},
+                           index=pd.Index([2.5, 8.0], name='timestamps'))
+    stimulus_presentations = pd.DataFrame({
+        'start_frame': [0, 45, 90, np.nan, 135, 180, 300, 315, 480],
+        'start_time': [0.0, 0.75, 1.5, np.nan, 2.25, 3.0, 5.0, 5.25, 8.0]
+    })
+
+    return data, licks, rewards, stimulus_presentations
+
+
+def test_get_trials_vectorized():
+    data, licks, rewards, stimulus_presentations = trial_log_session()
+    rebase = lambda t: t + 0.0
+
+    obtained = trials_processing.get_trials(
+        data, licks, rewards, stimulus_presentations, rebase)
+    expected = trials_processing.get_trials(
+        data, licks, rewards, stimulus_presentations, rebase,
+        vectorized=False)
+
+    pd.testing.assert_frame_equal(obtained.drop(columns='lick_times'),
+                                  expected.drop(columns='lick_times'))
+    for obt, exp in zip(obtained['lick_times'], expected['lick_times']):
+        assert np.array_equal(obt, exp)
+
+    assert np.array_equal(obtained.loc[0, 'lick_times'], [2.6, 2.7])
+    assert obtained['reward_time'].tolist()[0] == 2.5
+    assert np.isnan(obtained.loc[2, 'reward_time'])
+    assert obtained['change_time'].tolist()[:2] == [2.25, 5.0]
+    assert obtained.loc[3, 'change_time'] == 8.0
+    assert obtained['initial_image_name'].tolist() == ['a', 'b', 'b', 'b']
+    assert obtained['change_image_name'].tolist() == ['b', 'b', 'b', 'c']
+    assert obtained.loc[2, 'response_latency'] is None or \
+        np.isnan(obtained.loc[2, 'response_latency'])
@@ -274,3 +274,38 @@ def test_get_motion_correction(nwbfile, roundtrip, roundtripper, motion_correcti
         obt = BehaviorOphysNwbApi.from_nwbfile(nwbfile)
 
     pd.testing.assert_frame_equal(motion_correction, obt.get_motion_correction(), check_dtype=False)
+
+
+@pytest.mark.parametrize('roundtrip', [True, False])
+@pytest.mark.parametrize("filter_invalid_rois", [True, False])
+def test_get_dff_array(nwbfile, roundtrip, filter_invalid_rois, valid_roi_ids, roundtripper, dff_traces, corrected_fluorescence_traces, cell_specimen_table, metadata, ophys_timestamps):
+
+    nwb.add_metadata(nwbfile, metadata)
+    nwb.add_cell_specimen_table(nwbfile, cell_specimen_table)
+    nwb.add_dff_traces(nwbfile, dff_traces, ophys_timestamps)
+    nwb.add_corrected_fluorescence_traces(nwbfile, corrected_fluorescence_traces)
+
+    if roundtrip:
+        obt = roundtripper(nwbfile, BehaviorOphysNwbApi, filter_invalid_rois=filter_invalid_rois)
+    else:
+        obt = BehaviorOphysNwbApi.from_nwbfile(nwbfile, filter_invalid_rois=filter_invalid_rois)
+
+    if filter_invalid_rois:
+        dff_traces = dff_traces[dff_traces["cell_roi_id"].isin(valid_roi_ids)]
+        corrected_fluorescence_traces = corrected_fluorescence_traces[corrected_fluorescence_traces["cell_roi_id"].isin(valid_roi_ids)]
+
+    dff_array = obt.get_dff_array()
+    assert list(dff_array.dims) == ['cell_roi_id', 'time']
+    np.testing.assert_array_equal(dff_array['cell_roi_id'].values, dff_traces['cell_roi_id'].values)
+    np.testing.assert_array_almost_equal(dff_array.values, np.vstack(dff_traces['dff'].values))
+    np.testing.assert_array_almost_equal(dff_array['time'].values, ophys_timestamps)
+
+    cf_array = obt.get_corrected_fluorescence_array()
+    np.testing.assert_array_almost_equal(cf_array.values, np.vstack(corrected_fluorescence_traces['corrected_fluorescence'].values))
+
+    # time window and reversed roi order
+    roi_ids = dff_traces['cell_roi_id'].values[::-1]
+    windowed = obt.get_dff_array(cell_roi_ids=roi_ids, start_time=ophys_timestamps[1], stop_time=ophys_timestamps[-1])
+    np.testing.assert_array_equal(windowed['cell_roi_id'].values, roi_ids)
+    np.testing.assert_array_almost_equal(windowed['time'].values, ophys_timestamps[1:-1])
+    np.testing.assert_array_almost_equal(windowed.values, np.vstack(dff_traces.set_index('cell_roi_id').loc[roi_ids, 'dff'].values)[:, 1:-1])
@@ -0,0 +1,56 @@
+import pytest
+
+import numpy as np
+
+from allensdk.brain_observatory.gaze_mapping import _filter_utils as fu
+
+
+def loop_medfilt(x, kernel_size=3):
+    # reference implementation: one np.median call per sample
+    T = x.shape[0]
+    delta = kernel_size // 2
+
+    x_med = np.zeros(x.shape)
+    window = x[0:delta + 1]
+    x_med[0] = np.nan if np.any(np.isnan(window)) else np.median(window)
+
+    for t in range(1, T):
+        window = x[t - delta:t + delta + 1]
+        if window.size == 0 or np.any(np.isnan(window)):
+            x_med[t] = np.nan
+        else:
+            x_med[t] = np.median(window)
+
+    return x_med
+
+
+@pytest.mark.parametrize("kernel_size", [1, 3, 5, 7])
+@pytest.mark.parametrize("x", [
+    np.array([1.0, 5.0, 2.0, np.nan, 4.0, 3.0, 8.0, 7.0, 6.0, 0.0, 9.0]),
+    np.array([np.nan, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, np.nan]),
+    np.array([3.0, 1.0]),
+    np.random.RandomState(0).rand(100),
+])
+def test_medfilt_custom(x, kernel_size):
+    obtained = fu.medfilt_custom(x, kernel_size=kernel_size)
+    expected = loop_medfilt(x, kernel_size=kernel_size)
+    np.testing.assert_array_equal(obtained, expected)
+
+
+def test_medfilt_custom_columns():
+    x = np.random.RandomState(1).rand(50, 3)
+    x[[4, 20, 21], [0, 1, 2]] = np.nan
+
+    obtained = fu.medfilt_custom(x, kernel_size=3)
+    for col in range(x.shape[1]):
+        np.testing.assert_array_equal(obtained[:, col], loop_medfilt(x[:, col]))
+
+
+def test_post_process_areas_columns():
+    areas = np.random.RandomState(2).rand(200, 2)
+    areas[10, 1] = np.nan
+
+    obtained = fu.post_process_areas(areas.copy())
+    for col in range(areas.shape[1]):
+        expected = fu.post_process_areas(areas[:, col].copy())
+        np.testing.assert_array_equal(obtained[:, col], expected)
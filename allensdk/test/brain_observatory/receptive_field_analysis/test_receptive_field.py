@@ -0,0 +1,109 @@
+# Allen Institute Software License - This software license is the 2-clause BSD
+# license plus a third clause that prohibits redistribution for commercial
+# purposes without further permission.
+#
+# Copyright 2017. Allen Institute. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Redistributions for commercial purposes are not permitted without the
+# Allen Institute's written permission.
+# For purposes of this license, commercial purposes is the incorporation of the
+# Allen Institute's software into anything for which you will charge fees or
+# other compensation. Contact terms@alleninstitute.org for commercial licensing
+# opportunities.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import pytest
+import numpy as np
+
+from allensdk.brain_observatory.receptive_field_analysis import receptive_field as rf
+from allensdk.brain_observatory.receptive_field_analysis import utilities as ut
+
+
+def loop_shuffle_matrix(event_vector, A, number_of_shuffles, response_detection_error_std_dev=.1):
+    number_of_events = event_vector.sum()
+    shuffle_data = np.zeros((A.shape[0], number_of_shuffles))
+    evr = range(len(event_vector))
+    for ii in range(number_of_shuffles):
+        size = number_of_events + int(np.round(response_detection_error_std_dev*number_of_events*np.random.randn()))
+        shuffled_event_inds = np.random.choice(evr, size=size, replace=False)
+
+        b_tmp = np.zeros(len(event_vector), dtype=bool)
+        b_tmp[shuffled_event_inds] = True
+        shuffle_data[:, ii] = A[:,b_tmp].sum(axis=1)/float(size)
+
+    return shuffle_data
+
+
+@pytest.fixture
+def stimulus_matrix():
+    np.random.seed(4)
+    return (np.random.rand(32, 400) < .1) * np.random.rand(32, 400)
+
+
+@pytest.fixture
+def event_vector():
+    np.random.seed(5)
+    event_vector = np.zeros(400, dtype=bool)
+    event_vector[np.random.choice(400, 20, replace=False)] = True
+    return event_vector
+
+
+def test_get_shuffle_matrix(stimulus_matrix, event_vector):
+    np.random.seed(6)
+    expected = loop_shuffle_matrix(event_vector, stimulus_matrix, 50)
+
+    np.random.seed(6)
+    obtained = ut.get_shuffle_matrix(None, event_vector, stimulus_matrix, number_of_shuffles=50)
+
+    assert np.allclose(obtained, expected)
+
+
+def test_events_to_pvalues_no_fdr_correction(stimulus_matrix, event_vector):
+    np.random.seed(1)
+    shuffle_data = loop_shuffle_matrix(event_vector, stimulus_matrix, 200)
+    rts = stimulus_matrix.dot(event_vector) / event_vector.sum()
+    expected = [ 1 - (shuffle_data[pi, :] < rts[pi]).sum() / 200. for pi in range(32) ]
+
+    obtained = rf.events_to_pvalues_no_fdr_correction(None, event_vector, stimulus_matrix,
+                                                      number_of_shuffles=200, seed=1)
+
+    assert np.allclose(obtained, expected)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_compute_receptive_fields_with_postprocessing(monkeypatch, processes):
+
+    def fake_receptive_field(data, cell_index, stimulus, **kwargs):
+        return { 'attrs': { 'cell_index': cell_index, 'stimulus': stimulus, 'alpha': kwargs['alpha'] } }
+
+    monkeypatch.setattr(rf, 'compute_receptive_field_with_postprocessing', fake_receptive_field)
+
+    data = 'data_set'
+    obtained = rf.compute_receptive_fields_with_postprocessing(data, 'lsn', cell_indices=[0, 2, 3],
+                                                               processes=processes, alpha=.05)
+
+    assert sorted(obtained.keys()) == ['0', '2', '3']
+    for key, value in obtained.items():
+        assert value['attrs'] == { 'cell_index': int(key), 'stimulus': 'lsn', 'alpha': .05 }
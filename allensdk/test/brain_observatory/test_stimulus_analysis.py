@@ -33,8 +33,11 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 #
-from allensdk.brain_observatory.stimulus_analysis import StimulusAnalysis
+from allensdk.brain_observatory.stimulus_analysis import StimulusAnalysis, two_group_anova_pvalues
 import pytest
+import numpy as np
+import pandas as pd
+import scipy.stats as st
 from mock import patch, MagicMock
 
 
@@ -138,3 +141,58 @@ def test_harness(dataset,
         assert sa._binned_dx_vis is not StimulusAnalysis._PRELOAD
         assert sa._binned_cells_vis is not StimulusAnalysis._PRELOAD
         assert sa._peak_run is not StimulusAnalysis._PRELOAD
+
+
+@pytest.mark.parametrize('shape', [(4,), (3, 5)])
+def test_two_group_anova_pvalues(shape):
+    np.random.seed(1)
+    group1 = np.random.rand(*(shape + (7,)))
+    group2 = np.random.rand(*(shape + (10,))) + 0.2
+
+    pvalues = two_group_anova_pvalues(group1, group2)
+
+    expected = np.array([ st.f_oneway(a, b)[1] for a, b in
+                          zip(group1.reshape(-1, 7), group2.reshape(-1, 10)) ])
+    assert np.allclose(pvalues.ravel(), expected)
+
+
+class SweepAnalysis(StimulusAnalysis):
+    interlength = 3
+    sweeplength = 4
+    extralength = 1
+
+
+@pytest.fixture
+def sweep_analysis(dataset):
+    np.random.seed(2)
+    sa = SweepAnalysis(dataset)
+    sa._celltraces = np.random.rand(3, 50) + 1
+    sa._numbercells = 3
+    sa._dxcm = np.random.rand(50)
+    # the last sweep runs past the end of the traces
+    sa._stim_table = pd.DataFrame({ 'start': [5, 20, 31, 47] })
+
+    return sa
+
+
+def test_get_sweep_response(sweep_analysis):
+    sa = sweep_analysis
+    sweep_response, mean_sweep_response, pval = sa.get_sweep_response()
+
+    assert list(sweep_response.columns) == ['0', '1', '2', 'dx']
+    assert sa.sweep_response_tensor.shape == (4, 4, 10)
+
+    for index, row in sa.stim_table.iterrows():
+        start = int(row['start'] - sa.interlength)
+        end = int(row['start'] + sa.sweeplength + sa.interlength)
+        traces = [ sa.celltraces[nc, start:end] for nc in range(sa.numbercells) ] + [ sa.dxcm[start:end] ]
+
+        for column, trace in zip(sweep_response.columns, traces):
+            if column != 'dx':
+                trace = 100 * ((trace / np.mean(trace[:sa.interlength])) - 1)
+
+            response = trace[sa.interlength:sa.interlength + sa.sweeplength + sa.extralength]
+
+            assert np.allclose(sweep_response[column][index], trace)
+            assert np.isclose(mean_sweep_response[column][index], np.mean(response))
+            assert np.isclose(pval[column][index], st.f_oneway(trace[:sa.interlength], response)[1])
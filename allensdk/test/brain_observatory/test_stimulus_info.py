@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+import pandas as pd
 import os
 from allensdk.core.brain_observatory_nwb_data_set import BrainObservatoryNwbDataSet, si
 import numpy as np
@@ -38,6 +39,80 @@ def test_BinaryIntervalSearchTree_shared_endpoint():
     assert bist.search(1)[2] == 'A'
     assert bist.search(1.5)[2] == 'B'
 
+def test_IntervalIndex():
+
+    index = si.IntervalIndex([0, 1, 3, 2], [.9, 1.9, 3.9, 2.9])
+    np.testing.assert_array_equal(index.search([1.5, 0, 2.5, 3.5, .95, 5, -1]), [1, 0, 3, 2, -1, -1, -1])
+
+def test_IntervalIndex_shared_endpoint():
+
+    index = si.IntervalIndex([0, 1], [1, 2])
+    np.testing.assert_array_equal(index.search([0, 1, 1.5]), [0, 0, 1])
+
+def test_IntervalIndex_zero_length_tie():
+
+    # frame 13 is in both the zero-length interval and the one starting there; the tree picks (13, 17)
+    df = pd.DataFrame([(13, 13), (13, 17), (17, 20), (20, 25)], columns=['start', 'end'])
+    df['frame'] = np.arange(len(df))
+
+    bist = si.BinaryIntervalSearchTree.from_df(df)
+    index = si.IntervalIndex.from_df(df)
+
+    assert bist.search(13)[2]['frame'] == 1
+    assert index.search([13])[0] == 1
+
+def test_IntervalIndex_matches_BinaryIntervalSearchTree():
+
+    rng = np.random.RandomState(0)
+
+    for _ in range(200):
+        lengths = rng.choice([0, 0, 1, 2, 4], size=rng.randint(1, 12))
+        starts = np.cumsum(rng.randint(0, 3, size=len(lengths)) + np.concatenate(([0], lengths[:-1])))
+        df = pd.DataFrame({'start': starts, 'end': starts + lengths, 'frame': np.arange(len(starts))})
+
+        try:
+            bist = si.BinaryIntervalSearchTree.from_df(df)
+        except AssertionError:
+            continue
+        index = si.IntervalIndex.from_df(df)
+
+        frames = np.arange(df['end'].max() + 1)
+        rows = index.search(frames)
+
+        for frame, row in zip(frames, rows):
+            if row >= 0:
+                assert bist.search(frame)[2]['frame'] == row
+
+class MockStimulusDataSet(object):
+    def __init__(self, epochs, intervals):
+        self.epoch_df = pd.DataFrame(epochs, columns=['start', 'end'])
+        self.master_df = pd.DataFrame(intervals, columns=['start', 'end'])
+        self.master_df['frame'] = np.arange(len(self.master_df))
+
+    def get_stimulus_epoch_table(self):
+        return self.epoch_df
+
+    def get_stimulus_table(self, stimulus_name):
+        return self.master_df
+
+@pytest.mark.parametrize('frame,row', [
+    (2, -1), (5, 1), (7, 1), (8, 1), (9, 1), (10, 2), (12, 2), (13, 0),
+    (14, 0), (20, -1), (21, -1), (23, 3), (25, -1), (30, 4), (31, -1)])
+def test_StimulusSearch_frames(frame, row):
+
+    # frames 15-19 are outside of any epoch, so frames 20-22 cannot fall back to frame 14
+    data_set = MockStimulusDataSet([(5, 15), (20, 25), (30, 31)],
+                                   [(13, 14), (5, 8), (10, 12), (23, 25), (30, 30)])
+    s = si.StimulusSearch(data_set)
+
+    assert s.search_frames(np.array([frame]))[0] == row
+
+    result = s.search(frame)
+    if row == -1:
+        assert result is None
+    else:
+        assert result[2]['frame'] == row
+
 def test_pixels_to_visual_degrees():
     m = si.BrainObservatoryMonitor()
     np.testing.assert_almost_equal(m.pixels_to_visual_degrees(1), 0.103270443661,10)
@@ -316,6 +391,57 @@ def test_mask():
     assert(m._mask is not None)
 
 
+def small_geometry(cache_dir=None):
+    return si.ExperimentGeometry(distance=15.0, mon_height_cm=9.0, mon_width_cm=16.0,
+                                 mon_res=(32, 18), eyepoint=(0.5, 0.5), cache_dir=cache_dir)
+
+
+def test_warp_coordinates_grid_order():
+    import itertools
+
+    geometry = small_geometry()
+    x = np.arange(32) - 16
+    y = np.arange(18) - 9
+    expected = si.warp_stimulus_coords(np.array(list(itertools.product(y, x))),
+                                       distance=15.0, mon_height_cm=9.0, mon_width_cm=16.0,
+                                       mon_res=(32, 18), eyepoint=(0.5, 0.5))
+    expected[:, 0] += 9
+    expected[:, 1] += 16
+
+    np.testing.assert_array_almost_equal(geometry.warp_coordinates, expected)
+
+
+def test_warp_coordinates_cache(tmpdir):
+    cache_dir = str(tmpdir.join('warp'))
+    geometry = small_geometry(cache_dir)
+    coordinates = geometry.warp_coordinates
+
+    cached = os.listdir(cache_dir)
+    assert len(cached) == 1
+    assert geometry.cache_key in cached[0]
+
+    other = small_geometry(cache_dir)
+    np.testing.assert_array_equal(other.warp_coordinates, coordinates)
+    assert small_geometry().cache_key == geometry.cache_key
+    assert si.ExperimentGeometry(15.0, 9.0, 16.0, (32, 18), (0.5, 0.4)).cache_key != geometry.cache_key
+
+
+def test_warp_movie():
+    import scipy.ndimage as spndi
+
+    geometry = small_geometry()
+    m = si.BrainObservatoryMonitor(experiment_geometry=geometry)
+    m.n_pixels_r, m.n_pixels_c = 18, 32
+
+    frames = np.random.RandomState(0).rand(5, 18, 32)
+    warped = m.warp_movie(frames, chunk_size=2)
+
+    for frame, warped_frame in zip(frames, warped):
+        expected = spndi.map_coordinates(frame, geometry.warp_coordinates.T, order=1,
+                                         mode='constant').reshape(18, 32)
+        np.testing.assert_array_almost_equal(warped_frame, expected)
+
+
 def test_translate_image_and_fill():
     '''
     [[1 2 3]
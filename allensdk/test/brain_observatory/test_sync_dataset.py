@@ -0,0 +1,79 @@
+import os
+
+import pytest
+import numpy as np
+import h5py
+
+from allensdk.brain_observatory import sync_dataset as sd
+
+
+def legacy_process_times(times):
+    times = np.array(times).astype(np.int64)
+    intervals = np.ediff1d(times, to_begin=0)
+    for i in np.where(intervals < 0)[0]:
+        times[i:] += 4294967296
+    return times
+
+
+@pytest.fixture
+def sync_h5(tmpdir_factory):
+    path = str(tmpdir_factory.mktemp("sync").join("sync.h5"))
+
+    rng = np.random.RandomState(0)
+    n_events = 500
+    times = np.cumsum(rng.randint(1, 100, size=n_events)).astype(np.uint32)
+    bits = rng.randint(0, 16, size=n_events).astype(np.uint32)
+    data = np.stack([times, bits], axis=1)
+
+    meta = {
+        "ni_daq": {"counter_bits": 32, "counter_output_freq": 100000.0, "sample_freq": 100000.0},
+        "line_labels": ["a", "b", "c", "d"],
+    }
+
+    with h5py.File(path, "w") as f:
+        f.create_dataset("data", data=data)
+        f.create_dataset("meta", data=str(meta))
+
+    return path
+
+
+@pytest.mark.parametrize("times", [
+    np.array([1, 5, 10, 2, 4, 8, 1, 3]),
+    np.array([[1], [5], [0], [2], [1]]),
+    np.array([3, 4, 5]),
+])
+def test_correct_rollovers(times):
+    assert np.array_equal(sd.correct_rollovers(times), legacy_process_times(times))
+
+
+@pytest.mark.parametrize("line", [0, 1, 2, 3, "a", "d"])
+@pytest.mark.parametrize("units", ["samples", "seconds"])
+def test_edge_queries_match_scan(sync_h5, line, units):
+    with sd.Dataset(sync_h5) as dset:
+        bit = dset._line_to_bit(line)
+        changes = dset.get_bit_changes(bit)
+        all_times = dset.get_all_times(units)
+
+        assert np.array_equal(dset.get_rising_edges(line, units), all_times[changes == 1])
+        assert np.array_equal(dset.get_falling_edges(line, units), all_times[changes == 255])
+        assert np.array_equal(dset.get_events_by_line(line, units), all_times[changes != 0])
+
+
+def test_edge_cache(sync_h5):
+    cache_path = sync_h5 + ".edges.npz"
+
+    with sd.Dataset(sync_h5, edge_cache=True) as dset:
+        expected = dset.get_rising_edges("b")
+    assert os.path.exists(cache_path)
+
+    with sd.Dataset(sync_h5, edge_cache=True) as dset:
+        assert dset.edge_index is not None
+        assert np.array_equal(dset.get_rising_edges("b"), expected)
+
+
+def test_edge_cache_stale(sync_h5):
+    index = sd.EdgeIndex(np.zeros(33, dtype=int), np.zeros(0), np.zeros(0))
+    cache_path = sync_h5 + ".edges.npz"
+    index.save(cache_path)
+
+    assert sd.EdgeIndex.load(cache_path, sync_h5) is None
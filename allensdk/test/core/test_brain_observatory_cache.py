@@ -377,3 +377,67 @@ def test_brain_observatory_cache_get_events_data(brain_observatory_cache, events
     events = brain_observatory_cache.get_ophys_experiment_events(eid)
     true_events = np.load(data_file, allow_pickle=False)["ev"]
     assert(np.all(events == true_events))
+
+
+@pytest.fixture
+def cell_specimens():
+    return [{'cell_specimen_id': i,
+             'experiment_container_id': i % 4,
+             'area': ['VISp', 'VISl'][i % 2],
+             'osi_dg': None if i % 5 == 0 else i / 20.,
+             'failed_experiment_container': None if i == 3 else i % 6 == 0,
+             'thumbnail': 'thumb_%d.png' % i} for i in range(20)]
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    {'include_failed': True},
+    {'ids': [1, 3, 6, 7, 12]},
+    {'ids': []},
+    {'experiment_container_ids': [2, 3]},
+    {'filters': [{'field': 'area', 'op': 'in', 'value': ['VISl']},
+                 {'field': 'osi_dg', 'op': 'between', 'value': [0.2, 0.7]}]},
+    {'filters': [{'field': 'osi_dg', 'op': '>', 'value': 0.5}], 'include_failed': True},
+])
+def test_get_cell_specimens_table(brain_observatory_cache, cell_specimens, tmpdir, kwargs):
+    file_name = str(tmpdir.join('cell_specimens.json'))
+    mappings = [{'item': 'thumbnail', 'item_type': 'T', 'level': 'R'}]
+
+    with patch.object(BrainObservatoryApi, 'get_cell_metrics',
+                      side_effect=lambda *a, **k: [dict(c) for c in cell_specimens]) as get_metrics, \
+            patch.object(BrainObservatoryCache, '_get_stimulus_mappings', return_value=mappings):
+        expected = brain_observatory_cache.get_cell_specimens(file_name=file_name, **kwargs)
+
+        table = brain_observatory_cache.get_cell_specimens_table(file_name=file_name, **kwargs)
+        assert os.path.exists(str(tmpdir.join('cell_specimens.h5')))
+        assert get_metrics.call_count == 2
+
+        # served from the HDF5 table from now on
+        projected = brain_observatory_cache.get_cell_specimens_table(
+            file_name=file_name, columns=['cell_specimen_id', 'osi_dg'], **kwargs)
+        assert get_metrics.call_count == 2
+
+    assert sorted(table['cell_specimen_id']) == sorted(c['cell_specimen_id'] for c in expected)
+    assert 'thumbnail' not in table.columns
+    assert list(projected.columns) == ['cell_specimen_id', 'osi_dg']
+
+    records = table.set_index('cell_specimen_id')
+    for c in expected:
+        assert records.loc[c['cell_specimen_id'], 'failed_experiment_container'] == \
+            c['failed_experiment_container']
+
+
+def test_get_cell_specimens_table_list_field(brain_observatory_cache, cell_specimens, tmpdir):
+    file_name = str(tmpdir.join('cell_specimens.json'))
+    for c in cell_specimens:
+        c['rf_center'] = None if c['cell_specimen_id'] == 4 else [c['cell_specimen_id'], 1.5]
+
+    with patch.object(BrainObservatoryApi, 'get_cell_metrics',
+                      side_effect=lambda *a, **k: [dict(c) for c in cell_specimens]), \
+            patch.object(BrainObservatoryCache, '_get_stimulus_mappings', return_value=[]):
+        table = brain_observatory_cache.get_cell_specimens_table(file_name=file_name,
+                                                                 include_failed=True)
+
+    records = table.set_index('cell_specimen_id')
+    for c in cell_specimens:
+        assert records.loc[c['cell_specimen_id'], 'rf_center'] == c['rf_center']
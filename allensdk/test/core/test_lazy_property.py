@@ -1,5 +1,6 @@
 import pytest
 import copy as cp
+import numpy as np
 
 from allensdk.core.lazy_property import LazyProperty, LazyPropertyMixin
 
@@ -39,4 +40,107 @@ def test_not_settable(original_data):
     data_obj = DataClass(original_data)
     with pytest.raises(AttributeError) as err:
         data_obj.data = '12345'
-        assert "Can't set LazyLoadable attribute" in err
\ No newline at end of file
+        assert "Can't set LazyLoadable attribute" in err
+
+class CountingApi(object):
+    def __init__(self):
+        self.calls = {}
+
+    def get_data(self, name, size):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return np.zeros(size, dtype=np.uint8)
+
+    def get_nothing(self):
+        self.calls['nothing'] = self.calls.get('nothing', 0) + 1
+        return None
+
+
+class PrefetchClass(LazyPropertyMixin):
+
+    def __init__(self, api):
+        self.api = api
+        self.small = self.LazyProperty(self.api.get_data, name='small', size=10)
+        self.large = self.LazyProperty(self.api.get_data, name='large', size=1000)
+        self.nothing = self.LazyProperty(self.api.get_nothing)
+
+
+def test_loaded_value_is_plain_attribute():
+    data_obj = DataClass([None])
+    assert 'data' not in data_obj.__dict__
+
+    value = data_obj.data
+    assert data_obj.__dict__['data'] is value
+
+    with pytest.raises(AttributeError):
+        data_obj.data = '12345'
+
+
+def test_missing_attribute():
+    data_obj = DataClass([None])
+    with pytest.raises(AttributeError):
+        data_obj.not_an_attribute
+
+
+class FailingApi(object):
+    def get_data(self):
+        return self.missing_method()
+
+
+class WrappedClass(LazyPropertyMixin):
+
+    def __init__(self):
+        self.api = FailingApi()
+        self.raw = self.LazyProperty(self.api.get_data)
+
+    @property
+    def wrapped(self):
+        return self.raw
+
+
+def test_load_attribute_error_not_masked():
+    obj = WrappedClass()
+    with pytest.raises(RuntimeError) as err:
+        obj.wrapped
+
+    assert 'missing_method' in str(err.value)
+    assert isinstance(err.value.__cause__, AttributeError)
+
+
+def test_none_loaded_once():
+    api = CountingApi()
+    obj = PrefetchClass(api)
+    assert obj.nothing is None
+    assert obj.nothing is None
+    assert api.calls['nothing'] == 1
+
+
+def test_lazy_load_stats():
+    obj = PrefetchClass(CountingApi())
+    assert obj.lazy_load_stats == {}
+
+    obj.large
+    stats = obj.lazy_load_stats
+    assert list(stats) == ['large']
+    assert stats['large']['nbytes'] == 1000
+    assert stats['large']['load_time'] >= 0
+
+
+@pytest.mark.parametrize('names,expected', [
+    [None, {'small', 'large', 'nothing'}],
+    [['small'], {'small'}],
+])
+def test_prefetch(names, expected):
+    api = CountingApi()
+    obj = PrefetchClass(api)
+    obj.small
+
+    stats = obj.prefetch(names, max_workers=2)
+    assert set(stats) == expected
+    assert set(api.calls) == expected
+    assert all(count == 1 for count in api.calls.values())
+
+
+def test_prefetch_unknown():
+    obj = PrefetchClass(CountingApi())
+    with pytest.raises(ValueError):
+        obj.prefetch(['api'])
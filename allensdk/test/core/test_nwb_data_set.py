@@ -34,6 +34,7 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 from mock import patch, MagicMock
+import h5py
 from pkg_resources import resource_filename  # @UnresolvedImport
 import numpy as np
 from allensdk.core.nwb_data_set import NwbDataSet
@@ -114,6 +115,8 @@ def test_fill_sweep_responses_extend(mock_data_set):
         def __init__(self, i):
             self.i = i
             self.value = i
+        def __getitem__(self, key):
+            return self.i
         def __eq__(self, j):
             return j == self.i
         
@@ -231,3 +234,80 @@ def test_get_sweep_metadata(data_set):
     sweep_metadata = data_set.get_sweep_metadata(1)
 
     assert sweep_metadata is not None
+
+
+def write_sweep_file(file_name, sweeps, version='1.1', conversion=1e-3):
+    with h5py.File(file_name, 'w') as f:
+        f.create_dataset('general/generated_by',
+                         data=np.array(['version', version], dtype='S'))
+        for sweep_number, (stimulus, response, exp_count) in sweeps.items():
+            swp = f.create_group('epochs/Sweep_%d' % sweep_number)
+            for name, data in (('stimulus', stimulus), ('response', response)):
+                ts = swp.create_group('%s/timeseries' % name)
+                ds = ts.create_dataset('data', data=data)
+                ds.attrs['conversion'] = conversion
+                ds.attrs['unit'] = b'Amps' if name == 'stimulus' else b'Volts'
+                ts.create_dataset('starting_time', data=0.0).attrs['rate'] = 200000.0
+                swp[name].create_dataset('idx_start', data=0)
+                swp[name].create_dataset('count', data=len(data))
+            exp = f.create_group('epochs/Experiment_%d/stimulus' % sweep_number)
+            exp.create_dataset('idx_start', data=2)
+            exp.create_dataset('count', data=exp_count)
+
+
+@pytest.fixture
+def sweep_file(tmpdir_factory):
+    file_name = str(tmpdir_factory.mktemp('nwb').join('sweeps.nwb'))
+    sweeps = {n: (np.arange(10, dtype=float) * n, np.ones(10) * n, 6)
+              for n in (3, 4, 5)}
+    write_sweep_file(file_name, sweeps)
+    return file_name, sweeps
+
+
+def test_get_sweep(sweep_file):
+    file_name, sweeps = sweep_file
+    sweep = NwbDataSet(file_name).get_sweep(4)
+
+    assert np.allclose(sweep['stimulus'], sweeps[4][0] * 1e-3)
+    assert np.allclose(sweep['response'], sweeps[4][1] * 1e-3)
+    assert sweep['stimulus_unit'] == 'Amps'
+    assert sweep['index_range'] == (2, 7)
+    assert sweep['sampling_rate'] == 200000.0
+
+
+@pytest.mark.parametrize('lazy,mmap', [(False, False), (True, False),
+                                       (False, True), (True, True)])
+def test_get_sweeps(sweep_file, lazy, mmap):
+    file_name, sweeps = sweep_file
+    expected = NwbDataSet(file_name).get_sweep(5)
+
+    with NwbDataSet(file_name) as data_set:
+        assert data_set.get_pipeline_version() == (1, 1)
+        result = data_set.get_sweeps(lazy=lazy, mmap=mmap)
+        assert sorted(result.keys()) == [3, 4, 5]
+
+        sweep = result[5]
+        assert np.allclose(sweep['stimulus'][2:4], expected['stimulus'][2:4])
+        assert np.allclose(np.asarray(sweep['response']), expected['response'])
+        assert sweep['index_range'] == expected['index_range']
+
+    assert not data_set.is_open
+
+
+def test_get_sweeps_lazy_requires_open(sweep_file):
+    file_name, _ = sweep_file
+
+    with pytest.raises(ValueError):
+        NwbDataSet(file_name).get_sweeps([3], lazy=True)
+
+
+def test_open_read_only_write(sweep_file):
+    file_name, _ = sweep_file
+
+    with NwbDataSet(file_name) as data_set:
+        with pytest.raises(IOError):
+            data_set.set_sweep(3, None, np.zeros(10))
+
+    with NwbDataSet(file_name).open('r+') as data_set:
+        data_set.set_sweep(3, None, np.zeros(10))
+        assert not np.any(data_set.get_sweep(3)['response'])
@@ -192,3 +192,20 @@ def test_cbs(tree):
     for node in nodes:
         assert( node['id'] == tree.node_id_cb(node) )
         assert( node['parent'] == tree.parent_id_cb(node) )
+
+
+def test_property_index(tree):
+
+    index = tree.property_index(1)
+    assert( index[6]['id'] == 3 )
+    assert( tree.property_index(1) is index )
+
+    tree.invalidate_caches()
+    assert( tree.property_index(1) is not index )
+
+
+def test_property_index_collision(tree):
+
+    tree.nodes([1])[0][1] = 2
+    with pytest.raises(RuntimeError):
+        tree.nodes_by_property(1, [2])
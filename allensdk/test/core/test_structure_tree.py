@@ -35,6 +35,7 @@
 #
 import pytest
 import mock
+import numpy as np
 from numpy import allclose
 import sys
 import pandas as pd
@@ -247,4 +248,113 @@ def test_export_label_description(tree):
     }).loc[:, ('IDX', '-R-', '-G-', '-B-', '-A-', 'VIS', 'MSH', 'LABEL')]
 
     obt = tree.export_label_description()
-    pd.testing.assert_frame_equal(obt, exp)
\ No newline at end of file
+    pd.testing.assert_frame_equal(obt, exp)
+
+def test_get_structures_by_graph_order(nodes):
+
+    for ii, node in enumerate(nodes):
+        node['graph_order'] = 2 - ii
+    tree = StructureTree(nodes)
+
+    obtained = tree.get_structures_by_graph_order([0, 2])
+    assert( [s['id'] for s in obtained] == [2, 0] )
+
+
+def test_get_structures_by_set_id_order(tree):
+
+    obtained = tree.get_structures_by_set_id([2, 3, 5])
+    assert( [s['id'] for s in obtained] == [1, 2] )
+    assert( tree.get_structures_by_set_id([5]) == [] )
+
+
+def test_get_structures_by_acronym_edited(tree):
+
+    assert( tree.get_structures_by_acronym(['a'])[0]['id'] == 1 )
+
+    tree.get_structures_by_id([1])[0]['acronym'] = 'c'
+    with pytest.raises(KeyError):
+        tree.get_structures_by_acronym(['a'])
+
+    assert( tree.get_structures_by_acronym(['c'])[0]['id'] == 1 )
+
+
+def test_get_structures_by_acronym_absent(tree):
+
+    index = tree.property_index('acronym')
+    with pytest.raises(KeyError):
+        tree.get_structures_by_acronym(['z'])
+
+    assert( tree.property_index('acronym') is index )
+
+
+def test_get_colormap_copy(tree):
+
+    obtained = tree.get_colormap()
+    obtained[0] = [1, 1, 1]
+    assert( allclose(tree.get_colormap()[0], [0, 0, 0]) )
+
+
+def test_invalidate_caches(tree):
+
+    assert( tree.get_name_map()[1] == 'alpha' )
+
+    tree.get_structures_by_id([1])[0]['name'] = 'gamma'
+    tree.invalidate_caches()
+    assert( tree.get_name_map()[1] == 'gamma' )
+
+
+def test_acronyms_from_ids(tree):
+
+    obtained = tree.acronyms_from_ids([[2, 0], [1, 1]])
+    assert( obtained.shape == (2, 2) )
+    assert( obtained.tolist() == [['b', 'rt'], ['a', 'a']] )
+
+
+def test_map_structure_ids_unknown(tree):
+
+    with pytest.raises(KeyError):
+        tree.names_from_ids([1, 7])
+
+    obtained = tree.names_from_ids([1, 7, -3], fill_value='')
+    assert( obtained.tolist() == ['alpha', '', ''] )
+
+
+def test_colors_from_ids(tree):
+
+    obtained = tree.colors_from_ids([[2], [1]])
+    assert( obtained.shape == (2, 1, 3) )
+    assert( obtained.dtype == np.uint8 )
+    assert( allclose(obtained[:, 0], [[255, 255, 255], [0, 15, 255]]) )
+
+    obtained = tree.colors_from_ids([8, 0], fill_value=7)
+    assert( allclose(obtained, [[7, 7, 7], [0, 0, 0]]) )
+
+
+def test_ids_from_acronyms(tree):
+
+    obtained = tree.ids_from_acronyms([['b', 'rt', 'b']])
+    assert( obtained.tolist() == [[2, 0, 2]] )
+
+    with pytest.raises(KeyError):
+        tree.ids_from_acronyms(['q'])
+
+
+def test_ancestor_ids_at_level(tree):
+
+    obtained = tree.ancestor_ids_at_level([0, 1, 2, 9], 1)
+    assert( obtained.tolist() == [-1, 1, 2, -1] )
+
+    obtained = tree.ancestor_ids_at_level([0, 1, 2], 0)
+    assert( obtained.tolist() == [0, 0, 0] )
+
+    obtained = tree.ancestor_ids_at_level([0, 1], 4, fill_value=0)
+    assert( obtained.tolist() == [0, 0] )
+
+
+def test_descends_from_mask(tree):
+
+    obtained = tree.descends_from_mask([[0, 1], [2, 9]], 1)
+    assert( obtained.tolist() == [[False, True], [False, False]] )
+
+    obtained = tree.descends_from_mask([0, 1, 2], 0)
+    assert( obtained.all() )
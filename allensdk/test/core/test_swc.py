@@ -0,0 +1,223 @@
+# Allen Institute Software License - This software license is the 2-clause BSD
+# license plus a third clause that prohibits redistribution for commercial
+# purposes without further permission.
+#
+# Copyright 2017. Allen Institute. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Redistributions for commercial purposes are not permitted without the
+# Allen Institute's written permission.
+# For purposes of this license, commercial purposes is the incorporation of the
+# Allen Institute's software into anything for which you will charge fees or
+# other compensation. Contact terms@alleninstitute.org for commercial licensing
+# opportunities.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import pytest
+import numpy as np
+
+from allensdk.core import swc
+
+
+SWC = """# id type x y z radius parent
+1 1 0.0 0.0 0.0 5.0 -1
+2 3 1.0 0.0 0.0 1.0 1
+3 3 2.0 0.0 0.0 1.0 2
+4 3 3.0 0.0 0.0 1.0 3
+5 2 0.0 1.0 0.0 1.0 1
+6 2 0.0 2.0 0.0 1.0 5
+7 3 2.0 1.0 0.0 1.0 3
+8 3 9.0 9.0 9.0 1.0 -1
+9 3 4.0 0.0 0.0 1.0 4
+10 3 5.0 0.0 0.0 1.0 9
+"""
+
+
+@pytest.fixture
+def swc_file(tmpdir_factory):
+    file_name = str(tmpdir_factory.mktemp('swc').join('test.swc'))
+    with open(file_name, 'w') as f:
+        f.write(SWC)
+    return file_name
+
+
+def node_values(morphology):
+    return [(c[swc.NODE_ID], c[swc.NODE_TYPE], c[swc.NODE_X], c[swc.NODE_Y],
+             c[swc.NODE_Z], c[swc.NODE_R], c[swc.NODE_PN],
+             c[swc.NODE_CHILDREN], c[swc.NODE_TREE_ID])
+            for c in morphology.compartment_list]
+
+
+def test_read_swc_columns(swc_file):
+    data = swc.read_swc_columns(swc_file)
+
+    assert data[swc.NODE_ID].tolist() == list(range(1, 11))
+    assert data[swc.NODE_TYPE].tolist() == [1, 3, 3, 3, 2, 2, 3, 3, 3, 3]
+    assert data[swc.NODE_PN].tolist() == [-1, 1, 2, 3, 1, 5, 3, -1, 4, 9]
+    assert np.allclose(data[swc.NODE_R], [5, 1, 1, 1, 1, 1, 1, 1, 1, 1])
+
+
+def test_read_swc_invalid(tmpdir_factory):
+    file_name = str(tmpdir_factory.mktemp('swc').join('bad.swc'))
+    with open(file_name, 'w') as f:
+        f.write("1 1 0.0 0.0 0.0 5.0 -1\n2 3 a 0.0 0.0 1.0 1\n")
+
+    with pytest.raises(IOError):
+        swc.read_swc(file_name)
+
+
+def test_read_swc(swc_file):
+    morphology = swc.read_swc(swc_file)
+
+    assert morphology.num_nodes == 10
+    assert morphology.num_trees == 2
+    assert morphology.soma[swc.NODE_ID] == 0
+    assert [c[swc.NODE_PN] for c in morphology.compartment_list] == \
+        [-1, 0, 1, 2, 0, 4, 2, -1, 3, 8]
+    assert [c[swc.NODE_ID] for c in morphology.children_of(2)] == [3, 6]
+    assert [c[swc.NODE_ID] for c in morphology.tree(1)] == [7]
+
+
+def test_read_swc_arrays(swc_file):
+    arrays = swc.read_swc_arrays(swc_file)
+
+    assert arrays.num_nodes == 10
+    assert arrays.num_trees == 2
+    assert arrays.soma == 0
+    assert arrays.parents.tolist() == [-1, 0, 1, 2, 0, 4, 2, -1, 3, 8]
+    assert arrays.children_of(2).tolist() == [3, 6]
+    assert arrays.tree(1).tolist() == [7]
+    assert node_values(arrays.to_morphology()) == \
+        node_values(swc.read_swc(swc_file))
+
+
+def test_to_arrays(swc_file):
+    morphology = swc.read_swc(swc_file)
+    arrays = morphology.to_arrays()
+
+    assert node_values(arrays.to_morphology()) == node_values(morphology)
+
+
+def test_soma_tree_first():
+    labels, num_trees = swc._tree_labels([-1, 0, -1, 2, 1], [3, 3, 1, 1, 3])
+
+    assert num_trees == 2
+    assert labels.tolist() == [1, 1, 0, 0, 1]
+
+
+@pytest.mark.parametrize('node_type,expected_parents', [
+    (swc.Morphology.AXON, [-1, 0, 1, 2, 2, -1, 3, 6]),
+    (swc.Morphology.DENDRITE, [-1, 0, 1]),
+])
+def test_strip_type(swc_file, node_type, expected_parents):
+    morphology = swc.read_swc(swc_file)
+    morphology.strip_type(node_type)
+    arrays = swc.read_swc_arrays(swc_file).strip_type(node_type)
+
+    assert [c[swc.NODE_PN] for c in morphology.compartment_list] == \
+        expected_parents
+    assert arrays.parents.tolist() == expected_parents
+    assert node_values(arrays.to_morphology()) == node_values(morphology)
+
+
+def test_strip_all_other_types(swc_file):
+    morphology = swc.read_swc(swc_file)
+    morphology.strip_all_other_types(swc.Morphology.AXON, keep_soma=False)
+    arrays = swc.read_swc_arrays(swc_file).strip_all_other_types(
+        swc.Morphology.AXON, keep_soma=False)
+
+    assert [c[swc.NODE_PN] for c in morphology.compartment_list] == [-1, 0]
+    assert node_values(arrays.to_morphology()) == node_values(morphology)
+
+
+def test_sparsify(swc_file):
+    morphology = swc.read_swc(swc_file)
+    before = node_values(morphology)
+    sparse = morphology.sparsify(2)
+    arrays = swc.read_swc_arrays(swc_file).sparsify(2)
+
+    # node 3 has one child and an odd position, so is dropped
+    assert [c[swc.NODE_PN] for c in sparse.compartment_list] == \
+        [-1, 0, 1, 0, 3, 2, -1, 2, 7]
+    assert node_values(arrays.to_morphology()) == node_values(sparse)
+    assert node_values(morphology) == before
+
+
+def test_apply_affine(swc_file):
+    aff = [0, -2, 0, 2, 0, 0, 0, 0, 2, 1, 2, 3]
+    morphology = swc.read_swc(swc_file)
+    morphology.apply_affine(aff)
+    arrays = swc.read_swc_arrays(swc_file)
+    arrays.apply_affine(aff)
+
+    node = morphology.node(5)
+    assert (node[swc.NODE_X], node[swc.NODE_Y], node[swc.NODE_Z]) == \
+        (-3.0, 2.0, 3.0)
+    assert node[swc.NODE_R] == pytest.approx(2.0)
+    assert node_values(arrays.to_morphology()) == node_values(morphology)
+
+
+@pytest.mark.parametrize('point,dist,node_type,expected', [
+    ((0, 0, 0), 1.0, None, [0, 1, 4]),
+    ((0, 0, 0), 1.0, swc.Morphology.AXON, [4]),
+    ((2, 0, 0), 1.0, swc.Morphology.DENDRITE, [1, 2, 3, 6]),
+    ((2, 0, 0), 0.5, swc.Morphology.SOMA, []),
+    ((2, 0, 0), -1.0, None, []),
+])
+def test_find(swc_file, point, dist, node_type, expected):
+    morphology = swc.read_swc(swc_file)
+    found = morphology.find(point[0], point[1], point[2], dist, node_type)
+
+    assert [c[swc.NODE_ID] for c in found] == expected
+
+
+def test_find_all(swc_file):
+    morphology = swc.read_swc(swc_file)
+    found = morphology.find_all([(0, 0, 0), (9, 9, 9)], 1.0)
+
+    assert [[c[swc.NODE_ID] for c in f] for f in found] == [[0, 1, 4], [7]]
+
+
+def test_find_nearest(swc_file):
+    morphology = swc.read_swc(swc_file)
+    distances, ids = morphology.find_nearest([(0, 2.1, 0), (5, 0, 0)], k=3,
+                                             node_type=swc.Morphology.AXON)
+
+    assert ids.tolist() == [[5, 4, -1], [4, 5, -1]]
+    assert np.allclose(distances[0, :2], [0.1, 1.1])
+    assert np.isinf(distances[:, 2]).all()
+
+
+def test_spatial_index_invalidated(swc_file):
+    morphology = swc.read_swc(swc_file)
+    assert len(morphology.find(9, 9, 9, 0.1)) == 1
+
+    morphology.apply_affine([1, 0, 0, 0, 1, 0, 0, 0, 1, 1, 0, 0])
+    assert len(morphology.find(9, 9, 9, 0.1)) == 0
+    assert len(morphology.find(10, 9, 9, 0.1)) == 1
+
+    morphology.convert_type(swc.Morphology.AXON, swc.Morphology.DENDRITE)
+    assert morphology.find(1, 2, 0, 0.1, swc.Morphology.AXON) == []
+
+    morphology.strip_type(swc.Morphology.DENDRITE)
+    assert morphology.find(10, 9, 9, 0.1) == []
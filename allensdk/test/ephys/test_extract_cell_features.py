@@ -0,0 +1,101 @@
+# Allen Institute Software License - This software license is the 2-clause BSD
+# license plus a third clause that prohibits redistribution for commercial
+# purposes without further permission.
+#
+# Copyright 2017. Allen Institute. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Redistributions for commercial purposes are not permitted without the
+# Allen Institute's written permission.
+# For purposes of this license, commercial purposes is the incorporation of the
+# Allen Institute's software into anything for which you will charge fees or
+# other compensation. Contact terms@alleninstitute.org for commercial licensing
+# opportunities.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+import allensdk.ephys.extract_cell_features as ecf
+
+path = os.path.dirname(__file__)
+
+
+@pytest.fixture
+def nwb_files(tmpdir_factory):
+    data = np.loadtxt(os.path.join(path, "data/spike_test_pair.txt"))
+    t, v = data[:, 0], data[:, 1]
+
+    file_names = []
+    for cell_id in (10, 11):
+        file_name = str(tmpdir_factory.mktemp('cell').join('%d.nwb' % cell_id))
+        with h5py.File(file_name, 'w') as f:
+            f.create_dataset('general/generated_by',
+                             data=np.array(['version', '1.1'], dtype='S'))
+            for sweep_number in (1, 2):
+                swp = f.create_group('epochs/Sweep_%d' % sweep_number)
+                for name, values, conversion in (('stimulus', np.zeros_like(v), 1e-12),
+                                                 ('response', v, 1e-3)):
+                    ts = swp.create_group('%s/timeseries' % name)
+                    ts.create_dataset('data', data=values).attrs['conversion'] = conversion
+                    ts.create_dataset('starting_time', data=0.0).attrs['rate'] = 1. / (t[1] - t[0])
+                    swp[name].create_dataset('idx_start', data=0)
+                    swp[name].create_dataset('count', data=len(v))
+        file_names.append((cell_id, file_name))
+    return file_names
+
+
+def test_extract_cell_features_batch_sweeps(nwb_files):
+    cells = [{'id': cell_id, 'nwb_file': file_name,
+              'sweeps_by_type': {'Ramp': [1, 2]}} for cell_id, file_name in nwb_files]
+
+    cell_table, sweep_table, failures = \
+        ecf.extract_cell_features_batch(cells, processes=1)
+
+    assert failures == {}
+    assert len(cell_table) == 0
+    assert list(sweep_table.index) == [(10, 1), (10, 2), (11, 1), (11, 2)]
+    assert 'spikes' not in sweep_table.columns
+    assert (sweep_table['avg_rate'] > 0).all()
+
+
+def test_extract_cell_features_batch_failures():
+    cells = [{'id': cid, 'nwb_file': 'missing_%d.nwb' % cid,
+              'sweeps_by_type': {'Ramp': [1]}} for cid in (1, 2)]
+
+    cell_table, sweep_table, failures = \
+        ecf.extract_cell_features_batch(cells, processes=2)
+
+    assert sorted(failures.keys()) == [1, 2]
+    assert len(cell_table) == 0
+    assert len(sweep_table) == 0
+
+
+def test_flatten_features():
+    flat = ecf._flatten_features({'a': 1.0, 'b': {'c': 2, 'd': [1, 2]},
+                                  'e': None, 'f': [{'x': 1}]})
+    assert flat == {'a': 1.0, 'b.c': 2, 'e': None}
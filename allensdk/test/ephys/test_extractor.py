@@ -38,6 +38,7 @@ import mock
 
 import pytest
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from allensdk.ephys.ephys_extractor import EphysSweepSetFeatureExtractor, input_resistance
 import allensdk.ephys.ephys_extractor as ephys_extractor
 import os
@@ -94,6 +95,42 @@ def test_extractor_on_sample_data():
         result = swp.sweep_feature("nonexistent_key")
 
 
+@pytest.mark.parametrize("executor_class", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_extractor_with_executor(executor_class):
+    data = np.loadtxt(os.path.join(path, "data/spike_test_pair.txt"))
+    t = data[:, 0]
+    v = data[:, 1]
+    t_set = [t, t, t]
+    v_set = [v, v - 50., v]
+
+    expected = EphysSweepSetFeatureExtractor(t_set, v_set, id_set=[4, 5, 6])
+    expected.process_spikes()
+
+    ext = EphysSweepSetFeatureExtractor(t_set, v_set, id_set=[4, 5, 6])
+    with executor_class(max_workers=2) as executor:
+        ext.process_spikes(executor)
+
+    assert [s.id for s in ext.sweeps()] == [4, 5, 6]
+    assert np.array_equal(ext.sweep_features("avg_rate"), expected.sweep_features("avg_rate"))
+    assert np.allclose(ext.sweeps()[0].spike_feature("peak_t"),
+                       expected.sweeps()[0].spike_feature("peak_t"))
+
+
+def test_cell_extractor_with_executor():
+    data = np.loadtxt(os.path.join(path, "data/spike_test_pair.txt"))
+    t = data[:, 0]
+    v = data[:, 1]
+
+    ramps_ext = EphysSweepSetFeatureExtractor([t, t], [v, v - 50.])
+    cell_ext = ephys_extractor.EphysCellFeatureExtractor(ramps_ext, None, None)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        cell_ext.process(keys=["ramps"], executor=executor)
+
+    assert len(cell_ext.ramps_features(all=True).sweeps()) == 2
+    assert len(cell_ext.cell_features()["ramps"]["spiking_sweeps"]) == 1
+
+
 def test_extractor_on_sample_data_with_i():
     data = np.loadtxt(os.path.join(path, "data/spike_test_pair.txt"))
     t = data[:, 0]
@@ -266,3 +266,49 @@ def test_width_calculation_too_many_troughs():
 def test_width_calculation_with_burst():
     # example sp 487663469, sweep 43
     pass
+
+
+def test_detect_with_precalculated_dvdt():
+    data = np.loadtxt(os.path.join(path, "data/spike_test_pair.txt"))
+    t = data[:, 0]
+    v = data[:, 1]
+    dvdt = ft.calculate_dvdt(v, t, 10.)
+
+    assert np.array_equal(ft.detect_putative_spikes(v, t),
+                          ft.detect_putative_spikes(v, t, dvdt=dvdt))
+
+
+@pytest.mark.parametrize("overlapping", [False, True])
+@pytest.mark.parametrize("with_nans", [False, True])
+def test_segment_reductions_match_loops(overlapping, with_nans):
+    rng = np.random.RandomState(0)
+    x = np.round(rng.randn(500), 1)
+    if with_nans:
+        x[[37, 212]] = np.nan
+
+    if overlapping:
+        starts = rng.randint(0, 480, 30)
+        ends = starts + rng.randint(1, 40, 30)
+    else:
+        bounds = np.sort(rng.choice(np.arange(1, 505), 60, replace=False))
+        starts, ends = bounds[0::2], bounds[1::2]
+
+    assert np.array_equal(ft._segment_argmax(x, starts, ends),
+                          [np.argmax(x[s:e]) + s for s, e in zip(starts, ends)])
+    assert np.array_equal(ft._segment_argmin(x, starts, ends),
+                          [np.argmin(x[s:e]) + s for s, e in zip(starts, ends)])
+    assert np.array_equal(ft._segment_any(x > 2., starts, ends),
+                          [np.any(x[s:e] > 2.) for s, e in zip(starts, ends)])
+
+    levels = rng.randn(len(starts)) + 1.
+    first, found = ft._segment_first(x, starts, ends, levels, np.greater_equal)
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        hits = np.flatnonzero(x[s:e] >= levels[i])
+        assert found[i] == bool(hits.size)
+        if hits.size:
+            assert first[i] == hits[0] + s
+
+
+def test_segment_argmax_empty_segment():
+    with pytest.raises(ValueError):
+        ft._segment_argmax(np.arange(10.), np.array([2, 5]), np.array([4, 5]))
@@ -0,0 +1,76 @@
+import pytest
+import numpy as np
+
+from allensdk.internal.brain_observatory import fit_ellipse as fe
+
+
+def ellipse_points(center, axes, angle, n=60, noise=0.01):
+    # a little noise keeps the scatter matrix of many points full rank
+    phi = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    x = axes[0] * np.cos(phi)
+    y = axes[1] * np.sin(phi)
+    xr = x * np.cos(angle) - y * np.sin(angle) + center[0]
+    yr = x * np.sin(angle) + y * np.cos(angle) + center[1]
+    offsets = np.random.RandomState(0).normal(scale=noise, size=(n, 2))
+    return np.vstack([yr, xr]).T + offsets
+
+
+def test_fit_conics_matches_fit_ellipse():
+    points = ellipse_points((40.0, 30.0), (12.0, 7.0), 0.3)
+    serial = fe.FitEllipse(10, 10, 0.0001, 4)
+    expected_params, expected_error = serial.fit_ellipse(points[:20])
+
+    D = fe.design_matrix(points)
+    weights = np.zeros((1, len(points)), dtype=bool)
+    weights[0, :20] = True
+    params, error = fe.fit_conics(D, weights, serial.C)
+
+    assert np.allclose(np.abs(params[0]), np.abs(expected_params))
+    assert np.allclose(error[0], expected_error)
+
+
+def test_fit_conics_singular():
+    points = ellipse_points((40.0, 30.0), (12.0, 7.0), 0.3)
+    weights = np.zeros((2, len(points)), dtype=bool)
+    weights[0, :3] = True
+    weights[1, :] = True
+    params, error = fe.fit_conics(fe.design_matrix(points), weights, fe.FitEllipse(10, 10, 0.0001, 4).C)
+
+    assert np.all(np.isnan(params[0]))
+    assert np.all(np.isfinite(params[1]))
+
+
+def test_fit_conics_rank_deficient():
+    points = ellipse_points((40.0, 30.0), (12.0, 7.0), 0.3, n=5)
+    weights = np.ones((1, len(points)), dtype=bool)
+    params, error = fe.fit_conics(fe.design_matrix(points), weights, fe.FitEllipse(10, 10, 0.0001, 4).C)
+
+    assert np.all(np.isnan(params))
+    assert np.all(np.isnan(error))
+
+
+def test_batch_ransac_fit():
+    rng = np.random.RandomState(0)
+    points = ellipse_points((40.0, 30.0), (12.0, 7.0), 0.3)
+    outliers = rng.uniform(20, 60, size=(6, 2))
+    candidates = np.vstack([points, outliers])
+
+    fitter = fe.BatchFitEllipse(10, 20, 0.0001, 4, random_state=rng)
+    center, angle, axes = fitter.ransac_fit(candidates)
+
+    assert np.allclose(center, (40.0, 30.0), atol=0.1)
+    assert np.allclose(sorted(axes), (7.0, 12.0), atol=0.1)
+
+
+def test_batch_ransac_too_few_points():
+    points = ellipse_points((40.0, 30.0), (12.0, 7.0), 0.3, n=10)
+    assert fe.BatchFitEllipse(10, 10, 0.0001, 4).ransac_fit(points) is None
+
+
+def test_refit_ellipses():
+    sets = [ellipse_points((40.0, 30.0), (12.0, 7.0), 0.3), ellipse_points((10.0, 20.0), (5.0, 3.0), 0.0, n=5)]
+    results = fe.refit_ellipses(sets, random_state=np.random.RandomState(1))
+
+    assert results.shape == (2, 5)
+    assert np.allclose(results[0, :2], (40.0, 30.0), atol=0.01)
+    assert np.all(np.isnan(results[1]))
@@ -0,0 +1,88 @@
+import os
+import pytest
+import mock
+import numpy as np
+
+from allensdk.internal.brain_observatory import frame_stream as fs
+
+
+FFMPEG_LOG = """
+Input #0, avi, from 'movie.avi':
+  Duration: 00:01:00.00, start: 0.000000, bitrate: 1000 kb/s
+    Stream #0:0: Video: mpeg4 (FMP4 / 0x34504D46), yuv420p, 640x480, 1000 kb/s, 30 fps, 30 tbr, 30 tbn, 30 tbc
+[Parsed_showinfo_0 @ 0x1] n:   0 pts:   3000 pts_time:100     pos: 1 fmt:yuv420p
+[Parsed_showinfo_0 @ 0x1] n:   1 pts:   3001 pts_time:100.033 pos: 2 fmt:yuv420p
+"""
+
+
+def test_parse_ffmpeg_fps():
+    assert fs.parse_ffmpeg_fps(FFMPEG_LOG) == 30.0
+    assert fs.parse_ffmpeg_fps("no streams") is None
+
+
+def test_parse_ffmpeg_first_frame():
+    assert fs.parse_ffmpeg_first_frame(FFMPEG_LOG, 30.0) == 3000
+    assert fs.parse_ffmpeg_first_frame("no frames", 30.0) is None
+
+
+def test_open_seeks_on_input():
+    stream = fs.FfmpegInputStream('movie.avi', (480, 640, 3), num_frames=10,
+                                  start_frame=3000, fps=30.0)
+
+    with mock.patch('subprocess.Popen') as popen:
+        stream.open()
+
+    command = popen.call_args[0][0]
+    assert command.index('-ss') < command.index('-i')
+    assert command[command.index('-ss') + 1] == '100.000000'
+    assert command[command.index('-frames:v') + 1] == '10'
+    assert 'select' not in ' '.join(command)
+
+    os.remove(stream.log_path)
+
+
+def test_segment_keeps_fps():
+    stream = fs.FfmpegInputStream('movie.avi', (480, 640, 3), start_frame=10, fps=30.0)
+    segment = stream.segment(20, 5)
+
+    assert segment.start_frame == 30
+    assert segment.num_frames == 5
+    assert segment.fps == 30.0
+
+
+@pytest.mark.parametrize('start_frame,raises', [(3000, False), (2990, True)])
+def test_check_first_frame(tmpdir, start_frame, raises):
+    log_path = str(tmpdir.join('ffmpeg.log'))
+    with open(log_path, 'w') as f:
+        f.write(FFMPEG_LOG)
+
+    stream = fs.FfmpegInputStream('movie.avi', (480, 640, 3),
+                                  start_frame=start_frame, fps=30.0)
+    stream.log_path = log_path
+
+    if raises:
+        with pytest.raises(IOError):
+            stream.check_first_frame()
+    else:
+        stream.check_first_frame()
+
+    assert not os.path.exists(log_path)
+
+
+class ListInputStream(fs.FrameInputStream):
+    def __init__(self, frames, **kwargs):
+        super(ListInputStream, self).__init__(movie_path=None, num_frames=len(frames), **kwargs)
+        self.frames = frames
+
+    def _read_iter(self):
+        for frame in self.frames:
+            yield frame
+
+
+@pytest.mark.parametrize('block_size', [1, 3, None])
+@pytest.mark.parametrize('cache_frames', [False, True])
+def test_iter_yields_each_frame_once(block_size, cache_frames):
+    frames = np.arange(7 * 2 * 2 * 3).reshape((7, 2, 2, 3))
+    stream = ListInputStream(frames, block_size=block_size, cache_frames=cache_frames)
+
+    assert np.array_equal(np.array(list(stream)), frames[:,:,:,0])
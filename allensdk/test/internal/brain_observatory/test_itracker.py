@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+
+from allensdk.internal.brain_observatory.frame_stream import FrameInputStream
+from allensdk.internal.brain_observatory.fit_ellipse import FitEllipse
+from allensdk.internal.brain_observatory import itracker
+
+
+class ArrayInputStream(FrameInputStream):
+    seekable = True
+
+    def __init__(self, frames, start_frame=0, num_frames=None, block_size=1):
+        if num_frames is None:
+            num_frames = len(frames) - start_frame
+        super(ArrayInputStream, self).__init__(movie_path=None,
+                                               num_frames=num_frames,
+                                               block_size=block_size)
+        self.frames = frames
+        self.start_frame = start_frame
+
+    def _read_iter(self):
+        for frame in self.frames[self.start_frame:self.start_frame+self.num_frames]:
+            yield frame
+
+    def segment(self, start_frame, num_frames):
+        return ArrayInputStream(self.frames, self.start_frame + start_frame,
+                                num_frames, self.block_size)
+
+
+class UnseekableInputStream(ArrayInputStream):
+    seekable = False
+
+
+class SeededFitEllipse(FitEllipse):
+    """ reseed before every fit so results do not depend on frame order """
+    def ransac_fit(self, candidate_points):
+        np.random.seed(0)
+        return super(SeededFitEllipse, self).ransac_fit(candidate_points)
+
+
+def eye_frames(num_frames, shape=(200, 200)):
+    y, x = np.mgrid[:shape[0], :shape[1]]
+    frames = np.zeros((num_frames,) + shape + (3,), dtype=np.uint8)
+
+    for i in range(num_frames):
+        cy, cx = 95 + i, 100 - i
+        im = np.full(shape, 150, dtype=np.uint8)
+        im[(y - cy)**2 + ((x - cx) / 1.2)**2 < 20**2] = 20
+        im[(y - cy + 6)**2 + (x - cx - 6)**2 < 4**2] = 250
+        frames[i] = im[:,:,np.newaxis]
+
+    return frames
+
+
+@pytest.fixture
+def frames():
+    return eye_frames(8)
+
+
+def tracker(tmpdir, input_stream, auto=True):
+    t = itracker.iTracker(str(tmpdir), im_shape=input_stream.frames.shape[1:3],
+                          num_frames=input_stream.num_frames,
+                          input_stream=input_stream, auto=auto)
+    t.ellipse_fitter = SeededFitEllipse
+    return t
+
+
+def test_segment(frames):
+    stream = ArrayInputStream(frames)
+    segment = stream.segment(3, 4).segment(1, 2)
+
+    assert np.array_equal(np.array(list(segment)), frames[4:6,:,:,0])
+
+
+def test_track_segment(tmpdir, frames):
+    serial = tracker(tmpdir.mkdir('serial'), ArrayInputStream(frames))
+    serial.process_movie()
+
+    t = tracker(tmpdir.mkdir('segment'), ArrayInputStream(frames))
+    start, pupil_params, cr_params = itracker.track_segment((t, 2, 3))
+
+    assert start == 2
+    assert np.allclose(pupil_params, serial.pupil_params[2:5], equal_nan=True)
+    assert np.allclose(cr_params, serial.cr_params[2:5], equal_nan=True)
+
+
+def test_process_movie_parallel(tmpdir, frames):
+    serial = tracker(tmpdir.mkdir('serial'), ArrayInputStream(frames))
+    serial.process_movie()
+
+    parallel = tracker(tmpdir.mkdir('parallel'), ArrayInputStream(frames))
+    parallel.process_movie_parallel(num_workers=2, segment_size=3)
+
+    assert not np.all(np.isnan(serial.pupil_params))
+    assert np.allclose(parallel.pupil_params, serial.pupil_params, equal_nan=True)
+    assert np.allclose(parallel.cr_params, serial.cr_params, equal_nan=True)
+    assert np.allclose(np.load(parallel.pupil_file), serial.pupil_params, equal_nan=True)
+
+
+def test_track_segment_manual_seed(tmpdir, frames):
+    t = tracker(tmpdir, ArrayInputStream(frames), auto=False)
+    t.pupil_loc = (95, 100)
+    t.cr_loc = (89, 106)
+
+    itracker.track_segment((t, 3, 3))
+
+    assert t.cr_loc == (89, 106)
+
+
+def test_process_movie_parallel_unseekable(tmpdir, frames):
+    t = tracker(tmpdir, UnseekableInputStream(frames))
+
+    with pytest.raises(ValueError):
+        t.process_movie_parallel(num_workers=2)
+
+
+def test_process_movie_parallel_output_frames(tmpdir, frames):
+    t = tracker(tmpdir, ArrayInputStream(frames))
+
+    with pytest.raises(ValueError):
+        t.process_movie_parallel(num_workers=2, output_frames=True)
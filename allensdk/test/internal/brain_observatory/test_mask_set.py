@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from allensdk.internal.brain_observatory import mask_set
+
+
+def box_mask(r0, r1, c0, c1, shape=(32, 32)):
+    mask = np.zeros(shape, dtype=bool)
+    mask[r0:r1, c0:c1] = True
+    return mask
+
+
+@pytest.fixture
+def masks():
+    return np.array([box_mask(2, 8, 2, 8),
+                     box_mask(2, 8, 10, 16),
+                     box_mask(2, 8, 2, 16),
+                     box_mask(2, 8, 2, 7),
+                     box_mask(25, 30, 25, 30)])
+
+
+def test_bb_dist(masks):
+    ms = mask_set.MaskSet(masks)
+
+    assert ms.bbs[0] == [[2, 7], [2, 7]]
+    assert ms.mask_dist[0, 1] == 3
+    assert ms.mask_dist[1, 0] == 3
+    assert ms.mask_dist[0, 4] == 18
+    assert ms.mask_dist[0, 2] < 0
+
+
+@pytest.mark.parametrize("max_dist", [-1, 0, 3, 10, 100])
+def test_close_pairs(masks, max_dist):
+    ms = mask_set.MaskSet(masks)
+
+    i, j = ms.close_pairs(max_dist)
+    expected = [ (a, b) for a in range(ms.count) for b in range(a + 1, ms.count)
+                 if ms.mask_dist[a, b] <= max_dist ]
+
+    assert list(zip(i.tolist(), j.tolist())) == expected
+
+
+def test_close_sets(masks):
+    ms = mask_set.MaskSet(masks)
+
+    assert list(ms.close_sets(2, 3)) == [(0, 1), (0, 2), (0, 3), (1, 2), (2, 3)]
+    assert list(ms.close_sets(3, 0)) == [(0, 2, 3)]
+
+
+def test_sizes(masks):
+    ms = mask_set.MaskSet(masks)
+
+    assert ms.size(0) == 36
+    assert ms.intersection_size([0, 3]) == 30
+    assert ms.intersection_size([0, 1]) == 0
+    assert ms.union_size([0, 1, 2]) == 84
+    assert ms.intersection_size([0, 2, 3]) == 30
+
+
+def test_detect_duplicates(masks):
+    ms = mask_set.MaskSet(masks)
+
+    assert ms.detect_duplicates(0.8) == set([(0, 3)])
+    assert ms.detect_duplicates(0.9) == set()
+
+
+def test_detect_unions(masks):
+    ms = mask_set.MaskSet(masks[[0, 1, 2, 4]])
+
+    assert ms.detect_unions() == {2: (0, 1)}
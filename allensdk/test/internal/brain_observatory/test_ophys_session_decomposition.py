@@ -0,0 +1,90 @@
+import pytest
+import numpy as np
+import h5py
+from allensdk.internal.brain_observatory import ophys_session_decomposition as osd
+
+
+N_FRAMES = 21
+HEIGHT = 6
+WIDTH = 10
+
+
+def write_raw(tmpdir, n_planes):
+    movie = np.random.RandomState(3).randint(
+        0, 4000, size=(N_FRAMES, n_planes, HEIGHT, WIDTH)).astype("<u2")
+    filename = str(tmpdir.join("movie.raw"))
+    movie.tofile(filename)
+    return filename, movie
+
+
+def plane_meta(plane, n_planes, description="data"):
+    frame_size = HEIGHT*WIDTH*2
+    return {"byte_offset": plane*frame_size,
+            "channel_description": description,
+            "dtype": "<u2",
+            "shape": [N_FRAMES, HEIGHT, WIDTH],
+            "strides": [n_planes*frame_size, WIDTH*2, 2]}
+
+
+@pytest.mark.parametrize("n_planes", [1, 2, 4])
+@pytest.mark.parametrize("use_memmap", [False, True])
+@pytest.mark.parametrize("block_frames", [1, 5, 64])
+def test_iter_strided_blocks(tmpdir, n_planes, use_memmap, block_frames):
+    filename, movie = write_raw(tmpdir, n_planes)
+    plane = n_planes - 1
+    meta = plane_meta(plane, n_planes)
+
+    blocks = list(osd.iter_strided_blocks(
+        filename, meta["dtype"], meta["byte_offset"], meta["shape"],
+        meta["strides"], block_frames=block_frames, use_memmap=use_memmap))
+
+    assert [start for start, _ in blocks] == \
+        list(range(0, N_FRAMES, block_frames))
+    assert np.array_equal(np.concatenate([b for _, b in blocks]),
+                          movie[:, plane])
+
+
+def test_read_strided(tmpdir):
+    filename, movie = write_raw(tmpdir, 3)
+    meta = plane_meta(1, 3)
+
+    arr = osd.read_strided(filename, meta["dtype"], meta["byte_offset"],
+                           meta["shape"], meta["strides"])
+    assert np.array_equal(arr, movie[:, 1])
+
+
+def test_read_strided_truncated(tmpdir):
+    filename, movie = write_raw(tmpdir, 2)
+    meta = plane_meta(1, 2)
+    meta["shape"][0] += 1
+
+    with pytest.raises(IOError):
+        osd.read_strided(filename, meta["dtype"], meta["byte_offset"],
+                         meta["shape"], meta["strides"])
+
+
+@pytest.mark.parametrize("preset", sorted(osd.COMPRESSION_PRESETS))
+@pytest.mark.parametrize("compression_threads", [1, 3])
+def test_export_frame_to_hdf5_pipelined(tmpdir, preset, compression_threads):
+    filename, movie = write_raw(tmpdir, 3)
+    frame_meta = [plane_meta(0, 3), plane_meta(1, 3, "piezo"),
+                  plane_meta(2, 3, "other")]
+    data_file = str(tmpdir.join("data.h5"))
+    aux_file = str(tmpdir.join("aux.h5"))
+
+    osd.export_frame_to_hdf5_pipelined(filename, data_file, aux_file,
+                                       frame_meta, preset=preset,
+                                       block_frames=5,
+                                       compression_threads=compression_threads)
+
+    settings = osd.COMPRESSION_PRESETS[preset]
+    with h5py.File(data_file, "r") as f:
+        assert list(f.keys()) == ["data"]
+        assert np.array_equal(f["data"][:], movie[:, 0])
+        assert f["data"].compression == settings["compression"]
+        chunk_frames = min(settings["chunk_frames"], N_FRAMES)
+        assert f["data"].chunks == (chunk_frames, HEIGHT, WIDTH)
+    with h5py.File(aux_file, "r") as f:
+        assert sorted(f.keys()) == ["other", "piezo"]
+        assert np.array_equal(f["piezo"][:], movie[:, 1])
+        assert np.array_equal(f["other"][:], movie[:, 2])
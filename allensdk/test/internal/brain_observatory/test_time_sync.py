@@ -4,7 +4,7 @@ import json
 import os
 import h5py
 from pkg_resources import resource_filename
-from mock import patch
+from mock import patch, MagicMock
 from allensdk.internal.brain_observatory import time_sync as ts
 from allensdk.internal.pipeline_modules import run_ophys_time_sync
 
@@ -449,3 +449,75 @@ def test_get_stim_data_length(monkeypatch, deserialized_pkl, expected):
     obtained = ts.get_stim_data_length("dummy_filepath")
 
     assert obtained == expected
+
+
+@pytest.fixture
+def synthetic_sync(tmpdir_factory):
+    path = str(tmpdir_factory.mktemp("sync").join("sync.h5"))
+    freq = 1000.0
+    labels = ["2p_vsync", "stim_vsync", "eye_tracking",
+              "behavior_monitoring", "photodiode"]
+    rates = [31.0, 60.0, 30.0, 29.0, 0.5]
+
+    edges = []
+    for bit, rate in enumerate(rates):
+        rising = np.arange(1.0, 19.0, 1.0 / rate) + 0.001 * bit
+        edges.append(np.stack([rising, np.full(len(rising), bit),
+                               np.ones(len(rising))], axis=1))
+        edges.append(np.stack([rising + 0.005, np.full(len(rising), bit),
+                               -np.ones(len(rising))], axis=1))
+    edges = np.concatenate(edges)
+    edges = edges[np.argsort(edges[:, 0], kind="mergesort")]
+
+    times = np.round(edges[:, 0] * freq).astype(np.uint32)
+    state = np.cumsum(edges[:, 2] * 2 ** edges[:, 1]).astype(np.uint32)
+    meta = {"ni_daq": {"counter_bits": 32, "counter_output_freq": freq,
+                       "sample_freq": freq},
+            "line_labels": labels}
+
+    with h5py.File(path, "w") as f:
+        f.create_dataset("data", data=np.stack([times, state], axis=1))
+        f.create_dataset("meta", data=str(meta))
+
+    return path
+
+
+def test_sync_line_cache():
+    mock_ds = MagicMock()
+    mock_ds.get_rising_edges.return_value = np.arange(5)
+    dataset = ts.SyncLineCache(mock_ds)
+    first = dataset.get_rising_edges("a", units="seconds")
+    second = dataset.get_rising_edges("a", units="seconds")
+
+    mock_ds.get_rising_edges.assert_called_once_with("a", units="seconds")
+    assert first is second
+    with pytest.raises(ValueError):
+        first[0] = 1
+
+
+def test_get_alignment_arrays(synthetic_sync):
+    aligner = ts.OphysTimeAligner(synthetic_sync)
+    with patch.object(ts.Dataset, "get_falling_edges",
+                      wraps=aligner.dataset.get_falling_edges) as mock_falling:
+        alignment = aligner.get_alignment_arrays()
+        assert aligner.get_alignment_arrays()["stim_times"] is not None
+
+    # stimulus, photodiode, eye and behavior lines are each read once
+    assert mock_falling.call_count == 4
+
+    dataset = aligner.dataset
+    ophys = dataset.get_rising_edges("2p_vsync", units="seconds")
+    stim = dataset.get_falling_edges("stim_vsync", units="seconds") + \
+        ts.ASSUMED_DELAY
+    eye = dataset.get_falling_edges("eye_tracking", units="seconds")
+
+    assert np.allclose(alignment["ophys_times"], ophys)
+    assert np.allclose(alignment["stim_times"], stim)
+    assert np.array_equal(alignment["stim_alignment"],
+                          ts.get_alignment_array(ophys, stim),
+                          equal_nan=True)
+    assert np.array_equal(alignment["eye_alignment"],
+                          ts.get_alignment_array(eye, ophys,
+                                                 int_method=np.ceil),
+                          equal_nan=True)
+    assert len(alignment["behavior_alignment"]) == len(ophys)
@@ -2,7 +2,8 @@ import pytest
 import numpy as np
 import SimpleITK as sitk
 
-from allensdk.internal.mouse_connectivity.projection_thumbnail.volume_projector import VolumeProjector
+from allensdk.internal.mouse_connectivity.projection_thumbnail.volume_projector import VolumeProjector, get_nonzero_bounds
+from allensdk.internal.mouse_connectivity.projection_thumbnail.projection_functions import max_projection
 
 
 @pytest.fixture
@@ -77,3 +78,45 @@ def test_safe_factory(simple_volume):
     shape_exp = [16, 17, 16]
     assert(np.allclose(shape_exp, vp.view_volume.GetSize()))
     assert(vp.view_volume.GetPixel(8, 9, 8) == simple_volume.GetPixel(5, 5, 4))
+
+
+@pytest.fixture
+def blob_volume():
+    arr = np.zeros([12, 14, 16], dtype=np.float32)
+    arr[3:9, 4:10, 5:12] = np.random.RandomState(4).rand(6, 6, 7)
+    return sitk.GetImageFromArray(arr)
+
+
+def test_get_nonzero_bounds(blob_volume):
+
+    arr = sitk.GetArrayFromImage(blob_volume)
+
+    assert(get_nonzero_bounds(arr) == [(3, 8), (4, 9), (5, 11)])
+    assert(get_nonzero_bounds(np.zeros((3, 3, 3))) is None)
+
+
+@pytest.mark.parametrize('from_axis,to_axis,axis', [(0, 2, 2), (0, 1, 2), (1, 2, 0), (0, 2, 1)])
+@pytest.mark.parametrize('angle', [0.0, 0.3, 2.2])
+def test_project_max(blob_volume, from_axis, to_axis, axis, angle):
+
+    vp = VolumeProjector.safe_factory(blob_volume)
+    exp_max, exp_depth = max_projection(vp.rotate(from_axis, to_axis, angle), axis)
+    obt_max, obt_depth = vp.project_max(from_axis, to_axis, angle, axis)
+
+    assert(np.allclose(obt_max, exp_max))
+    assert(np.array_equal(obt_depth, exp_depth))
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_project_max_series(blob_volume, processes):
+
+    vp = VolumeProjector.safe_factory(blob_volume)
+    angles = [0.0, 0.5, 1.0]
+
+    obt = list(vp.project_max_series([0] * 3, [2] * 3, angles, 2, processes=processes))
+
+    assert(len(obt) == 3)
+    for (obt_max, obt_depth), angle in zip(obt, angles):
+        exp_max, exp_depth = vp.project_max(0, 2, angle, 2)
+        assert(np.array_equal(obt_max, exp_max))
+        assert(np.array_equal(obt_depth, exp_depth))
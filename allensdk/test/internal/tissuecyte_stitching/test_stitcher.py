@@ -148,3 +148,56 @@ def test_get_blend():
 
     obt = stitcher.get_blend(indicator, stup, cb)
     assert( np.allclose( obt, exp ) )
+
+
+def make_tiles(missing=()):
+
+    from allensdk.internal.mouse_connectivity.tissuecyte_stitching.tile import Tile
+
+    np.random.seed(12)
+    tiles = []
+
+    for channel in range(2):
+        for ii in range(2):
+            for jj in range(3):
+                index = channel * 6 + ii * 3 + jj
+                bounds = {'row': {'start': ii * 16, 'end': ii * 16 + 20}, 
+                          'column': {'start': jj * 16, 'end': jj * 16 + 20}}
+                image = None if index in missing else np.random.rand(24, 24) * 1000
+                tiles.append(Tile(index=index, image=image, is_missing=index in missing, bounds=bounds, 
+                                  channel=channel, size={'row': 20, 'column': 20}, 
+                                  margins={'row': 2, 'column': 2}))
+
+    return tiles
+
+
+@pytest.mark.parametrize('missing,n_workers', [((), 1), ((), 3), ((4, 7), 2)])
+def test_pipelined_stitcher(missing, n_workers, tmpdir_factory):
+
+    dims = {'row': 36, 'column': 52}
+    average_tiles = {0: np.random.rand(24, 24) + 0.5}
+    
+    exp_image, exp_missing = stitcher.Stitcher(dims, make_tiles(missing), average_tiles, [0, 1]).run()
+
+    loaders = [lambda tile=tile: tile for tile in make_tiles(missing)]
+    path = str(tmpdir_factory.mktemp('stitcher').join('slice.npy'))
+    pipelined = stitcher.PipelinedStitcher(dims, loaders, average_tiles, [0, 1], 
+                                           n_workers=n_workers, output_path=path)
+    obt_image, obt_missing = pipelined.run()
+
+    assert( isinstance(obt_image, np.memmap) )
+    assert( np.array_equal(exp_image, obt_image) )
+    assert( np.array_equal(exp_image, np.load(path)) )
+    assert( obt_missing == exp_missing )
+    assert( set(pipelined.timings) == {'load', 'correct', 'wait', 'blend', 'total'} )
+
+
+def test_pipelined_stitcher_in_memory():
+
+    dims = {'row': 36, 'column': 52}
+
+    exp_image, _ = stitcher.Stitcher(dims, make_tiles(), {}, [0, 1]).run()
+    obt_image, _ = stitcher.PipelinedStitcher(dims, iter(make_tiles()), {}, [0, 1]).run()
+
+    assert( not isinstance(obt_image, np.memmap) )
+    assert( np.array_equal(exp_image, obt_image) )
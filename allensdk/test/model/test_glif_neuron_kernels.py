@@ -0,0 +1,138 @@
+# Allen Institute Software License - This software license is the 2-clause BSD
+# license plus a third clause that prohibits redistribution for commercial
+# purposes without further permission.
+#
+# Copyright 2017. Allen Institute. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Redistributions for commercial purposes are not permitted without the
+# Allen Institute's written permission.
+# For purposes of this license, commercial purposes is the incorporation of the
+# Allen Institute's software into anything for which you will charge fees or
+# other compensation. Contact terms@alleninstitute.org for commercial licensing
+# opportunities.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import pytest
+import numpy as np
+
+from allensdk.model.glif.glif_neuron import GlifNeuron
+from allensdk.model.glif import glif_neuron_kernels as gk
+
+
+def neuron_config(level, spike_cut_length):
+    config = {
+        'El': 0.0, 'dt': 5e-5, 'R_input': 2e8, 'C': 1e-10, 'th_inf': 0.02, 'th_adapt': None,
+        'asc_tau_array': [0.01, 0.1], 'asc_amp_array': [-1e-11, -2e-12],
+        'spike_cut_length': spike_cut_length,
+        'coeffs': { 'G': 1.1, 'C': 0.9, 'th_inf': 1.05, 'a': 1.2, 'b': 0.8, 'asc_amp_array': [1.0, 0.9] },
+        'init_voltage': 0.0, 'init_threshold': 0.02, 'init_AScurrents': [0.0, 0.0],
+        'voltage_dynamics_method': { 'name': 'linear_forward_euler', 'params': {} },
+        'voltage_reset_method': { 'name': 'v_before', 'params': { 'a': 0.3, 'b': 0.004 } }
+    }
+
+    if level in (1, 3):
+        config['voltage_reset_method'] = { 'name': 'zero', 'params': {} }
+        config['threshold_dynamics_method'] = { 'name': 'inf', 'params': {} }
+        config['threshold_reset_method'] = { 'name': 'inf', 'params': {} }
+    else:
+        threshold_params = { 'a_spike': 0.002, 'b_spike': 100.0, 'a_voltage': 5.0, 'b_voltage': 20.0 }
+        name = 'spike_component' if level in (2, 4) else 'three_components_exact'
+        config['threshold_dynamics_method'] = { 'name': name, 'params': threshold_params }
+        config['threshold_reset_method'] = { 'name': 'three_components',
+                                             'params': { 'a_spike': 0.002, 'b_spike': 100.0 } }
+
+    if level in (1, 2):
+        config['AScurrent_dynamics_method'] = { 'name': 'none', 'params': {} }
+        config['AScurrent_reset_method'] = { 'name': 'none', 'params': {} }
+    else:
+        config['AScurrent_dynamics_method'] = { 'name': 'exp', 'params': {} }
+        config['AScurrent_reset_method'] = { 'name': 'sum', 'params': { 'r': [1.0, 1.0] } }
+
+    return config
+
+
+@pytest.fixture
+def stimuli():
+    np.random.seed(0)
+    return [ np.concatenate([ np.zeros(500), np.ones(4000) * amp, np.zeros(500) ]) + np.random.randn(5000) * 2e-11
+             for amp in [ 1e-10, 2e-10, 4e-10 ] ]
+
+
+def assert_same_results(expected, obtained):
+    assert set(expected.keys()) == set(obtained.keys())
+    for key in expected:
+        np.testing.assert_array_equal(obtained[key], expected[key], err_msg=key)
+
+
+@pytest.mark.parametrize('level', [1, 2, 3, 4, 5])
+@pytest.mark.parametrize('spike_cut_length', [0, 30])
+def test_run_fast(level, spike_cut_length, stimuli):
+    neuron = GlifNeuron.from_dict(neuron_config(level, spike_cut_length))
+
+    for stim in stimuli:
+        expected = neuron.run(stim)
+        assert_same_results(expected, gk.run_fast(neuron, stim))
+
+
+@pytest.mark.parametrize('spike_cut_length', [0, 30, 4900])
+def test_run_batch(spike_cut_length, stimuli):
+    neurons = [ GlifNeuron.from_dict(neuron_config(level, spike_cut_length)) for level in [ 1, 2, 3, 4, 5 ] ]
+
+    # a voltage reset above threshold stops the simulation
+    bad_reset_config = neuron_config(4, spike_cut_length)
+    bad_reset_config['voltage_reset_method'] = { 'name': 'v_before', 'params': { 'a': 1.0, 'b': 0.05 } }
+    neurons.append(GlifNeuron.from_dict(bad_reset_config))
+
+    # every neuron with every stimulus
+    pairs = [ (neuron, stim) for neuron in neurons for stim in stimuli ]
+    results = gk.run_batch([ neuron for neuron, _ in pairs ], [ stim for _, stim in pairs ])
+
+    assert len(results) == len(pairs)
+    for (neuron, stim), result in zip(pairs, results):
+        assert_same_results(neuron.run(stim), result)
+
+
+def test_run_batch_broadcast(stimuli):
+    neuron = GlifNeuron.from_dict(neuron_config(5, 30))
+
+    results = gk.run_batch(neuron, np.array(stimuli))
+    for stim, result in zip(stimuli, results):
+        assert_same_results(neuron.run(stim), result)
+
+    with pytest.raises(ValueError):
+        gk.run_batch([ neuron, neuron ], stimuli)
+
+
+def test_run_fast_custom_method(stimuli):
+    neuron = GlifNeuron.from_dict(neuron_config(3, 30))
+
+    def dynamics_threshold_constant(neuron, threshold_t0, voltage_t0, AScurrents_t0, inj):
+        return 0.015
+
+    neuron.threshold_dynamics_method = GlifNeuron.configure_method('inf', dynamics_threshold_constant, {})
+    assert gk.library_method_names(neuron) is None
+
+    expected = neuron.run(stimuli[1])
+    assert_same_results(expected, gk.run_fast(neuron, stimuli[1]))
+    assert_same_results(expected, gk.run_batch(neuron, [ stimuli[1] ])[0])